@@ -0,0 +1,72 @@
+"""Benchmark baseline matching in utils_lib.find_word.
+
+Compare the all-pairs difflib scan with the indexed matcher and check both
+report the same baseline entry for every line.
+
+    python3 -m benchmarks.bench_find_word
+    python3 -m benchmarks.bench_find_word --lines 100000 --entries 1000,5000
+"""
+import re
+import time
+import difflib
+import argparse
+from os_tests.libs import utils_lib, baseline_lib
+from benchmarks import corpus
+
+def legacy_match(test_instance, line, baseline_dict):
+    '''
+    The all-pairs scan find_word used before BaselineIndex.
+    '''
+    for basekey in baseline_dict:
+        line1_tmp, line2_tmp = utils_lib.clean_sentence(test_instance, line, baseline_dict[basekey]["content"])
+        seq = difflib.SequenceMatcher(None, a=line1_tmp, b=line2_tmp)
+        same_rate = seq.ratio() * 100
+        if same_rate > baseline_lib.FAIL_RATE:
+            return basekey
+    return None
+
+def matched_lines(text, keyword):
+    return re.findall('.*%s.*\n' % keyword, text, flags=re.I)
+
+def bench(lines, entries, density, legacy_sample):
+    test_instance = corpus.MockTest()
+    baseline = corpus.make_baseline(entries=entries)
+    journal = corpus.make_journal(lines=lines, baseline=baseline, match_density=density)
+    hit_lines = []
+    for keyword in ['error', 'fail', 'warn']:
+        hit_lines.extend(matched_lines(journal, keyword))
+
+    time_start = time.time()
+    index = baseline_lib.BaselineIndex(baseline)
+    build_time = time.time() - time_start
+    time_start = time.time()
+    indexed = [utils_lib.match_baseline(test_instance, line, baseline, baseline_index=index)[0] for line in hit_lines]
+    index_time = time.time() - time_start
+
+    sample = hit_lines[:legacy_sample]
+    time_start = time.time()
+    legacy = [legacy_match(test_instance, line, baseline) for line in sample]
+    legacy_time = time.time() - time_start
+    if legacy != indexed[:len(sample)]:
+        raise AssertionError("indexed matcher differs from all-pairs scan")
+    legacy_est = legacy_time / max(len(sample), 1) * len(hit_lines)
+    print("{:>8} lines {:>6} entries {:>6} compared | index build {:.2f}s match {:.2f}s "
+          "({:.0f} lines/s) | all-pairs est {:.1f}s ({} lines checked same) | {:.0f}x".format(
+              lines, entries, len(hit_lines), build_time, index_time,
+              len(hit_lines) / max(index_time, 1e-9), legacy_est, len(sample),
+              legacy_est / max(index_time + build_time, 1e-9)))
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark find_word baseline matching.")
+    parser.add_argument('--lines', default='10000,100000', help='journal lines, split by ","')
+    parser.add_argument('--entries', default='50,1000,5000', help='baseline entries, split by ","')
+    parser.add_argument('--density', default=0.01, type=float, help='ratio of lines with keywords')
+    parser.add_argument('--legacy-sample', default=200, type=int,
+                        help='lines compared by all-pairs scan, the rest is estimated')
+    args = parser.parse_args()
+    for lines in [int(x) for x in args.lines.split(',')]:
+        for entries in [int(x) for x in args.entries.split(',')]:
+            bench(lines, entries, args.density, args.legacy_sample)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,49 @@
+"""Benchmark per call overhead of utils_lib.run_cmd executors.
+
+Run the same cmds through run_cmd with "cmd_executor" local(a new shell for
+each cmd) and shell(one long-lived shell), and check both get the same
+status and output.
+
+    python3 -m benchmarks.bench_run_cmd
+    python3 -m benchmarks.bench_run_cmd --calls 500 --cmds "true,uname -r"
+"""
+import os
+import time
+import shutil
+import argparse
+from os_tests.libs import utils_lib, exec_lib
+from benchmarks import corpus
+
+def bench(cmd, calls):
+    results = {}
+    for name in (exec_lib.LOCAL, exec_lib.SHELL):
+        test_instance = corpus.MockTest(params={'cmd_executor': name})
+        # start the session outside of timing
+        utils_lib.run_cmd(test_instance, 'true')
+        time_start = time.time()
+        for _ in range(calls):
+            output = utils_lib.run_cmd(test_instance, cmd, is_log_output=False)
+            status = utils_lib.run_cmd(test_instance, cmd, is_log_output=False, ret_status=True)
+        results[name] = (time.time() - time_start) / (calls * 2), status, output
+    if results[exec_lib.LOCAL][1:] != results[exec_lib.SHELL][1:]:
+        raise AssertionError("shell executor differs from local on {}".format(cmd))
+    local_time, shell_time = results[exec_lib.LOCAL][0], results[exec_lib.SHELL][0]
+    print("{:<32} local {:>8.0f}us/call | shell {:>8.0f}us/call | {:.1f}x".format(
+        cmd, local_time * 1e6, shell_time * 1e6, local_time / max(shell_time, 1e-9)))
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark run_cmd executors.")
+    parser.add_argument('--calls', default=200, type=int, help='calls of each cmd')
+    parser.add_argument('--cmds', default='true,uname -r,cat /proc/cmdline,sudo cat /proc/cmdline',
+                        help='cmds, split by ","')
+    args = parser.parse_args()
+    if os.geteuid() != 0:
+        print("Not root, sudo in shell executor still runs real sudo")
+    for cmd in args.cmds.split(','):
+        if cmd.startswith('sudo ') and shutil.which('sudo') is None:
+            print("{:<32} skipped as sudo is not installed".format(cmd))
+            continue
+        bench(cmd, args.calls)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,75 @@
+"""Benchmark keyword scanning in utils_lib.check_log.
+
+Compare one re.findall() per keyword with scan_lib.scan_keywords() walking
+the log once, and check both find the same lines for every keyword.
+The unanchored '.*keyword.*' retries from every char of a line, so the per
+keyword scan is timed on the first --legacy-lines lines and estimated.
+
+    python3 -m benchmarks.bench_scan
+    python3 -m benchmarks.bench_scan --lines 1000000 --keywords error,warn,fail,trace
+"""
+import re
+import time
+import argparse
+from os_tests.libs import scan_lib
+from benchmarks import corpus
+
+def legacy_scan(text, keywords, skip_words=None):
+    '''
+    The per keyword scan find_word used before scan_lib.
+    '''
+    hits = {}
+    for keyword in keywords:
+        tmp_list = re.findall('.*%s.*\n' % keyword, text, flags=re.I)
+        if skip_words is not None:
+            for skip_word in skip_words.split(','):
+                tmp_list = [x for x in tmp_list if skip_word not in x]
+        hits[keyword] = tmp_list
+    return hits
+
+def scan(text, keywords, skip_words=None):
+    hits = scan_lib.scan_keywords(text, keywords)
+    if skip_words is not None:
+        for keyword in hits:
+            hits[keyword] = scan_lib.skip_lines(hits[keyword], skip_words)
+    return hits
+
+def bench(lines, keywords, density, skip_words, legacy_lines):
+    text = corpus.make_journal(lines=lines, match_density=density)
+    size = len(text) / 1024.0 / 1024.0
+
+    time_start = time.time()
+    single = scan(text, keywords, skip_words=skip_words)
+    scan_time = time.time() - time_start
+
+    sample_lines = min(lines, legacy_lines)
+    sample = ''.join(text.splitlines(True)[:sample_lines])
+    time_start = time.time()
+    legacy = legacy_scan(sample, keywords, skip_words=skip_words)
+    legacy_time = time.time() - time_start
+    expected = scan(sample, keywords, skip_words=skip_words)
+    for keyword in keywords:
+        if legacy[keyword] != expected[keyword]:
+            raise AssertionError("scan_keywords differs from per keyword scan on {}".format(keyword))
+    legacy_est = legacy_time / max(sample_lines, 1) * lines
+    print("{:>8} lines {:>6.1f}MB {} keywords {:>6} hits | single pass {:.2f}s ({:.0f} lines/s) | "
+          "per keyword est {:.1f}s ({} lines checked same) | {:.0f}x".format(
+              lines, size, len(keywords), sum(len(x) for x in single.values()), scan_time,
+              lines / max(scan_time, 1e-9), legacy_est, sample_lines,
+              legacy_est / max(scan_time, 1e-9)))
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark check_log keyword scanning.")
+    parser.add_argument('--lines', default='100000,1000000', help='log lines, split by ","')
+    parser.add_argument('--keywords', default='error,warn,fail,trace,Call Trace,invalid',
+                        help='keywords, split by ","')
+    parser.add_argument('--density', default=0.01, type=float, help='ratio of lines with keywords')
+    parser.add_argument('--skip-words', default=None, help='skip words, split by ","')
+    parser.add_argument('--legacy-lines', default=5000, type=int,
+                        help='lines scanned per keyword, the rest is estimated')
+    args = parser.parse_args()
+    for lines in [int(x) for x in args.lines.split(',')]:
+        bench(lines, args.keywords.split(','), args.density, args.skip_words, args.legacy_lines)
+
+if __name__ == "__main__":
+    main()
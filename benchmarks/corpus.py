@@ -0,0 +1,108 @@
+"""Synthetic dmesg/journal corpora and baseline entries for benchmarks."""
+import json
+import random
+import logging
+import unittest
+
+_IDENTS = ['kernel', 'systemd', 'NetworkManager', 'cloud-init', 'sshd', 'chronyd',
+           'dbus-daemon', 'rsyslogd', 'auditd', 'polkitd', 'tuned', 'irqbalance']
+_WORDS = ['device', 'driver', 'module', 'config', 'timeout', 'interface', 'link',
+          'memory', 'address', 'request', 'service', 'socket', 'firmware', 'queue',
+          'buffer', 'table', 'policy', 'session', 'volume', 'channel', 'clock',
+          'register', 'interrupt', 'vector', 'status', 'packet', 'object', 'handler']
+_KEYWORDS = ['error', 'fail', 'warn', 'trace', 'invalid', 'unable']
+
+def _sentence(rnd, words=8):
+    return ' '.join(rnd.choice(_WORDS) for _ in range(words))
+
+def make_baseline(entries=1000, seed=1):
+    '''
+    Make a baseline dict in the same format as data/baseline_log.json.
+    '''
+    rnd = random.Random(seed)
+    baseline = {}
+    for i in range(entries):
+        ident = rnd.choice(_IDENTS)
+        content = "{}[{}]: {} {} {} 0x{:x}".format(ident, rnd.randint(1, 9999),
+                                                   _sentence(rnd, rnd.randint(3, 12)),
+                                                   rnd.choice(_KEYWORDS),
+                                                   _sentence(rnd, rnd.randint(1, 6)),
+                                                   rnd.getrandbits(32))
+        baseline['msg_{}'.format(i + 1)] = {
+            "content": content,
+            "analyze": "synthetic entry",
+            "branch": rnd.choice(["rhel7", "rhel8", "rhel7,rhel8"]),
+            "status": rnd.choice(["active"] * 9 + ["inactive"]),
+            "link": "",
+            "path": rnd.choice(["dmesg", "journal", "dmesg or journal"]),
+            "trigger": ""
+        }
+    return baseline
+
+def make_journal(lines=100000, baseline=None, match_density=0.01, known_density=0.5, seed=2):
+    '''
+    Make a journal text.
+    Arguments:
+        lines {int} -- lines in journal
+        baseline {dict} -- known messages are picked from it
+        match_density {float} -- ratio of lines containing a keyword
+        known_density {float} -- ratio of keyword lines which are baseline messages
+    '''
+    rnd = random.Random(seed)
+    contents = [v["content"] for v in baseline.values()] if baseline else []
+    out = []
+    for i in range(lines):
+        stamp = "Oct 16 {:02d}:{:02d}:{:02d} ip-172-31-1-196.us-west-2.compute.internal".format(
+            (i // 3600) % 24, (i // 60) % 60, i % 60)
+        if rnd.random() < match_density:
+            if contents and rnd.random() < known_density:
+                msg = rnd.choice(contents)
+            else:
+                msg = "{}[{}]: {} {} {}".format(rnd.choice(_IDENTS), rnd.randint(1, 9999),
+                                                 _sentence(rnd, 5), rnd.choice(_KEYWORDS),
+                                                 _sentence(rnd, 4))
+        else:
+            msg = "{}[{}]: {}".format(rnd.choice(_IDENTS), rnd.randint(1, 9999), _sentence(rnd))
+        out.append("{} {}\n".format(stamp, msg))
+    return ''.join(out)
+
+def make_dmesg(lines=100000, baseline=None, match_density=0.01, known_density=0.5, seed=3):
+    '''
+    Make a dmesg text.
+    '''
+    journal = make_journal(lines=lines, baseline=baseline, match_density=match_density,
+                           known_density=known_density, seed=seed)
+    out = []
+    for i, line in enumerate(journal.splitlines(True)):
+        out.append("[{:>12.6f}] {}".format(i / 1000.0, line.split(' ', 4)[-1]))
+    return ''.join(out)
+
+def make_journal_export(lines=100000, baseline=None, match_density=0.01, known_density=0.5, seed=4):
+    '''
+    Make "journalctl -o json" output with the same messages as make_journal.
+    '''
+    journal = make_journal(lines=lines, baseline=baseline, match_density=match_density,
+                           known_density=known_density, seed=seed)
+    out = []
+    for i, line in enumerate(journal.splitlines()):
+        ident, _, message = line.split(' ', 4)[-1].partition(': ')
+        comm, _, pid = ident.rstrip(']').partition('[')
+        entry = {"__CURSOR": "s=0;i={:x}".format(i), "__REALTIME_TIMESTAMP": str(1792108800000000 + i * 1000),
+                 "_HOSTNAME": "ip-172-31-1-196", "SYSLOG_IDENTIFIER": comm, "_PID": pid,
+                 "_SYSTEMD_UNIT": "{}.service".format(comm), "MESSAGE": message}
+        out.append(json.dumps(entry) + "\n")
+    return ''.join(out)
+
+class MockTest(unittest.TestCase):
+    '''
+    Stand in for unittest.TestCase instance passed to utils_lib functions.
+    '''
+    def __init__(self, params=None):
+        super(MockTest, self).__init__('runTest')
+        self.log = logging.getLogger('os_tests.benchmarks')
+        self.log.addHandler(logging.NullHandler())
+        self.log.propagate = False
+        self.params = params or {}
+
+    def runTest(self):
+        pass
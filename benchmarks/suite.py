@@ -0,0 +1,163 @@
+"""Micro-benchmarks of the log analysis hot paths.
+
+Each benchmark runs on synthetic corpora, its time is measured in one run and
+its peak memory(tracemalloc) in another run, as tracing slows it down.
+Results are saved as json with the git commit, so runs of two commits can be
+compared.
+
+    python3 -m benchmarks.suite
+    python3 -m benchmarks.suite --lines 1000000 --density 0.05 --output after.json
+    python3 -m benchmarks.suite --compare before.json after.json
+"""
+import os
+import json
+import time
+import shutil
+import argparse
+import tempfile
+import platform
+import subprocess
+import tracemalloc
+from os_tests.libs import utils_lib, baseline_lib, scan_lib, journal_lib
+from benchmarks import corpus
+
+KEYWORDS = ['error', 'warn', 'fail', 'trace']
+
+class Corpora(object):
+    '''
+    Corpora shared by all benchmarks of one run.
+    '''
+    def __init__(self, lines, entries, density):
+        self.lines = lines
+        self.baseline = corpus.make_baseline(entries=entries)
+        self.journal = corpus.make_journal(lines=lines, baseline=self.baseline, match_density=density)
+        self.dmesg = corpus.make_dmesg(lines=lines, baseline=self.baseline, match_density=density)
+        self.journal_export = corpus.make_journal_export(lines=lines, baseline=self.baseline,
+                                                         match_density=density)
+        self.hits = scan_lib.scan_keywords(self.journal, KEYWORDS)
+        self.tmp_dir = tempfile.mkdtemp(prefix='os_tests_bench_')
+        self.baseline_file = os.path.join(self.tmp_dir, 'baseline_log.json')
+        with open(self.baseline_file, 'w') as fh:
+            json.dump(self.baseline, fh)
+
+    def close(self):
+        shutil.rmtree(self.tmp_dir)
+
+def bench_find_word(test_instance, corpora):
+    '''check_log baseline comparison of journal lines with keywords'''
+    index = baseline_lib.BaselineIndex(corpora.baseline)
+    for keyword in KEYWORDS:
+        utils_lib.find_word(test_instance, corpora.journal, keyword, baseline_dict=corpora.baseline,
+                            baseline_index=index, matched_lines=corpora.hits[keyword])
+    return corpora.lines
+
+def bench_scan_keywords(test_instance, corpora):
+    '''check_log single pass keyword scan of journal'''
+    scan_lib.scan_keywords(corpora.journal, KEYWORDS)
+    return corpora.lines
+
+def bench_clean_sentence(test_instance, corpora):
+    '''clean_sentence of lines with keywords against the first 50 baseline entries'''
+    contents = [x['content'] for x in corpora.baseline.values()][:50]
+    lines = [x for hits in corpora.hits.values() for x in hits]
+    for line in lines:
+        for content in contents:
+            utils_lib.clean_sentence(test_instance, line, content)
+    return len(lines)
+
+def bench_verify_output(test_instance, corpora):
+    '''run_cmd expect_kw/expect_not_kw regex checks of dmesg output'''
+    utils_lib.verify_output(test_instance, corpora.dmesg, status=0, expect_ret=0,
+                            expect_kw='device', expect_not_kw='Call Trace,Unknown symbol')
+    return corpora.lines
+
+def bench_journal_parse(test_instance, corpora):
+    '''journal snapshot parsing of "journalctl -o json" output'''
+    for line in corpora.journal_export.split('\n')[:-1]:
+        journal_lib.parse_record(line)
+    return corpora.lines
+
+def bench_baseline_load(test_instance, corpora):
+    '''baseline file loading and index building of a new process'''
+    store = baseline_lib.BaselineStore(corpora.baseline_file)
+    store.get(test_instance.log, os_id='rhel', os_version='8.4', source='journal')
+    return len(corpora.baseline)
+
+BENCHMARKS = [bench_find_word, bench_scan_keywords, bench_clean_sentence,
+              bench_verify_output, bench_journal_parse, bench_baseline_load]
+
+def git_commit():
+    try:
+        return subprocess.check_output(['git', 'rev-parse', '--short', 'HEAD'], stderr=subprocess.DEVNULL,
+                                       cwd=os.path.dirname(os.path.abspath(__file__))).decode().strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+def run(benchmark, corpora):
+    '''
+    Run benchmark twice, for time and for peak memory.
+    Return:
+        result dict
+    '''
+    test_instance = corpus.MockTest()
+    time_start = time.perf_counter()
+    lines = benchmark(test_instance, corpora)
+    seconds = time.perf_counter() - time_start
+    tracemalloc.start()
+    benchmark(test_instance, corpora)
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return {'name': benchmark.__name__[len('bench_'):], 'lines': lines, 'seconds': seconds,
+            'lines_per_s': lines / max(seconds, 1e-9), 'peak_kb': peak / 1024.0}
+
+def compare(before_file, after_file):
+    with open(before_file) as fh:
+        before = json.load(fh)
+    with open(after_file) as fh:
+        after = json.load(fh)
+    print("{:<16} {:>14} {:>14} {:>8} {:>12} {:>12}".format(
+        'benchmark', before['commit'], after['commit'], 'speedup', 'peak before', 'peak after'))
+    before_results = dict((x['name'], x) for x in before['results'])
+    for result in after['results']:
+        old = before_results.get(result['name'])
+        if old is None:
+            continue
+        print("{:<16} {:>12.0f}/s {:>12.0f}/s {:>7.2f}x {:>10.0f}KB {:>10.0f}KB".format(
+            result['name'], old['lines_per_s'], result['lines_per_s'],
+            result['lines_per_s'] / max(old['lines_per_s'], 1e-9), old['peak_kb'], result['peak_kb']))
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark log analysis hot paths.")
+    parser.add_argument('--lines', default=100000, type=int, help='lines in dmesg and journal')
+    parser.add_argument('--entries', default=1000, type=int, help='baseline entries')
+    parser.add_argument('--density', default=0.01, type=float, help='ratio of lines with keywords')
+    parser.add_argument('--only', default=None, help='benchmarks to run, split by ","')
+    parser.add_argument('--output', default=None, help='save results to json file')
+    parser.add_argument('--compare', default=None, nargs=2, metavar=('BEFORE', 'AFTER'),
+                        help='compare two saved results')
+    args = parser.parse_args()
+    if args.compare:
+        compare(*args.compare)
+        return
+    benchmarks = BENCHMARKS
+    if args.only:
+        benchmarks = [x for x in BENCHMARKS if x.__name__[len('bench_'):] in args.only.split(',')]
+    corpora = Corpora(args.lines, args.entries, args.density)
+    results = []
+    try:
+        for benchmark in benchmarks:
+            result = run(benchmark, corpora)
+            results.append(result)
+            print("{:<16} {:>9} lines {:>8.3f}s {:>12.0f} lines/s peak {:>10.0f}KB".format(
+                result['name'], result['lines'], result['seconds'], result['lines_per_s'], result['peak_kb']))
+    finally:
+        corpora.close()
+    if args.output:
+        with open(args.output, 'w') as fh:
+            json.dump({'commit': git_commit(), 'python': platform.python_version(),
+                       'lines': args.lines, 'entries': args.entries, 'density': args.density,
+                       'results': results}, fh, indent=2)
+        print("Results saved to {}".format(args.output))
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,232 @@
+import os
+import json
+import time
+import fcntl
+import hashlib
+import logging
+import tempfile
+import multiprocessing
+import urllib.request
+from os_tests.libs import exec_lib
+from os_tests.libs import facts_lib
+
+LOG = logging.getLogger(__name__)
+# url to sha256 of artifacts fetched before
+INDEX_FILE = 'index.json'
+# background provisioning process of this session and its marker files in
+# results_dir, parallel workers see them too
+_PROVISION = None
+PROVISION_PID_FILE = '.ltp_provision.pid'
+PROVISION_DONE_FILE = '.ltp_provision.done'
+
+def _sha256_file(path):
+    digest = hashlib.sha256()
+    with open(path, 'rb') as fh:
+        for block in iter(lambda: fh.read(65536), b''):
+            digest.update(block)
+    return digest.hexdigest()
+
+class ArtifactStore(object):
+    '''
+    Content-addressed cache of test dependencies, each file is saved as
+    sha256/<digest> and verified when it is added and used. A file lock
+    serializes fetching between processes, eg. parallel workers and the
+    background provisioning.
+    '''
+    def __init__(self, cache_dir):
+        self.cache_dir = cache_dir
+        self.index_file = os.path.join(cache_dir, INDEX_FILE)
+        os.makedirs(os.path.join(cache_dir, 'sha256'), exist_ok=True)
+
+    def path(self, digest):
+        return os.path.join(self.cache_dir, 'sha256', digest)
+
+    def _load_index(self):
+        try:
+            with open(self.index_file, 'r') as fh:
+                return json.load(fh)
+        except (IOError, OSError, ValueError):
+            return {}
+
+    def lookup(self, url, sha256=None):
+        '''
+        Get cached file of url, None if it is not cached or verifying fails.
+        '''
+        digest = sha256 or self._load_index().get(url)
+        if digest is None or not os.path.exists(self.path(digest)):
+            return None
+        if _sha256_file(self.path(digest)) != digest:
+            LOG.info("Remove corrupted artifact %s", self.path(digest))
+            os.unlink(self.path(digest))
+            return None
+        return self.path(digest)
+
+    def _download(self, src, sha256):
+        fd, tmp_file = tempfile.mkstemp(dir=self.cache_dir, prefix='.download_')
+        digest = hashlib.sha256()
+        try:
+            with os.fdopen(fd, 'wb') as fh:
+                if src.startswith(('http://', 'https://', 'ftp://')):
+                    resp = urllib.request.urlopen(src, timeout=60)
+                else:
+                    resp = open(src, 'rb')
+                with resp:
+                    for block in iter(lambda: resp.read(65536), b''):
+                        digest.update(block)
+                        fh.write(block)
+            if sha256 is not None and digest.hexdigest() != sha256:
+                raise ValueError("sha256 of {} is {}, expected {}".format(src, digest.hexdigest(), sha256))
+            os.replace(tmp_file, self.path(digest.hexdigest()))
+        except BaseException:
+            if os.path.exists(tmp_file):
+                os.unlink(tmp_file)
+            raise
+        return digest.hexdigest()
+
+    def fetch(self, url, sha256=None, source=None):
+        '''
+        Get local file of url, fill the cache from source or url if it is not
+        cached. The first download is trusted if sha256 is not known.
+        Arguments:
+            url {string} -- artifact url
+            sha256 {string} -- expected sha256 of artifact
+            source {string} -- local dir or http url serving artifacts by
+                               file name, tried before url
+        Return:
+            local file, None if all fail
+        '''
+        with open(os.path.join(self.cache_dir, '.lock'), 'w') as lock:
+            # lockf locks are not shared with forked processes
+            fcntl.lockf(lock, fcntl.LOCK_EX)
+            path = self.lookup(url, sha256=sha256)
+            if path is not None:
+                LOG.info("Found %s in artifact cache %s", url, path)
+                return path
+            srcs = [url]
+            if source:
+                name = os.path.basename(url)
+                if source.startswith(('http://', 'https://', 'ftp://')):
+                    srcs.insert(0, source.rstrip('/') + '/' + name)
+                else:
+                    srcs.insert(0, os.path.join(source, name))
+            for src in srcs:
+                try:
+                    digest = self._download(src, sha256)
+                except Exception as err:
+                    LOG.info("Cannot fetch %s: %s", src, err)
+                    continue
+                index = self._load_index()
+                index[url] = digest
+                tmp_file = "{}.{}.tmp".format(self.index_file, os.getpid())
+                with open(tmp_file, 'w') as fh:
+                    json.dump(index, fh, indent=2)
+                os.replace(tmp_file, self.index_file)
+                LOG.info("Saved %s from %s as %s", url, src, self.path(digest))
+                return self.path(digest)
+            return None
+
+def fetch(params, url, sha256=None):
+    '''
+    Get local file of url from artifact cache configured in params.
+    Arguments:
+        params {dict} -- session or case params
+        url {string} -- artifact url
+        sha256 {string} -- expected sha256 of artifact
+    Return:
+        local file, None if cache is disabled or fetching fails
+    '''
+    if not params.get('artifact_cache_dir'):
+        return None
+    try:
+        store = ArtifactStore(params['artifact_cache_dir'])
+        return store.fetch(url, sha256=sha256 or None, source=params.get('artifact_source'))
+    except (IOError, OSError) as err:
+        LOG.info("Artifact cache %s is not usable: %s", params['artifact_cache_dir'], err)
+        return None
+
+def get_ltp_artifact(params, arch):
+    '''
+    Get ltp rpm url and expected sha256 of arch from params.
+    Return:
+        (url, sha256)
+    '''
+    suffix = 'aarch64' if arch == 'aarch64' else 'x86_64'
+    return params.get('ltp_url_' + suffix), params.get('ltp_sha256_' + suffix) or None
+
+def _provision_ltp(params):
+    # only fetch and verify the rpm, installing it here would hold the yum
+    # lock while other cases use yum, ltp_install installs it from cache
+    executor = exec_lib.LocalExecutor()
+    if executor.run('sudo ls -l /opt/ltp/runltp')[0] == 0:
+        return
+    url, sha256 = get_ltp_artifact(params, facts_lib.get_facts().arch)
+    rpm_file = fetch(params, url, sha256=sha256)
+    LOG.info("Background ltp fetch of %s: %s", url, rpm_file)
+
+def _proc_start_time(pid):
+    # start time of a live process in clock ticks since boot, None if pid is
+    # gone or a zombie, it tells a reused pid from the provisioning process
+    try:
+        with open('/proc/{}/stat'.format(pid), 'r') as fh:
+            fields = fh.read().rsplit(')', 1)[1].split()
+    except (IOError, OSError, IndexError):
+        return None
+    if fields[0] in ('Z', 'X'):
+        return None
+    return fields[19]
+
+def _provision_files(params):
+    return [os.path.join(params['results_dir'], x) for x in (PROVISION_PID_FILE, PROVISION_DONE_FILE)]
+
+def _run_provision(params, done_file):
+    try:
+        _provision_ltp(params)
+    except Exception as err:
+        LOG.info("Background ltp provisioning failed: %s", err)
+    finally:
+        open(done_file, 'w').close()
+
+def start_provision(params):
+    '''
+    Fetch and verify ltp rpm in a background process, so download overlaps
+    with cases run before ltp cases. It is a process rather than a thread, parallel
+    workers forked later must not inherit a thread which may hold locks.
+    Arguments:
+        params {dict} -- session params
+    '''
+    global _PROVISION
+    pid_file, done_file = _provision_files(params)
+    os.makedirs(params['results_dir'], exist_ok=True)
+    for path in (pid_file, done_file):
+        if os.path.exists(path):
+            os.unlink(path)
+    _PROVISION = multiprocessing.Process(target=_run_provision, args=(params, done_file),
+                                         name='os_tests_provision', daemon=True)
+    _PROVISION.start()
+    with open(pid_file, 'w') as fh:
+        fh.write("{} {}".format(_PROVISION.pid, _proc_start_time(_PROVISION.pid)))
+
+def wait_provision(test_instance, timeout=1200):
+    '''
+    Wait background provisioning of this session to finish, by its marker
+    files in results_dir, so it works in parallel workers too. It stops
+    waiting once the provisioning process is dead or its pid is reused.
+    '''
+    pid_file, done_file = _provision_files(test_instance.params)
+    time_start = time.time()
+    while os.path.exists(pid_file) and not os.path.exists(done_file):
+        # reap provisioning process if it is a child of this process
+        multiprocessing.active_children()
+        try:
+            with open(pid_file, 'r') as fh:
+                pid, start_time = fh.read().split()
+        except (IOError, OSError, ValueError):
+            pid, start_time = None, None
+        if pid is None or start_time == 'None' or _proc_start_time(pid) != start_time:
+            test_instance.log.info("Background ltp provisioning is gone")
+            return
+        if time.time() - time_start > timeout:
+            test_instance.log.info("Background ltp provisioning does not finish in {}s".format(timeout))
+            return
+        test_instance.log.info("Wait background ltp provisioning")
+        time.sleep(5)
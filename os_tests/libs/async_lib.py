@@ -0,0 +1,171 @@
+import os
+import time
+import codecs
+import signal
+import asyncio
+from os_tests.libs import utils_lib
+from os_tests.libs import event_lib
+
+# cmds run at the same time by default
+DEFAULT_CONCURRENCY = 8
+
+def _run_loop(coro):
+    # set loop as current one, child watcher only works with it in python3.6
+    loop = asyncio.new_event_loop()
+    asyncio.set_event_loop(loop)
+    try:
+        return loop.run_until_complete(coro)
+    finally:
+        asyncio.set_event_loop(None)
+        loop.close()
+
+async def _stream(proc, on_output):
+    # pass output on as it comes, keep all of it for the result
+    decoder = codecs.getincrementaldecoder('utf-8')(errors='replace')
+    chunks = []
+    while True:
+        data = await proc.stdout.read(4096)
+        text = decoder.decode(data, final=not data)
+        if text:
+            chunks.append(text)
+            on_output(text)
+        if not data:
+            break
+    await proc.wait()
+    return ''.join(chunks)
+
+async def _run_one(semaphore, args, timeout, on_output=None):
+    async with semaphore:
+        time_start = time.time()
+        status, stdout, err = await _run_proc(args, timeout, on_output)
+        # cpu time of concurrent cmds cannot be split
+        event_lib.record_cmd(None, args[-1], time.time() - time_start, None, stdout, status)
+        return status, stdout, err
+
+async def _run_proc(args, timeout, on_output):
+    proc = await asyncio.create_subprocess_exec(*args, stdout=asyncio.subprocess.PIPE,
+                                                stderr=asyncio.subprocess.STDOUT,
+                                                start_new_session=True)
+    try:
+        if on_output is None:
+            stdout, _ = await asyncio.wait_for(proc.communicate(), timeout)
+            stdout = stdout.decode('utf-8', errors='replace')
+        else:
+            stdout = await asyncio.wait_for(_stream(proc, on_output), timeout)
+    except asyncio.TimeoutError:
+        # kill the whole group, children of shell may hold stdout open. A
+        # non-root test process cannot kill cmds run by sudo, wrap them in
+        # "sudo timeout" as ltp_lib does
+        try:
+            os.killpg(proc.pid, signal.SIGKILL)
+        except OSError:
+            pass
+        await proc.wait()
+        return None, None, "timeout after {}s".format(timeout)
+    return proc.returncode, stdout, None
+
+async def _run_all(cmds_args, concurrency, timeouts):
+    semaphore = asyncio.Semaphore(concurrency)
+    return await asyncio.gather(*[_run_one(semaphore, args, timeout) for args, timeout in zip(cmds_args, timeouts)])
+
+async def _run_chain(semaphore, chain_index, chain, on_done, on_output):
+    results = []
+    for cmd_index, (args, timeout) in enumerate(chain):
+        time_start = time.time()
+        stream = None
+        if on_output is not None:
+            stream = lambda text, cmd_index=cmd_index: on_output(chain_index, cmd_index, text)
+        status, output, err = await _run_one(semaphore, args, timeout, on_output=stream)
+        results.append((status, output, err, time.time() - time_start))
+        if on_done is not None:
+            on_done(chain_index, cmd_index, *results[-1])
+    return results
+
+async def _run_chains(chains_args, concurrency, on_done, on_output):
+    semaphore = asyncio.Semaphore(concurrency)
+    return await asyncio.gather(*[_run_chain(semaphore, i, chain, on_done, on_output)
+                                  for i, chain in enumerate(chains_args)])
+
+def _run_cmds(test_instance, cmds, concurrency, timeouts):
+    # cmds run in target system of run_cmd, eg. by ssh in multi-host mode
+    executor = utils_lib.get_executor(test_instance)
+    return _run_loop(_run_all([executor.command_args(x) for x in cmds], concurrency, timeouts))
+
+def gather_cmds(test_instance, cmds, concurrency=DEFAULT_CONCURRENCY, timeout=60):
+    '''
+    Run independent cmds concurrently without any check.
+    Arguments:
+        test_instance {Test instance} -- unittest.TestCase instance
+        cmds {list} -- cmds to run
+        concurrency {int} -- how many cmds run at the same time
+        timeout {int} -- kill cmd if it does not exit in timeout seconds, a
+                         cmd run by sudo is not killed if tests run as non-root
+    Return:
+        [(status, output)] in the same order as cmds, status and output are
+        None if cmd timeout
+    '''
+    test_instance.log.info("Run {} cmds concurrently(max {})".format(len(cmds), concurrency))
+    results = _run_cmds(test_instance, cmds, concurrency, [timeout] * len(cmds))
+    ret = []
+    for cmd, (status, output, err) in zip(cmds, results):
+        test_instance.log.info("CMD: %s", cmd)
+        if err is not None:
+            test_instance.log.error("Run cmd failed as %s" % err)
+        test_instance.log.info("CMD ret: {} out:{}".format(status, output))
+        ret.append((status, output))
+    return ret
+
+def run_cmds_async(test_instance, cmd_list, concurrency=DEFAULT_CONCURRENCY):
+    '''
+    Run independent read-only cmds concurrently and check them as run_cmd in
+    the listed order.
+    Arguments:
+        test_instance {Test instance} -- unittest.TestCase instance
+        cmd_list {list} -- dicts of run_cmd arguments, eg.
+                           {'cmd': 'uname -r', 'expect_ret': 0}
+        concurrency {int} -- how many cmds run at the same time
+    Return:
+        list of output, or ret code if ret_status is set in dict
+    '''
+    checks = ('expect_ret', 'expect_not_ret', 'expect_kw', 'expect_not_kw', 'expect_output',
+              'cancel_kw', 'cancel_not_kw', 'cancel_ret', 'cancel_not_ret')
+    test_instance.log.info("Run {} cmds concurrently(max {})".format(len(cmd_list), concurrency))
+    results = _run_cmds(test_instance, [x['cmd'] for x in cmd_list], concurrency,
+                        [x.get('timeout', 60) for x in cmd_list])
+    ret = []
+    for cmd_args, (status, output, err) in zip(cmd_list, results):
+        if cmd_args.get('msg') is not None:
+            test_instance.log.info(cmd_args['msg'])
+        test_instance.log.info("CMD: %s", cmd_args['cmd'])
+        if err is not None:
+            test_instance.log.error("Run cmd failed as %s" % err)
+        if cmd_args.get('is_log_output', True):
+            test_instance.log.info("CMD ret: {} out:{}".format(status, output))
+        else:
+            test_instance.log.info("CMD ret: {}".format(status))
+        utils_lib.verify_output(test_instance, output or '', status=status, msg=cmd_args.get('msg'),
+                                **dict((x, cmd_args[x]) for x in checks if x in cmd_args))
+        ret.append(status if cmd_args.get('ret_status') else output)
+    return ret
+
+def run_cmd_chains(test_instance, chains, concurrency=DEFAULT_CONCURRENCY, on_done=None, on_output=None):
+    '''
+    Run chains of cmds concurrently, cmds in one chain run one by one, eg. the
+    testcases of one LTP runtest file. No check is done.
+    Arguments:
+        test_instance {Test instance} -- unittest.TestCase instance
+        chains {list} -- lists of (cmd, timeout), a cmd run by sudo is not
+                         killed at timeout if tests run as non-root
+        concurrency {int} -- how many chains run at the same time
+        on_done {function} -- called in the loop as soon as a cmd finishes,
+                              as on_done(chain index, cmd index, status,
+                              output, error, duration)
+        on_output {function} -- called in the loop as output of a cmd comes,
+                                as on_output(chain index, cmd index, text)
+    Return:
+        lists of (status, output, error, duration) in the same order as
+        chains, status and output are None and error is set if cmd timeout
+    '''
+    executor = utils_lib.get_executor(test_instance)
+    chains_args = [[(executor.command_args(cmd), timeout) for cmd, timeout in chain] for chain in chains]
+    return _run_loop(_run_chains(chains_args, concurrency, on_done, on_output))
@@ -0,0 +1,368 @@
+import os
+import re
+import json
+import bisect
+import hashlib
+import tempfile
+
+# Lines similar over FAIL_RATE(%) are considered as the same one.
+FAIL_RATE = 70
+# 2*a/(a+b) > FAIL_RATE/100 only if a/b > LEN_RATIO
+LEN_RATIO = FAIL_RATE / (200.0 - FAIL_RATE)
+_FIRST_WORD = re.compile(r"\w{3,}")
+# branch in baseline entry, eg. rhel, rhel8, rhel8.3, rhel8.4-(8.4 and later)
+_BRANCH = re.compile(r"^([a-z]+)(\d+)?(?:\.(\d+))?(-)?$")
+# bump it when BaselineIndex changes to drop old on-disk cache
+CACHE_VERSION = 2
+
+def first_word(line):
+    '''
+    Get the first word which clean_sentence() starts to compare from.
+    Arguments:
+        line {string} -- log line or baseline content
+    Return:
+        the first word which is not shorter than 3 chars, None if no such word
+    '''
+    match = _FIRST_WORD.search(line)
+    if match is None:
+        return None
+    return match.group()
+
+def _bits_to_int(positions, size):
+    bitmap = bytearray((size + 8) // 8)
+    for pos in positions:
+        bitmap[pos >> 3] |= 1 << (pos & 7)
+    return int.from_bytes(bytes(bitmap), 'little')
+
+def max_rate(len1, len2):
+    '''
+    The highest similarity(%) difflib.SequenceMatcher.ratio() can report for
+    two strings in len1 and len2, as matched chars cannot exceed the shorter one.
+    '''
+    total = len1 + len2
+    if total == 0:
+        return 100.0
+    return 2.0 * min(len1, len2) / total * 100
+
+class BaselineIndex(object):
+    '''
+    Precompiled baseline entries for find_word.
+    clean_sentence() cuts the longer string from the first word of the shorter
+    one. The index knows where each entry would be cut, and uses the length of
+    both strings after cut to drop entries which can never reach FAIL_RATE.
+    Entries passed length check are checked by the longest common subsequence
+    (LCS), difflib matched chars are always a common subsequence, so it gives
+    the highest similarity difflib can get.
+    The candidates left are checked by difflib as before and in the baseline
+    file order, so the result is the same as comparing with all entries.
+    '''
+    # fields built from entries, saved in on-disk cache
+    COMPILED_FIELDS = ('groups', 'sorted_idxs', 'offsets', 'total_bits', 'char_masks', 'full_mask')
+
+    def __init__(self, baseline_dict, compiled=None):
+        self.keys = list(baseline_dict)
+        self.contents = [baseline_dict[key]["content"] for key in self.keys]
+        self.lengths = [len(content) for content in self.contents]
+        if compiled is None:
+            self._compile()
+        else:
+            for name in self.COMPILED_FIELDS:
+                setattr(self, name, compiled[name])
+            self.groups = [(word, lengths, idxs) for word, lengths, idxs in self.groups]
+        self.sorted_lengths = [self.lengths[x] for x in self.sorted_idxs]
+        self._cut_entries = {}
+        # matched result of compared lines, line -> (key, rate)
+        self.cache = {}
+
+    def __len__(self):
+        return len(self.keys)
+
+    def _compile(self):
+        # log line longer than entry: line is cut from the entry's first word,
+        # so entries are grouped by first word and sorted by length
+        groups = {}
+        for idx, content in enumerate(self.contents):
+            groups.setdefault(first_word(content), []).append(idx)
+        self.groups = []
+        for word, idxs in groups.items():
+            idxs.sort(key=lambda x: self.lengths[x])
+            self.groups.append((word, [self.lengths[x] for x in idxs], idxs))
+        # log line not longer than entry: entry is cut from the line's first word
+        self.sorted_idxs = sorted(range(len(self.contents)), key=lambda x: self.lengths[x])
+        self._compile_lcs()
+
+    def dump(self):
+        '''
+        Get compiled fields as json data, entries are not included and come
+        from baseline file when it is loaded.
+        Return:
+            dict
+        '''
+        data = dict((name, getattr(self, name)) for name in self.COMPILED_FIELDS)
+        data['keys'] = self.keys
+        return data
+
+    def _compile_lcs(self):
+        '''
+        Pack all reversed entries in one bit vector for bit-parallel LCS(Hyyro),
+        each entry is followed by a zero guard bit which stops the carry.
+        Cut strings are suffixes, so they are prefixes after reversed.
+        '''
+        self.offsets = []
+        char_positions = {}
+        segment_positions = []
+        offset = 0
+        for content in self.contents:
+            self.offsets.append(offset)
+            for pos, char in enumerate(reversed(content)):
+                char_positions.setdefault(char, []).append(offset + pos)
+                segment_positions.append(offset + pos)
+            offset += len(content) + 1
+        self.total_bits = offset
+        self.char_masks = {}
+        for char, positions in char_positions.items():
+            self.char_masks[char] = _bits_to_int(positions, offset)
+        self.full_mask = _bits_to_int(segment_positions, offset)
+
+    def _lcs_snapshots(self, line, steps):
+        '''
+        Run LCS of reversed line with all entries.
+        Arguments:
+            line {string} -- log line
+            steps {set} -- line suffix lengths to keep the bit vector
+        Return:
+            {suffix length: bit string, bit i is char i}
+        '''
+        full = self.full_mask
+        char_masks = self.char_masks
+        vector = full
+        snapshots = {}
+        for step, char in enumerate(reversed(line), 1):
+            mask = char_masks.get(char)
+            if mask is not None:
+                match = vector & mask
+                vector = ((vector + match) | (vector - match)) & full
+            if step in steps:
+                snapshots[step] = bin(vector)[:1:-1].ljust(self.total_bits, '0')
+        return snapshots
+
+    def _get_cut_entries(self, word):
+        '''
+        Entries containing word, sorted by their length after cut from word.
+        '''
+        if word not in self._cut_entries:
+            cut_entries = []
+            if word is not None:
+                for idx, content in enumerate(self.contents):
+                    pos = content.find(word)
+                    if pos >= 0:
+                        cut_entries.append((self.lengths[idx] - pos, idx))
+                cut_entries.sort()
+            self._cut_entries[word] = ([x[0] for x in cut_entries],
+                                       [x[1] for x in cut_entries],
+                                       set(x[1] for x in cut_entries))
+        return self._cut_entries[word]
+
+    def candidates(self, line):
+        '''
+        Get entries which may be similar to line over FAIL_RATE.
+        Arguments:
+            line {string} -- log line
+        Return:
+            list of entry index in baseline file order
+        '''
+        line_len = len(line)
+        # (entry index, line length after cut, entry length after cut)
+        checks = []
+        for word, lengths, idxs in self.groups:
+            cut_len = line_len
+            if word is not None:
+                cut_len = line_len - max(line.find(word), 0)
+            start = bisect.bisect_left(lengths, int(cut_len * LEN_RATIO) - 1)
+            end = min(bisect.bisect_left(lengths, line_len),
+                      bisect.bisect_right(lengths, int(cut_len / LEN_RATIO) + 1))
+            for i in range(start, end):
+                if max_rate(cut_len, lengths[i]) > FAIL_RATE:
+                    checks.append((idxs[i], cut_len, lengths[i]))
+        cut_lengths, cut_idxs, cut_set = self._get_cut_entries(first_word(line))
+        start = bisect.bisect_left(cut_lengths, int(line_len * LEN_RATIO) - 1)
+        end = bisect.bisect_right(cut_lengths, int(line_len / LEN_RATIO) + 1)
+        for i in range(start, end):
+            idx = cut_idxs[i]
+            if self.lengths[idx] >= line_len and max_rate(line_len, cut_lengths[i]) > FAIL_RATE:
+                checks.append((idx, line_len, cut_lengths[i]))
+        start = bisect.bisect_left(self.sorted_lengths, line_len)
+        end = bisect.bisect_right(self.sorted_lengths, int(line_len / LEN_RATIO) + 1)
+        for i in range(start, end):
+            idx = self.sorted_idxs[i]
+            if idx not in cut_set and max_rate(line_len, self.sorted_lengths[i]) > FAIL_RATE:
+                checks.append((idx, line_len, self.sorted_lengths[i]))
+        if not checks:
+            return []
+        snapshots = self._lcs_snapshots(line, set(x[1] for x in checks))
+        found = []
+        for idx, line_cut_len, entry_cut_len in checks:
+            offset = self.offsets[idx]
+            bits = snapshots[line_cut_len][offset:offset + entry_cut_len]
+            lcs = entry_cut_len - bits.count('1')
+            if 2.0 * lcs / (line_cut_len + entry_cut_len) * 100 > FAIL_RATE:
+                found.append(idx)
+        return sorted(found)
+
+def match_branch(entry_branch, os_id, os_version):
+    '''
+    Check whether baseline entry applies to the os.
+    Arguments:
+        entry_branch {string} -- "branch" of entry, split by ","
+        os_id {string} -- eg. rhel
+        os_version {string} -- eg. 8.4
+    Return:
+        True if it applies or the branch cannot be parsed
+    '''
+    if not entry_branch or not os_id:
+        return True
+    version = (os_version or '').split('.')
+    major = version[0] or None
+    minor = version[1] if len(version) > 1 else None
+    for branch in entry_branch.replace(' ', '').split(','):
+        match = _BRANCH.match(branch)
+        if match is None:
+            return True
+        name, entry_major, entry_minor, later = match.groups()
+        if name != os_id:
+            continue
+        if entry_major is None or major is None:
+            return True
+        if entry_major != major:
+            continue
+        if entry_minor is None or minor is None or not minor.isdigit():
+            return True
+        if later and int(minor) >= int(entry_minor):
+            return True
+        if not later and int(minor) == int(entry_minor):
+            return True
+    return False
+
+def get_log_source(log_cmd):
+    '''
+    Get which log log_cmd reads, "dmesg", "journal" or None if unknown.
+    '''
+    if log_cmd is None:
+        return None
+    if 'journalctl' in log_cmd:
+        return 'journal'
+    if 'dmesg' in log_cmd:
+        return 'dmesg'
+    return None
+
+def match_source(entry_path, source):
+    '''
+    Check whether baseline entry can be found in log source. Kernel messages
+    are in journal too, so only dmesg drops journal entries.
+    '''
+    if source != 'dmesg' or not entry_path:
+        return True
+    return 'dmesg' in entry_path
+
+class BaselineStore(object):
+    '''
+    Baseline file loaded once per process and reloaded when its mtime changes.
+    Entries are scoped by branch and log source, each scope keeps its own
+    BaselineIndex, which is also cached in cache_dir if it is set. The cache
+    is plain json checked against the baseline file, so a file planted in a
+    shared cache_dir cannot run code.
+    '''
+    def __init__(self, baseline_file, cache_dir=None):
+        self.baseline_file = baseline_file
+        self.cache_dir = cache_dir
+        self.mtime = None
+        self.digest = None
+        self.baseline_dict = {}
+        self.os_ids = set()
+        self._scopes = {}
+
+    def _load(self, log):
+        mtime = os.stat(self.baseline_file).st_mtime
+        if mtime == self.mtime:
+            return
+        log.info("Loading baseline data file from {}".format(self.baseline_file))
+        with open(self.baseline_file, 'rb') as fh:
+            data = fh.read()
+        self.baseline_dict = json.loads(data.decode('utf-8'))
+        self.digest = hashlib.sha256(data).hexdigest()
+        self.mtime = mtime
+        self.os_ids = set()
+        for entry in self.baseline_dict.values():
+            for branch in (entry.get('branch') or '').replace(' ', '').split(','):
+                match = _BRANCH.match(branch)
+                if match is not None:
+                    self.os_ids.add(match.group(1))
+        self._scopes = {}
+
+    def _cache_file(self, scope):
+        scope_digest = hashlib.sha256(repr((CACHE_VERSION, scope)).encode('utf-8')).hexdigest()
+        return os.path.join(self.cache_dir, "baseline_{}_{}.json".format(self.digest[:16], scope_digest[:16]))
+
+    def _get_index(self, log, scope, scoped_dict):
+        if not self.cache_dir:
+            return BaselineIndex(scoped_dict)
+        cache_file = self._cache_file(scope)
+        try:
+            with open(cache_file, 'r') as fh:
+                data = json.load(fh)
+            if data['keys'] == list(scoped_dict):
+                index = BaselineIndex(scoped_dict, compiled=data)
+                log.info("Load baseline index from {}".format(cache_file))
+                return index
+        except Exception as err:
+            if os.path.exists(cache_file):
+                log.info("Cannot load baseline index from {}: {}".format(cache_file, err))
+        index = BaselineIndex(scoped_dict)
+        try:
+            os.makedirs(self.cache_dir, mode=0o700, exist_ok=True)
+            fd, tmp_file = tempfile.mkstemp(dir=self.cache_dir)
+            with os.fdopen(fd, 'w') as fh:
+                json.dump(index.dump(), fh)
+            os.replace(tmp_file, cache_file)
+            log.info("Save baseline index to {}".format(cache_file))
+        except (IOError, OSError) as err:
+            log.info("Cannot save baseline index to {}: {}".format(cache_file, err))
+        return index
+
+    def get(self, log, os_id=None, os_version=None, source=None):
+        '''
+        Get baseline entries apply to the os and log source.
+        Arguments:
+            log {Logger} -- logger
+            os_id {string} -- eg. rhel, no branch filter if baseline has no
+                              entry for it
+            os_version {string} -- eg. 8.4
+            source {string} -- "dmesg", "journal" or None
+        Return:
+            (baseline dict, BaselineIndex)
+        '''
+        self._load(log)
+        if os_id not in self.os_ids:
+            os_id, os_version = None, None
+        scope = (os_id, os_version, source)
+        if scope not in self._scopes:
+            scoped_dict = {}
+            for key, entry in self.baseline_dict.items():
+                if match_branch(entry.get('branch'), os_id, os_version) and match_source(entry.get('path'), source):
+                    scoped_dict[key] = entry
+            self._scopes[scope] = (scoped_dict, self._get_index(log, scope, scoped_dict))
+        scoped_dict = self._scopes[scope][0]
+        log.info("Use {} of {} baseline entries for os:{} version:{} log:{}".format(
+            len(scoped_dict), len(self.baseline_dict), os_id, os_version, source))
+        return self._scopes[scope]
+
+_STORES = {}
+
+def get_baseline_store(baseline_file, cache_dir=None):
+    '''
+    Get BaselineStore of baseline_file in this process.
+    '''
+    if baseline_file not in _STORES:
+        _STORES[baseline_file] = BaselineStore(baseline_file, cache_dir=cache_dir)
+    _STORES[baseline_file].cache_dir = cache_dir
+    return _STORES[baseline_file]
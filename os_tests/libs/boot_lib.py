@@ -0,0 +1,171 @@
+import os
+import re
+import json
+import time
+import collections
+import os_tests
+from os_tests.libs import utils_lib
+from os_tests.libs import facts_lib
+
+# seconds of systemd timespan units
+_UNITS = collections.OrderedDict([('d', 86400), ('h', 3600), ('min', 60), ('s', 1), ('ms', 0.001),
+                                  ('us', 0.000001), ('µs', 0.000001)])
+_TIMESPAN = re.compile(r'([0-9.]+)\s*(d|h|min|ms|us|µs|s)(?![a-z])')
+_PHASE = re.compile(r'([0-9.]+[^()+=]*?)\s*\((\w+)\)')
+_BLAME = re.compile(r'^\s*((?:[0-9.]+\s*(?:d|h|min|ms|us|µs|s)\s*)+)(\S+)\s*$')
+_CHAIN = re.compile(r'^[\s│└├─|`-]*(\S+)\s+@(.+?)(?:\s+\+(.+?))?\s*$')
+
+BootProfile = collections.namedtuple('BootProfile', ['phases', 'units', 'critical_chain'])
+
+def parse_timespan(text):
+    '''
+    Parse systemd timespan, eg. "1min 2.345s", "850ms", "12us".
+    Return:
+        seconds, None if no timespan found
+    '''
+    spans = _TIMESPAN.findall(text)
+    if not spans:
+        return None
+    return round(sum(float(num) * _UNITS[unit] for num, unit in spans), 6)
+
+def parse_time(output):
+    '''
+    Parse "systemd-analyze time" output, eg.
+    Startup finished in 1.5s (kernel) + 2.1s (initrd) + 1min 4.2s (userspace) = 1min 7.8s
+    Return:
+        {phase: seconds} in boot order with "total"
+    '''
+    phases = collections.OrderedDict()
+    line = [x for x in output.split('\n') if 'Startup finished in' in x]
+    if not line:
+        return phases
+    spans, _, total = line[0].split('Startup finished in', 1)[1].partition('=')
+    for span, phase in _PHASE.findall(spans):
+        phases[phase] = parse_timespan(span)
+    phases['total'] = parse_timespan(total)
+    return phases
+
+def parse_blame(output):
+    '''
+    Parse "systemd-analyze blame" output, one "<timespan> <unit>" per line.
+    Return:
+        {unit: seconds} in blame order
+    '''
+    units = collections.OrderedDict()
+    for line in output.split('\n'):
+        match = _BLAME.match(line)
+        if match:
+            units[match.group(2)] = parse_timespan(match.group(1))
+    return units
+
+def parse_critical_chain(output):
+    '''
+    Parse "systemd-analyze critical-chain" output, eg.
+    graphical.target @14.2s
+    └─cloud-init.service @9.1s +4.2s
+    Return:
+        [(unit, activated after seconds, start seconds or None)] from target
+    '''
+    chain = []
+    for line in output.split('\n'):
+        match = _CHAIN.match(line)
+        if match is None:
+            continue
+        start = parse_timespan(match.group(3)) if match.group(3) else None
+        chain.append((match.group(1), parse_timespan(match.group(2)), start))
+    return chain
+
+def get_boot_profile(test_instance, timeout=60):
+    '''
+    Wait boot finished and get boot timings from systemd-analyze.
+    Arguments:
+        test_instance {Test instance} -- unittest.TestCase instance
+        timeout {int} -- fail if boot does not finish in timeout seconds
+    Return:
+        BootProfile
+    '''
+    utils_lib.run_cmd(test_instance, "sudo which systemd-analyze", expect_ret=0)
+    time_start = time.time()
+    while True:
+        output = utils_lib.run_cmd(test_instance, "sudo systemd-analyze time")
+        if 'Bootup is not yet finished' not in output:
+            break
+        utils_lib.run_cmd(test_instance, 'sudo systemctl list-jobs')
+        if time.time() - time_start > timeout:
+            test_instance.fail("Bootup is not yet finished after {}s".format(timeout))
+        test_instance.log.info("Wait for bootup finish......")
+        time.sleep(1)
+    phases = parse_time(output)
+    if not phases.get('total'):
+        test_instance.fail("Cannot get boot time from: {}".format(output))
+    units = parse_blame(utils_lib.run_cmd(test_instance, "sudo systemd-analyze blame", expect_ret=0,
+                                          is_log_output=False))
+    chain = parse_critical_chain(utils_lib.run_cmd(test_instance, "sudo systemd-analyze critical-chain"))
+    test_instance.log.info("Boot phases: {}".format(', '.join("{} {:.3f}s".format(k, v) for k, v in phases.items())))
+    test_instance.log.info("Slowest units: {}".format(
+        ', '.join("{} {:.3f}s".format(k, v) for k, v in list(units.items())[:10])))
+    test_instance.log.info("Critical chain: {}".format(' <- '.join(
+        "{}@{:.3f}s{}".format(unit, at, '+{:.3f}s'.format(start) if start is not None else '')
+        for unit, at, start in chain)))
+    return BootProfile(phases, units, chain)
+
+def load_boot_baseline(test_instance, instance_type):
+    '''
+    Get boot baseline of instance type from "boot_baseline_file", the
+    package data file by default.
+    Return:
+        {'phases': {phase: seconds}, 'units': {unit: seconds}}, None if
+        instance type has no baseline
+    '''
+    baseline_file = test_instance.params.get('boot_baseline_file') or \
+        os.path.dirname(os_tests.__file__) + "/data/boot_baseline.json"
+    if not os.path.exists(baseline_file):
+        return None
+    with open(baseline_file, 'r') as fh:
+        return json.load(fh).get(instance_type)
+
+def compare_boot_profile(profile, baseline, ratio=50, min_delta=1.0):
+    '''
+    Compare boot phases and units with baseline.
+    Arguments:
+        profile {BootProfile} -- current boot timings
+        baseline {dict} -- {'phases': {phase: seconds}, 'units': {unit: seconds}}
+        ratio {int} -- allowed increase in percent
+        min_delta {float} -- increase smaller than it in seconds is ignored
+    Return:
+        [(name, seconds, baseline seconds)] of regressed phases and units,
+        slowest increase first
+    '''
+    regressed = []
+    for current, base in ((profile.phases, baseline.get('phases', {})), (profile.units, baseline.get('units', {}))):
+        for name, seconds in current.items():
+            if name not in base or seconds is None:
+                continue
+            if seconds - base[name] > min_delta and seconds > base[name] * (1 + ratio / 100.0):
+                regressed.append((name, seconds, base[name]))
+    return sorted(regressed, key=lambda x: x[2] - x[1])
+
+def check_boot_profile(test_instance, profile):
+    '''
+    Compare boot timings with baseline of this instance type, fail naming the
+    regressed phases and units. Current timings are saved as
+    "boot_profile.json" in results_dir in baseline format.
+    Arguments:
+        test_instance {Test instance} -- unittest.TestCase instance
+        profile {BootProfile} -- current boot timings
+    '''
+    instance_type = facts_lib.get_facts().instance_type or 'default'
+    profile_file = os.path.join(test_instance.params['results_dir'], 'boot_profile.json')
+    with open(profile_file, 'w') as fh:
+        json.dump({instance_type: {'phases': profile.phases, 'units': profile.units}}, fh, indent=2)
+    test_instance.log.info("Boot profile saved to {}".format(profile_file))
+    baseline = load_boot_baseline(test_instance, instance_type)
+    if baseline is None:
+        test_instance.log.info("No boot baseline of {}, skip unit comparison".format(instance_type))
+        return
+    regressed = compare_boot_profile(profile, baseline, ratio=test_instance.params.get('boot_regress_ratio', 50),
+                                     min_delta=test_instance.params.get('boot_regress_min_delta', 1.0))
+    if regressed:
+        test_instance.fail("Boot regressed on {}: {}".format(instance_type, ', '.join(
+            "{} {:.3f}s(baseline {:.3f}s)".format(name, seconds, base) for name, seconds, base in regressed)))
+    test_instance.log.info("No boot phase or unit regressed against {} baseline".format(instance_type))
@@ -0,0 +1,143 @@
+import os
+import re
+import time
+import errno
+import collections
+from os_tests.libs import utils_lib
+from os_tests.libs import journal_lib
+
+KMSG = '/dev/kmsg'
+# log_cmd which can be served by /dev/kmsg, {cmd: human readable time or not}
+KMSG_CMDS = {"dmesg": False, "dmesg -T": True}
+# cursor kinds
+JOURNAL = 'journal'
+KMSG_SEQ = 'kmsg'
+TEXT = 'text'
+
+KmsgRecord = collections.namedtuple('KmsgRecord', ['seq', 'ts_usec', 'text'])
+_KMSG_ESCAPE = re.compile(r'\\x([0-9a-fA-F]{2})')
+
+class LogCursor(object):
+    '''
+    Where a case starts to check log.
+    Attributes:
+        log_cmd {string} -- the command to get log
+        kind {string} -- JOURNAL(journal cursor), KMSG_SEQ(kmsg sequence number)
+                         or TEXT(the last line as get_cmd_cursor())
+        position -- journal cursor, sequence number or line text
+    '''
+    def __init__(self, log_cmd, kind, position):
+        self.log_cmd = log_cmd
+        self.kind = kind
+        self.position = position
+
+    def __repr__(self):
+        return "LogCursor({}, {}, {})".format(self.log_cmd, self.kind, self.position)
+
+def read_kmsg(after_seq=None):
+    '''
+    Read kernel messages from /dev/kmsg without blocking.
+    Arguments:
+        after_seq {int} -- only return messages after this sequence number
+    Return:
+        list of KmsgRecord
+    Raise:
+        OSError if /dev/kmsg is not readable, eg. no permission
+    '''
+    records = []
+    fd = os.open(KMSG, os.O_RDONLY | os.O_NONBLOCK)
+    try:
+        while True:
+            try:
+                data = os.read(fd, 16384)
+            except OSError as err:
+                if err.errno == errno.EAGAIN:
+                    break
+                if err.errno == errno.EPIPE:
+                    # the record was overwritten in ring buffer, read the next
+                    continue
+                raise
+            if not data:
+                break
+            header, _, body = data.decode('utf-8', errors='replace').partition(';')
+            fields = header.split(',')
+            seq = int(fields[1])
+            if after_seq is not None and seq <= after_seq:
+                continue
+            message = _KMSG_ESCAPE.sub(lambda x: chr(int(x.group(1), 16)), body.split('\n', 1)[0])
+            records.append(KmsgRecord(seq, int(fields[2]), message))
+    finally:
+        os.close(fd)
+    return records
+
+def kmsg_text(records, human_time=False):
+    '''
+    Format kmsg records as dmesg outputs.
+    Arguments:
+        records {list} -- KmsgRecord list
+        human_time {bool} -- format time as "dmesg -T"
+    Return:
+        text
+    '''
+    boot_time = None
+    if human_time:
+        with open('/proc/uptime', 'r') as fh:
+            boot_time = time.time() - float(fh.read().split()[0])
+    lines = []
+    for record in records:
+        if boot_time is None:
+            stamp = "{:5d}.{:06d}".format(record.ts_usec // 1000000, record.ts_usec % 1000000)
+        else:
+            stamp = time.strftime('%a %b %e %H:%M:%S %Y', time.localtime(boot_time + record.ts_usec / 1000000.0))
+        lines.append("[{}] {}\n".format(stamp, record.text))
+    return ''.join(lines)
+
+def get_log_cursor(test_instance, log_cmd='dmesg -T'):
+    '''
+    Get the cursor of log_cmd now, journal cursor is used for journal and
+    /dev/kmsg sequence number is used for dmesg. Fall back to the last line
+    text if they are not available or cmds run in remote host.
+    Arguments:
+        test_instance {Test instance} -- unittest.TestCase instance
+        log_cmd {string} -- the command to get log
+    Return:
+        LogCursor
+    '''
+    if log_cmd in journal_lib.JOURNAL_CMDS:
+        cursor = journal_lib.get_cursor(test_instance)
+        if cursor is not None:
+            return LogCursor(log_cmd, JOURNAL, cursor)
+    elif log_cmd in KMSG_CMDS and utils_lib.get_executor(test_instance).is_local:
+        try:
+            records = read_kmsg()
+        except OSError as err:
+            test_instance.log.info("Cannot read {}: {}, use text cursor".format(KMSG, err))
+        else:
+            seq = records[-1].seq if records else -1
+            test_instance.log.info("Get kmsg cursor: {}".format(seq))
+            return LogCursor(log_cmd, KMSG_SEQ, seq)
+    return LogCursor(log_cmd, TEXT, utils_lib.get_cmd_cursor(test_instance, cmd=log_cmd))
+
+def get_text_after(test_instance, cursor, log_cmd=None):
+    '''
+    Get log logged after cursor, only new messages are read.
+    Arguments:
+        test_instance {Test instance} -- unittest.TestCase instance
+        cursor {LogCursor} -- JOURNAL or KMSG_SEQ cursor
+        log_cmd {string} -- the text is formatted as log_cmd outputs,
+                            cursor.log_cmd by default
+    Return:
+        log text
+    '''
+    if log_cmd is None:
+        log_cmd = cursor.log_cmd
+    if cursor.kind == JOURNAL:
+        return journal_lib.get_text_after(test_instance, cursor.position, log_cmd=log_cmd)
+    if cursor.kind == KMSG_SEQ:
+        records = read_kmsg(after_seq=cursor.position)
+        if records and records[0].seq > cursor.position + 1:
+            test_instance.log.info("{} messages after cursor are overwritten in ring buffer".format(
+                records[0].seq - cursor.position - 1))
+        test_instance.log.info("Got {} kmsg records after cursor".format(len(records)))
+        return kmsg_text(records, human_time=KMSG_CMDS.get(log_cmd, False))
+    raise ValueError("Cannot read log after {} cursor".format(cursor.kind))
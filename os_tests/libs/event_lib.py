@@ -0,0 +1,148 @@
+import os
+import json
+import time
+import uuid
+import resource
+
+# event file of the session, worker processes inherit it from env
+EVENT_FILE_ENV = 'OS_TESTS_EVENT_FILE'
+CMD = 'cmd'
+CASE = 'case'
+# case running in this process, cmds run by executors are recorded under it
+_CASE = {'test': None, 'host': None}
+
+def get_event_file(results_dir=None):
+    '''
+    Get event file of this session, a new one is created in results_dir in
+    the first call and shared with child processes by env.
+    Arguments:
+        results_dir {string} -- dir to save event file
+    Return:
+        event file path, None if it is not set and results_dir is None
+    '''
+    event_file = os.environ.get(EVENT_FILE_ENV)
+    if event_file is None and results_dir is not None:
+        os.makedirs(results_dir, exist_ok=True)
+        event_file = os.path.join(results_dir, "events_{}_{}.jsonl".format(
+            time.strftime('%Y%m%d%H%M%S'), uuid.uuid4().hex[:8]))
+        os.environ[EVENT_FILE_ENV] = event_file
+    return event_file
+
+def children_cpu():
+    '''
+    CPU time used by finished child processes of this process, cmds run in a
+    long-lived shell or remote host are not counted.
+    Return:
+        (user seconds, system seconds)
+    '''
+    usage = resource.getrusage(resource.RUSAGE_CHILDREN)
+    return usage.ru_utime, usage.ru_stime
+
+def set_case(test_instance):
+    '''
+    Set case running in this process, None when it finishes.
+    '''
+    params = getattr(test_instance, 'params', None) or {}
+    _CASE['test'] = test_instance.id() if test_instance is not None else None
+    _CASE['host'] = params.get('remote_host')
+
+def record(test_instance, event):
+    '''
+    Append an event to event file of the session.
+    Arguments:
+        test_instance {Test instance} -- unittest.TestCase instance, None for
+                                         the case set by set_case
+        event {dict} -- event fields
+    '''
+    params = getattr(test_instance, 'params', None) or {}
+    event_file = get_event_file(params.get('results_dir'))
+    if event_file is None:
+        return
+    if test_instance is not None:
+        event['test'] = test_instance.id()
+        host = params.get('remote_host')
+    else:
+        event['test'] = _CASE['test']
+        host = _CASE['host']
+    event['pid'] = os.getpid()
+    event['time'] = time.time()
+    if host:
+        event['host'] = host
+    # one write per line, lines from processes do not mix in append mode
+    with open(event_file, 'a') as fh:
+        fh.write(json.dumps(event) + '\n')
+
+def record_cmd(test_instance, cmd, wall, cpu_start, output, status, cached=False):
+    '''
+    Record one cmd run by an executor, run_cmd_stream or async_lib.
+    Arguments:
+        test_instance {Test instance} -- unittest.TestCase instance, None for
+                                         the case set by set_case
+        cmd {string} -- cmd
+        wall {float} -- wall time in seconds
+        cpu_start {tuple} -- children_cpu() before cmd run, None if cmds run
+                             concurrently and cpu time cannot be split
+        output {string} -- cmd output
+        status {int} -- return status, None if cmd timeout or fails to run
+        cached {bool} -- output got from cmd cache
+    '''
+    cpu_end = children_cpu()
+    cpu_start = cpu_start or cpu_end
+    record(test_instance, {'type': CMD, 'cmd': cmd, 'wall': wall,
+                           'utime': cpu_end[0] - cpu_start[0], 'stime': cpu_end[1] - cpu_start[1],
+                           'bytes': len(output.encode('utf-8', errors='replace')) if output is not None else 0,
+                           'status': status, 'cached': cached})
+
+def record_case(test_instance, time_start):
+    '''
+    Record case duration, called as cleanup of case.
+    '''
+    record(test_instance, {'type': CASE, 'wall': time.time() - time_start})
+    set_case(None)
+
+def load_events(event_file):
+    '''
+    Load events, broken lines are skipped.
+    '''
+    events = []
+    with open(event_file, 'r') as fh:
+        for line in fh:
+            try:
+                events.append(json.loads(line))
+            except ValueError:
+                continue
+    return events
+
+def summarize(event_file, top=10):
+    '''
+    Summarize the slowest cmds and cases of a session.
+    Arguments:
+        event_file {string} -- event file
+        top {int} -- how many cmds and cases to show
+    Return:
+        summary text
+    '''
+    events = load_events(event_file)
+    cmds = {}
+    cases = []
+    for event in events:
+        if event['type'] == CMD:
+            stats = cmds.setdefault(event['cmd'], {'calls': 0, 'wall': 0.0, 'max': 0.0, 'cpu': 0.0, 'bytes': 0})
+            stats['calls'] += 1
+            stats['wall'] += event['wall']
+            stats['max'] = max(stats['max'], event['wall'])
+            stats['cpu'] += event['utime'] + event['stime']
+            stats['bytes'] += event['bytes']
+        elif event['type'] == CASE:
+            cases.append(event)
+    lines = ["Top {} slowest cmds(total wall, calls, max wall, child cpu, output bytes):".format(top)]
+    for cmd, stats in sorted(cmds.items(), key=lambda x: -x[1]['wall'])[:top]:
+        lines.append("  {:>8.2f}s {:>5} {:>8.2f}s {:>8.2f}s {:>10} {}".format(
+            stats['wall'], stats['calls'], stats['max'], stats['cpu'], stats['bytes'],
+            cmd.strip().replace('\n', ' ')[:80]))
+    lines.append("Top {} slowest cases:".format(top))
+    for event in sorted(cases, key=lambda x: -x['wall'])[:top]:
+        lines.append("  {:>8.2f}s {}{}".format(event['wall'], event['test'],
+                                               " ({})".format(event['host']) if event.get('host') else ''))
+    lines.append("Events saved in {}".format(event_file))
+    return '\n'.join(lines)
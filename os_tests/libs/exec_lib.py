@@ -0,0 +1,333 @@
+import os
+import uuid
+import time
+import shlex
+import atexit
+import select
+import signal
+import tempfile
+import threading
+import subprocess
+from os_tests.libs import event_lib
+
+# executor names in "cmd_executor" of config file
+LOCAL = 'local'
+SHELL = 'shell'
+SSH = 'ssh'
+# host name which is served by a local shell as remote host, for testing
+# multi-host mode without ssh, eg. local, local1, local2
+LOCAL_HOST = 'local'
+# shell session runs sudo directly as root, options and env assignment still
+# go to real sudo
+_SUDO_FUNC = '''sudo() {
+    case "$1" in
+        -*|*=*) command sudo "$@" ;;
+        *) "$@" ;;
+    esac
+}
+'''
+
+def _quote(path):
+    return "'{}'".format(path.replace("'", "'\\''"))
+
+class Executor(object):
+    '''
+    Base of executors, file helpers run cmds by run(), so they work in the
+    target system.
+    Attributes:
+        name {string} -- executor name
+        is_local {bool} -- whether cmds run in this system, helpers which read
+                           local files directly(eg. /dev/kmsg) only work in it
+    '''
+    name = None
+    is_local = True
+
+    def run(self, cmd, timeout=60):
+        '''
+        Run cmd, each run is recorded as a cmd event of the session.
+        Arguments:
+            cmd {string} -- cmd to run
+            timeout {int} -- raise subprocess.TimeoutExpired if cmd does not
+                             exit in timeout seconds
+        Return:
+            (status, output)
+        '''
+        time_start = time.time()
+        cpu_start = event_lib.children_cpu()
+        status, output = None, None
+        try:
+            status, output = self._run(cmd, timeout=timeout)
+        finally:
+            event_lib.record_cmd(None, cmd, time.time() - time_start, cpu_start, output, status)
+        return status, output
+
+    def _run(self, cmd, timeout=60):
+        raise NotImplementedError
+
+    def command_args(self, cmd):
+        '''
+        Get args for subprocess.Popen to run cmd in target system, used when
+        output is read as stream or cmds run concurrently.
+        '''
+        return ['/bin/sh', '-c', cmd]
+
+    def read_file(self, path):
+        '''
+        Read a file, return None if it is not readable.
+        '''
+        status, output = self.run("cat {}".format(_quote(path)))
+        if status != 0:
+            return None
+        return output
+
+    def iter_lines(self, path):
+        '''
+        Iterate complete lines of a file as they are read, the file is never
+        held in memory at once. Nothing is yielded if it is not readable.
+        '''
+        proc = subprocess.Popen(self.command_args("cat {}".format(_quote(path))), stdout=subprocess.PIPE,
+                                stderr=subprocess.DEVNULL, universal_newlines=True, encoding='utf-8',
+                                errors='replace')
+        try:
+            for line in proc.stdout:
+                # the last piece is not a complete line
+                if line.endswith('\n'):
+                    yield line
+        finally:
+            proc.stdout.close()
+            proc.wait()
+
+    def list_dir(self, path):
+        '''
+        List names in a dir, return None if it is not a dir.
+        '''
+        status, output = self.run("ls -1A {}".format(_quote(path)))
+        if status != 0:
+            return None
+        return [x for x in output.split('\n') if x]
+
+    def real_path(self, path):
+        '''
+        Resolve symlinks in path, return None if it does not exist.
+        '''
+        status, output = self.run("readlink -e {}".format(_quote(path)))
+        if status != 0:
+            return None
+        return output.strip()
+
+    def remove_file(self, path):
+        self.run("rm -f {}".format(_quote(path)))
+
+    def close(self):
+        pass
+
+class LocalExecutor(Executor):
+    '''
+    Run each cmd in a new shell as subprocess.run(shell=True).
+    '''
+    name = LOCAL
+
+    def _run(self, cmd, timeout=60):
+        ret = subprocess.run(cmd, shell=True, stdout=subprocess.PIPE, stderr=subprocess.STDOUT, timeout=timeout, encoding='utf-8')
+        return ret.returncode, ret.stdout
+
+    def read_file(self, path):
+        try:
+            with open(path, 'r', encoding='utf-8', errors='replace') as fh:
+                return fh.read()
+        except (IOError, OSError):
+            return None
+
+    def iter_lines(self, path):
+        try:
+            with open(path, 'r', encoding='utf-8', errors='replace') as fh:
+                for line in fh:
+                    if line.endswith('\n'):
+                        yield line
+        except (IOError, OSError):
+            return
+
+    def list_dir(self, path):
+        try:
+            return os.listdir(path)
+        except (IOError, OSError):
+            return None
+
+    def real_path(self, path):
+        if not os.path.exists(path):
+            return None
+        return os.path.realpath(path)
+
+    def remove_file(self, path):
+        if os.path.exists(path):
+            os.unlink(path)
+
+class ShellExecutor(Executor):
+    '''
+    Run cmds in one long-lived shell to save fork/exec of a new shell and PAM
+    session of sudo in each run. Each cmd is passed by a quoted here-document
+    and runs by eval in a subshell with stdin from /dev/null, so cd, exit or
+    variables in one cmd do not affect others. Output ends with a random
+    sentinel line carrying the exit status. The shell is killed if a cmd
+    timeout and started again in the next run.
+    It serves LOCAL_HOST in multi-host mode with is_local False.
+    '''
+    name = SHELL
+
+    def __init__(self, shell='/bin/sh', is_local=True):
+        self.shell = shell
+        self.is_local = is_local
+        self.proc = None
+        self.lock = threading.Lock()
+        self.spawned = 0
+
+    def _spawn(self):
+        self.proc = subprocess.Popen([self.shell], stdin=subprocess.PIPE, stdout=subprocess.PIPE,
+                                     stderr=subprocess.STDOUT, start_new_session=True)
+        self.spawned += 1
+        if os.geteuid() == 0:
+            self.proc.stdin.write(_SUDO_FUNC.encode('utf-8'))
+            self.proc.stdin.flush()
+
+    def close(self):
+        '''
+        Kill the shell.
+        '''
+        if self.proc is None:
+            return
+        try:
+            os.killpg(self.proc.pid, signal.SIGKILL)
+        except OSError:
+            pass
+        self.proc.wait()
+        self.proc.stdin.close()
+        self.proc.stdout.close()
+        self.proc = None
+
+    def _run(self, cmd, timeout=60):
+        '''
+        Run cmd in the shell session, see Executor.run.
+        '''
+        with self.lock:
+            if self.proc is None or self.proc.poll() is not None:
+                self.close()
+                self._spawn()
+            sentinel = uuid.uuid4().hex
+            script = ("__os_tests_cmd=$(cat <<'{0}'\n{1}\n{0}\n)\n"
+                      "( eval \"$__os_tests_cmd\" ) </dev/null 2>&1\n"
+                      "printf '\\n{0} %d\\n' $?\n").format(sentinel, cmd)
+            end_mark = "\n{} ".format(sentinel).encode('utf-8')
+            fd = self.proc.stdout.fileno()
+            deadline = time.time() + timeout
+            data = bytearray()
+            try:
+                self.proc.stdin.write(script.encode('utf-8'))
+                self.proc.stdin.flush()
+                while True:
+                    # the last line is sentinel and status
+                    if data.endswith(b'\n'):
+                        pos = data.rfind(b'\n', 0, len(data) - 1)
+                        if pos >= 0 and data.startswith(end_mark, pos):
+                            status = int(data[pos + len(end_mark):-1])
+                            return status, bytes(data[:pos]).decode('utf-8', errors='replace')
+                    wait = deadline - time.time()
+                    if wait <= 0:
+                        raise subprocess.TimeoutExpired(cmd, timeout)
+                    readable, _, _ = select.select([fd], [], [], wait)
+                    if readable:
+                        chunk = os.read(fd, 65536)
+                        if not chunk:
+                            raise RuntimeError("shell session exited")
+                        data += chunk
+            except BaseException:
+                # the session state is unknown, start a new one in next run
+                self.close()
+                raise
+
+class SSHExecutor(Executor):
+    '''
+    Run cmds in remote host by ssh. All ssh sessions to a host share one
+    master connection(ControlMaster), so only the first one pays for
+    connecting and authentication.
+    '''
+    name = SSH
+    is_local = False
+
+    def __init__(self, host, ssh_key=None, ssh_options=None, control_dir=None):
+        '''
+        Arguments:
+            host {string} -- [user@]host[:port]
+            ssh_key {string} -- private key file
+            ssh_options {string} -- extra ssh options
+            control_dir {string} -- dir of master connection sockets
+        '''
+        self.host = host
+        target, _, port = host.partition(':')
+        control_path = os.path.join(control_dir or tempfile.gettempdir(), 'os_tests_ssh_%C')
+        self.ssh_args = ['ssh', '-o', 'BatchMode=yes', '-o', 'ControlMaster=auto',
+                         '-o', 'ControlPath={}'.format(control_path), '-o', 'ControlPersist=600']
+        if port:
+            self.ssh_args += ['-p', port]
+        if ssh_key:
+            self.ssh_args += ['-i', ssh_key]
+        if ssh_options:
+            self.ssh_args += shlex.split(ssh_options)
+        self.ssh_args.append(target)
+
+    def command_args(self, cmd):
+        return self.ssh_args + ['--', cmd]
+
+    def _run(self, cmd, timeout=60):
+        ret = subprocess.run(self.command_args(cmd), stdout=subprocess.PIPE, stderr=subprocess.STDOUT,
+                             timeout=timeout, encoding='utf-8', errors='replace')
+        return ret.returncode, ret.stdout
+
+    def close(self):
+        '''
+        Stop the master connection.
+        '''
+        subprocess.run(self.ssh_args[:-1] + ['-O', 'exit', self.ssh_args[-1]],
+                       stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+
+_EXECUTORS = {}
+
+def get_executor(name=LOCAL, host=None, ssh_key=None, ssh_options=None):
+    '''
+    Get executor of this process.
+    Arguments:
+        name {string} -- LOCAL, SHELL or SSH
+        host {string} -- remote host of SSH executor, a LOCAL_HOST name is
+                         served by a local shell
+        ssh_key {string} -- private key file of SSH executor
+        ssh_options {string} -- extra ssh options of SSH executor
+    Return:
+        executor
+    '''
+    key = (name, host)
+    if key not in _EXECUTORS:
+        if name == SSH and is_local_host(host):
+            _EXECUTORS[key] = ShellExecutor(is_local=False)
+        elif name == SSH:
+            _EXECUTORS[key] = SSHExecutor(host, ssh_key=ssh_key, ssh_options=ssh_options)
+        elif name == SHELL:
+            _EXECUTORS[key] = ShellExecutor()
+        elif name == LOCAL:
+            _EXECUTORS[key] = LocalExecutor()
+        else:
+            raise ValueError("Unknown cmd_executor {}".format(name))
+    return _EXECUTORS[key]
+
+def is_local_host(host):
+    '''
+    Check whether host is a LOCAL_HOST name.
+    '''
+    if host is None or not host.startswith(LOCAL_HOST):
+        return False
+    suffix = host[len(LOCAL_HOST):]
+    return suffix == '' or suffix.isdigit()
+
+def close_executors():
+    for executor in _EXECUTORS.values():
+        executor.close()
+
+atexit.register(close_executors)
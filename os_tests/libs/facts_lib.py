@@ -0,0 +1,169 @@
+import os
+from os_tests.libs import exec_lib
+
+DMI_DIR = '/sys/devices/virtual/dmi/id'
+NET_DIR = '/sys/class/net'
+# dmi sys_vendor or product_name keyword -> hypervisor
+HYPERVISOR_VENDORS = [('KVM', 'kvm'), ('QEMU', 'kvm'), ('Amazon EC2', 'kvm'),
+                      ('Xen', 'xen'), ('VMware', 'vmware'), ('Microsoft', 'hyperv'),
+                      ('Google', 'kvm'), ('OpenStack', 'kvm')]
+
+class SystemFacts(object):
+    '''
+    Host identity collected once from /proc and /sys, files are read directly
+    in local system and by cmds of executor in remote host.
+    Attributes:
+        arch {string} -- eg. x86_64, aarch64
+        kernel {string} -- kernel release
+        cpu_vendor {string} -- eg. GenuineIntel, AuthenticAMD, None in arm
+        cpu_flags {set} -- cpu flags in /proc/cpuinfo
+        hypervisor {string} -- kvm, xen, vmware, hyperv, unknown or None if not found
+        cloud {string} -- aws, azure, gcp, openstack or None
+        is_metal {bool} -- True in bare metal, None if cannot tell
+        mem_total_kb {int} -- MemTotal in /proc/meminfo
+        nic_drivers {dict} -- {nic: driver}
+        dmi {dict} -- {name: content} of readable files in DMI_DIR
+        os_id {string} -- ID in /etc/os-release, eg. rhel, fedora
+        os_version {string} -- VERSION_ID in /etc/os-release, eg. 8.4
+        host {string} -- remote host, None in local system
+    '''
+    def __init__(self, executor=None):
+        '''
+        Arguments:
+            executor {exec_lib executor} -- executor of target system, local
+                                            system by default
+        '''
+        if executor is None:
+            executor = exec_lib.LocalExecutor()
+        self.host = getattr(executor, 'host', None)
+        if executor.is_local:
+            uname = os.uname()
+            self.arch, self.kernel = uname.machine, uname.release
+        else:
+            _, output = executor.run('uname -m -r')
+            self.kernel, self.arch = (output.split() + [None, None])[:2]
+        def read(path):
+            # stripped content, None if it is not readable
+            return (executor.read_file(path) or '').strip() or None
+        self._parse_cpuinfo(read('/proc/cpuinfo') or '')
+        self._parse_meminfo(read('/proc/meminfo') or '')
+        self._parse_os_release(read('/etc/os-release') or '')
+        self.dmi = {}
+        for name in executor.list_dir(DMI_DIR) or []:
+            content = read(os.path.join(DMI_DIR, name))
+            if content is not None:
+                self.dmi[name] = content
+        self.hypervisor = self._get_hypervisor(read('/sys/hypervisor/type'))
+        self.cloud = self._get_cloud()
+        self.is_metal = self._get_metal()
+        self.nic_drivers = {}
+        for nic in executor.list_dir(NET_DIR) or []:
+            driver = executor.real_path(os.path.join(NET_DIR, nic, 'device', 'driver'))
+            if driver is not None:
+                self.nic_drivers[nic] = os.path.basename(driver)
+
+    def _parse_cpuinfo(self, cpuinfo):
+        self.cpu_vendor = None
+        self.cpu_flags = set()
+        for line in cpuinfo.split('\n'):
+            if ':' not in line:
+                if self.cpu_flags:
+                    # the first processor is enough
+                    break
+                continue
+            key, value = [x.strip() for x in line.split(':', 1)]
+            if key == 'vendor_id':
+                self.cpu_vendor = value
+            elif key in ('flags', 'Features'):
+                self.cpu_flags = set(value.split())
+
+    def _parse_meminfo(self, meminfo):
+        self.mem_total_kb = 0
+        for line in meminfo.split('\n'):
+            if line.startswith('MemTotal:'):
+                self.mem_total_kb = int(line.split()[1])
+                break
+
+    def _parse_os_release(self, os_release):
+        release = {}
+        for line in os_release.split('\n'):
+            if '=' in line:
+                key, value = line.split('=', 1)
+                release[key.strip()] = value.strip().strip('"\'')
+        self.os_id = release.get('ID')
+        self.os_version = release.get('VERSION_ID')
+
+    @property
+    def branch(self):
+        '''
+        Branch name as baseline entries use, eg. rhel8.4, None if unknown.
+        '''
+        if not self.os_id:
+            return None
+        return "{}{}".format(self.os_id, self.os_version or '')
+
+    @property
+    def instance_type(self):
+        '''
+        Instance type in cloud(dmi product_name), eg. m5.large
+        '''
+        return self.dmi.get('product_name')
+
+    @property
+    def mem_gb(self):
+        return self.mem_total_kb / 1024 / 1024
+
+    def _get_hypervisor(self, hypervisor_type):
+        if hypervisor_type:
+            return hypervisor_type
+        if self.arch in ('x86_64', 'i686') and 'hypervisor' not in self.cpu_flags:
+            return None
+        vendor = "{} {}".format(self.dmi.get('sys_vendor', ''), self.dmi.get('product_name', ''))
+        for keyword, hypervisor in HYPERVISOR_VENDORS:
+            if keyword in vendor:
+                if keyword == 'Amazon EC2' and self.dmi.get('product_name', '').endswith('.metal'):
+                    return None
+                return hypervisor
+        if 'hypervisor' in self.cpu_flags:
+            return 'unknown'
+        return None
+
+    def _get_cloud(self):
+        bios = ' '.join([self.dmi.get(x, '') for x in ('bios_vendor', 'bios_version',
+                         'sys_vendor', 'product_version')]).lower()
+        if 'amazon' in bios:
+            return 'aws'
+        if self.dmi.get('chassis_asset_tag') == '7783-7084-3265-9085-8269-3286-77':
+            return 'azure'
+        if 'google' in bios:
+            return 'gcp'
+        if 'OpenStack' in self.dmi.get('product_name', ''):
+            return 'openstack'
+        return None
+
+    def _get_metal(self):
+        if self.hypervisor is not None:
+            return False
+        if self.arch in ('x86_64', 'i686'):
+            return True
+        if self.dmi.get('product_name', '').endswith('.metal'):
+            return True
+        # no hypervisor cpu flag in arm, cannot tell it from files
+        return None
+
+_FACTS = None
+
+def get_facts(refresh=False, executor=None):
+    '''
+    Get SystemFacts of this session, it is collected in the first call.
+    Arguments:
+        refresh {bool} -- collect it again
+        executor {exec_lib executor} -- executor of target system, local
+                                        system by default
+    Return:
+        SystemFacts
+    '''
+    global _FACTS
+    if _FACTS is None or refresh:
+        _FACTS = SystemFacts(executor=executor)
+    return _FACTS
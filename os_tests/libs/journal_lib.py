@@ -0,0 +1,253 @@
+import os
+import json
+import time
+import datetime
+import tempfile
+import collections
+from os_tests.libs import utils_lib
+
+# log_cmd which can be served by journal snapshot, {cmd: since today or not}
+JOURNAL_CMDS = {"journalctl --since today": True, "journalctl": False}
+
+# unit file suffixes systemd can load
+UNIT_SUFFIXES = ('.service', '.socket', '.target', '.timer', '.path', '.mount',
+                 '.automount', '.swap', '.slice', '.scope', '.device')
+# units loaded by one "systemctl show"
+UNIT_CHUNK = 100
+
+JournalRecord = collections.namedtuple('JournalRecord',
+    ['cursor', 'realtime', 'systemd_unit', 'unit', 'pid', 'text'])
+
+def _field(entry, name):
+    value = entry.get(name)
+    if isinstance(value, list):
+        # binary field is exported as byte array
+        value = bytes(value).decode('utf-8', errors='replace')
+    return value
+
+def parse_record(line):
+    '''
+    Parse one "journalctl -o json" line to JournalRecord, text is in
+    "journalctl -o short" format.
+    Arguments:
+        line {string} -- json line
+    Return:
+        JournalRecord
+    '''
+    entry = json.loads(line)
+    realtime = int(entry.get('__REALTIME_TIMESTAMP', 0))
+    ident = _field(entry, 'SYSLOG_IDENTIFIER') or _field(entry, '_COMM') or 'unknown'
+    pid = _field(entry, 'SYSLOG_PID') or _field(entry, '_PID')
+    if pid is not None and entry.get('_TRANSPORT') != 'kernel':
+        ident = "{}[{}]".format(ident, pid)
+    message = _field(entry, 'MESSAGE') or ''
+    text = "{} {} {}: {}\n".format(time.strftime('%b %d %H:%M:%S', time.localtime(realtime / 1000000)),
+                                   _field(entry, '_HOSTNAME') or '',
+                                   ident,
+                                   message.replace('\n', '\n    '))
+    return JournalRecord(entry.get('__CURSOR'), realtime, _field(entry, '_SYSTEMD_UNIT'),
+                         _field(entry, 'UNIT'), _field(entry, '_PID'), text)
+
+def export_records(test_instance, spool_file, after_cursor=None):
+    '''
+    Export journal entries to spool_file and parse them, spool_file is removed
+    after parsed.
+    Arguments:
+        test_instance {Test instance} -- unittest.TestCase instance
+        spool_file {string} -- temporary file to export to
+        after_cursor {string} -- only export entries after this journal cursor
+    Return:
+        list of JournalRecord
+    '''
+    # redirect journalctl output to a file as it is not get return
+    # normally in RHEL7
+    if after_cursor is not None:
+        cmd = "journalctl -o json --after-cursor='{}' > {}".format(after_cursor, spool_file)
+    else:
+        cmd = "journalctl -o json > {}".format(spool_file)
+    # spool_file is in target system, stream it by executor line by line,
+    # the whole export can be far larger than the records parsed from it
+    executor = utils_lib.get_executor(test_instance)
+    records = []
+    try:
+        utils_lib.run_cmd(test_instance, cmd, expect_ret=0, msg='Export journal')
+        for line in executor.iter_lines(spool_file):
+            records.append(parse_record(line))
+    finally:
+        executor.remove_file(spool_file)
+    return records
+
+def get_cursor(test_instance):
+    '''
+    Get journal cursor of the last entry.
+    Arguments:
+        test_instance {Test instance} -- unittest.TestCase instance
+    Return:
+        cursor {string}, None if journal is empty
+    '''
+    output = utils_lib.run_cmd(test_instance, "journalctl -n 1 -o json", expect_ret=0, is_log_output=False)
+    for line in reversed(output.split('\n')):
+        if line.startswith('{'):
+            cursor = parse_record(line).cursor
+            test_instance.log.info("Get journal cursor: {}".format(cursor))
+            return cursor
+    return None
+
+def get_text_after(test_instance, cursor, log_cmd="journalctl --since today"):
+    '''
+    Get journal text logged after cursor without exporting the whole journal.
+    Arguments:
+        test_instance {Test instance} -- unittest.TestCase instance
+        cursor {string} -- journal cursor
+        log_cmd {string} -- log_cmd in JOURNAL_CMDS the text is filtered as
+    Return:
+        text in "journalctl -o short" format
+    '''
+    records = export_records(test_instance, _spool_file(), after_cursor=cursor)
+    test_instance.log.info("Got {} journal records after cursor".format(len(records)))
+    since = today_start() if JOURNAL_CMDS.get(log_cmd) else None
+    return ''.join(record.text for record in records if since is None or record.realtime >= since)
+
+def is_loadable_unit(name):
+    '''
+    Check whether name in unit dir is a unit which can be loaded by name, not
+    a template or drop-in dir.
+    '''
+    return name.endswith(UNIT_SUFFIXES) and '@.' not in name
+
+def load_units(test_instance, units):
+    '''
+    Load units in batches, systemd logs unit file parsing warnings when it
+    loads the unit.
+    Arguments:
+        test_instance {Test instance} -- unittest.TestCase instance
+        units {list} -- unit names
+    '''
+    for i in range(0, len(units), UNIT_CHUNK):
+        cmd = "systemctl show -p Id,LoadState {}".format(' '.join(units[i:i + UNIT_CHUNK]))
+        utils_lib.run_cmd(test_instance, cmd, is_log_output=False,
+                          msg='Load units {}-{}'.format(i + 1, min(i + UNIT_CHUNK, len(units))))
+
+def group_by_unit(records):
+    '''
+    Group records as "journalctl --unit" selects, messages from the unit and
+    messages about the unit from systemd.
+    Arguments:
+        records {list} -- JournalRecord list
+    Return:
+        {unit: [JournalRecord]}
+    '''
+    units = {}
+    for record in records:
+        if record.systemd_unit:
+            units.setdefault(record.systemd_unit, []).append(record)
+        if record.pid == '1' and record.unit and record.unit != record.systemd_unit:
+            units.setdefault(record.unit, []).append(record)
+    return units
+
+def check_units_log(test_instance, units, log_keyword):
+    '''
+    check journal log of each unit as check_log with "journalctl --unit", the
+    journal is exported once for all units. Fail with all units having new
+    log_keyword.
+    Arguments:
+        test_instance {Test instance} -- unittest.TestCase instance
+        units {list} -- unit names
+        log_keyword {string} -- which keyword to check
+    '''
+    load_units(test_instance, units)
+    unit_records = group_by_unit(get_journal_snapshot(test_instance, refresh=True).records)
+    baseline_dict, baseline_index = utils_lib.load_baseline(test_instance, log_cmd='journalctl')
+    new_units = []
+    for unit in units:
+        out = ''.join(record.text for record in unit_records.get(unit, []))
+        if not utils_lib.find_word(test_instance, out, log_keyword, baseline_dict=baseline_dict,
+                                   baseline_index=baseline_index):
+            test_instance.log.info("New {} in {} log".format(log_keyword, unit))
+            new_units.append(unit)
+    if new_units:
+        test_instance.fail("New {} in log of {}".format(log_keyword, ','.join(new_units)))
+    test_instance.log.info("No unexpected {} in log of {} units!".format(log_keyword, len(units)))
+
+def today_start():
+    '''
+    Local midnight in journal realtime(us).
+    '''
+    return int(time.mktime(datetime.date.today().timetuple())) * 1000000
+
+class JournalSnapshot(object):
+    '''
+    Journal exported once to a spool file and parsed to records, shared by all
+    journal checks in one session. refresh() only exports entries after the
+    last record. The spool file is removed after parsed.
+    '''
+    def __init__(self, spool_file):
+        self.spool_file = spool_file
+        self.records = []
+        self.updated_at = None
+        self._texts = {}
+
+    def refresh(self, test_instance):
+        '''
+        Export new journal entries and parse them.
+        Arguments:
+            test_instance {Test instance} -- unittest.TestCase instance
+        '''
+        after_cursor = None
+        if self.records and self.records[-1].cursor is not None:
+            after_cursor = self.records[-1].cursor
+        else:
+            self.records = []
+        updated_at = time.time()
+        self.records.extend(export_records(test_instance, self.spool_file, after_cursor=after_cursor))
+        self.updated_at = updated_at
+        self._texts = {}
+        test_instance.log.info("Journal snapshot has {} records".format(len(self.records)))
+
+    def text(self, since=None):
+        '''
+        Get journal text.
+        Arguments:
+            since {int} -- only entries not earlier than it(us)
+        Return:
+            text in "journalctl -o short" format
+        '''
+        if since not in self._texts:
+            if since is None:
+                self._texts[since] = ''.join(record.text for record in self.records)
+            else:
+                self._texts[since] = ''.join(record.text for record in self.records if record.realtime >= since)
+        return self._texts[since]
+
+    def cmd_text(self, log_cmd):
+        '''
+        Get text as log_cmd in JOURNAL_CMDS outputs.
+        '''
+        if JOURNAL_CMDS[log_cmd]:
+            return self.text(since=today_start())
+        return self.text()
+
+_SNAPSHOT = None
+
+def _spool_file():
+    return os.path.join(tempfile.gettempdir(), 'os_tests_journal_{}.json'.format(os.getpid()))
+
+def get_journal_snapshot(test_instance, refresh=False):
+    '''
+    Get journal snapshot of this session, it is exported in the first call.
+    Arguments:
+        test_instance {Test instance} -- unittest.TestCase instance
+        refresh {bool} -- export entries logged after the snapshot, only set it
+                          when the case needs messages newer than the snapshot
+    Return:
+        JournalSnapshot
+    '''
+    global _SNAPSHOT
+    if _SNAPSHOT is None:
+        _SNAPSHOT = JournalSnapshot(_spool_file())
+        _SNAPSHOT.refresh(test_instance)
+    elif refresh:
+        _SNAPSHOT.refresh(test_instance)
+    else:
+        test_instance.log.info("Use journal snapshot taken at {}".format(time.ctime(_SNAPSHOT.updated_at)))
+    return _SNAPSHOT
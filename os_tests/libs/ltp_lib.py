@@ -0,0 +1,171 @@
+import os
+import re
+import json
+import collections
+from os_tests.libs import utils_lib
+from os_tests.libs import async_lib
+
+LTP_ROOT = '/opt/ltp'
+# per testcase tmp dirs in target system, one sub dir per runtest file
+LTP_TMP_DIR = '/tmp/os_tests_ltp'
+# LTP exit status bits
+TFAIL = 1
+TBROK = 2
+TWARN = 4
+TCONF = 32
+# exit status of "timeout -s KILL" when it kills testcase
+TIMEOUT_RET = 137
+# extra seconds before the runner kills a testcase "timeout" does not stop
+TIMEOUT_GRACE = 30
+# summary printed by new LTP library tests
+_SUMMARY = re.compile(r'^(passed|failed|broken|skipped|warnings)\s+(\d+)\s*$', re.M)
+
+LtpCase = collections.namedtuple('LtpCase', ['file_name', 'tag', 'cmdline'])
+
+def parse_runtest(text, file_name, case_name=None):
+    '''
+    Parse testcases in runtest file, one "tag cmdline" per line.
+    Arguments:
+        text {string} -- runtest file content
+        file_name {string} -- runtest file name
+        case_name {string} -- only keep lines match it, as "runltp -s"
+    Return:
+        [LtpCase]
+    '''
+    cases = []
+    for line in text.split('\n'):
+        line = line.strip()
+        if not line or line.startswith('#'):
+            continue
+        if case_name is not None and re.search(case_name, line) is None:
+            continue
+        tag, _, cmdline = line.partition(' ')
+        cases.append(LtpCase(file_name, tag, cmdline.strip()))
+    return cases
+
+def get_runtest_files(test_instance, file_name=None):
+    '''
+    Get runtest files to run, file_name can be a list split by ",", the
+    default scenario group is used if it is None.
+    '''
+    if file_name is not None:
+        return [x for x in file_name.split(',') if x]
+    executor = utils_lib.get_executor(test_instance)
+    text = executor.read_file(LTP_ROOT + '/scenario_groups/default') or ''
+    return [x.strip() for x in text.split('\n') if x.strip() and not x.startswith('#')]
+
+def load_cases(test_instance, case_name=None, file_name=None):
+    '''
+    Load testcases as runltp selects them by "-f" and "-s". If case_name is
+    not found in the default scenario group, all runtest files are searched.
+    Arguments:
+        test_instance {Test instance} -- unittest.TestCase instance
+        case_name {string} -- testcase filter
+        file_name {string} -- runtest files, split by ","
+    Return:
+        {runtest file: [LtpCase]} in run order
+    '''
+    executor = utils_lib.get_executor(test_instance)
+
+    def load(file_names):
+        cases = collections.OrderedDict()
+        for name in file_names:
+            text = executor.read_file('{}/runtest/{}'.format(LTP_ROOT, name))
+            if text is None:
+                test_instance.log.info("Cannot read runtest file {}".format(name))
+                continue
+            found = parse_runtest(text, name, case_name=case_name)
+            if found:
+                cases[name] = found
+        return cases
+
+    cases = load(get_runtest_files(test_instance, file_name))
+    if not cases and file_name is None:
+        cases = load(sorted(executor.list_dir(LTP_ROOT + '/runtest') or []))
+    return cases
+
+def case_cmd(case, timeout=600):
+    '''
+    Get cmd running one testcase as ltp-pan does, in its own tmp dir. It is
+    killed by "timeout" as root, the test user may not signal a root process.
+    '''
+    tmp_dir = '{}/{}/{}'.format(LTP_TMP_DIR, case.file_name, case.tag)
+    script = ('rm -rf {0} && mkdir -p {0} && cd {0} && '
+              'LTPROOT={1} TMPDIR={0} PATH={1}/testcases/bin:$PATH {2}').format(tmp_dir, LTP_ROOT, case.cmdline)
+    return "sudo timeout -s KILL {} sh -c '{}'".format(timeout, script.replace("'", "'\\''"))
+
+def get_status(ret, err=None):
+    '''
+    Get testcase status from LTP exit status.
+    Return:
+        pass, fail, broken, warn, conf or timeout
+    '''
+    if err is not None or ret == TIMEOUT_RET:
+        return 'timeout'
+    if ret == 0:
+        return 'pass'
+    if ret == TCONF:
+        return 'conf'
+    if ret & TFAIL:
+        return 'fail'
+    if ret & TBROK:
+        return 'broken'
+    if ret & TWARN:
+        return 'warn'
+    return 'fail'
+
+def parse_summary(output):
+    '''
+    Parse testcase summary counts, eg. {'passed': 2, 'failed': 0}, empty if
+    it is an old style testcase without summary.
+    '''
+    return dict((key, int(num)) for key, num in _SUMMARY.findall(output or ''))
+
+def run_cases(test_instance, cases, timeout=600, concurrency=1):
+    '''
+    Run testcases of runtest files. Testcases of one file run one by one,
+    files run concurrently. Testcase output is written to
+    "<case id>.ltp/<file>/<tag>.log" in results_dir as it comes, and its
+    result is logged as soon as it finishes.
+    Arguments:
+        test_instance {Test instance} -- unittest.TestCase instance
+        cases {dict} -- {runtest file: [LtpCase]}
+        timeout {int} -- kill testcase if it does not exit in timeout seconds
+        concurrency {int} -- how many runtest files run at the same time
+    Return:
+        list of result dicts
+    '''
+    file_names = list(cases)
+    log_dir = os.path.join(test_instance.params['results_dir'], test_instance.id() + '.ltp')
+    records = []
+    log_files = {}
+
+    def on_output(chain_index, cmd_index, text):
+        if (chain_index, cmd_index) not in log_files:
+            case = cases[file_names[chain_index]][cmd_index]
+            log_file = os.path.join(log_dir, case.file_name, case.tag + '.log')
+            os.makedirs(os.path.dirname(log_file), exist_ok=True)
+            log_files[(chain_index, cmd_index)] = open(log_file, 'w')
+        log_files[(chain_index, cmd_index)].write(text)
+        log_files[(chain_index, cmd_index)].flush()
+
+    def on_done(chain_index, cmd_index, ret, output, err, duration):
+        case = cases[file_names[chain_index]][cmd_index]
+        on_output(chain_index, cmd_index, '' if err is None else '\n{}\n'.format(err))
+        fh = log_files.pop((chain_index, cmd_index))
+        fh.close()
+        record = {'file': case.file_name, 'tag': case.tag, 'cmdline': case.cmdline,
+                  'status': get_status(ret, err), 'ret': ret, 'duration': round(duration, 3),
+                  'summary': parse_summary(output), 'log': fh.name}
+        records.append(record)
+        test_instance.log.info("LTP {} {} {} ret:{} {:.1f}s".format(
+            case.file_name, case.tag, record['status'], ret, duration))
+
+    chains = [[(case_cmd(x, timeout=timeout), timeout + TIMEOUT_GRACE) for x in cases[name]] for name in file_names]
+    test_instance.log.info("Run {} LTP testcases in {}(max {} files at the same time)".format(
+        sum(len(x) for x in chains), ','.join(file_names), concurrency))
+    async_lib.run_cmd_chains(test_instance, chains, concurrency=concurrency, on_done=on_done, on_output=on_output)
+    utils_lib.run_cmd(test_instance, 'sudo rm -rf {}'.format(LTP_TMP_DIR))
+    with open(os.path.join(log_dir, 'results.json'), 'w') as fh:
+        json.dump(records, fh, indent=2)
+    return records
@@ -0,0 +1,156 @@
+import os
+import math
+import time
+import sqlite3
+import collections
+from os_tests.libs import facts_lib
+from os_tests.libs import utils_lib
+
+# samples needed before learned bands replace the fixed limit
+MIN_SAMPLES = 10
+# latest samples, the new one included, tested for a shift against older ones
+RECENT_SAMPLES = 5
+# used when "metrics_db" is not set in config
+DEFAULT_DB = '/var/tmp/os_tests_metrics.db'
+
+MetricKey = collections.namedtuple('MetricKey', ['metric', 'instance_type', 'kernel', 'image'])
+
+class MetricsStore(object):
+    '''
+    Performance samples saved in a local SQLite file, keyed by metric,
+    instance type, kernel and image. Processes can write to it at the same
+    time.
+    '''
+    def __init__(self, db_file):
+        self.db_file = db_file
+        db_dir = os.path.dirname(db_file)
+        if db_dir:
+            os.makedirs(db_dir, exist_ok=True)
+        conn = self._connect()
+        with conn:
+            conn.execute('''CREATE TABLE IF NOT EXISTS samples (
+                metric TEXT, instance_type TEXT, kernel TEXT, image TEXT, value REAL, time REAL)''')
+            conn.execute('''CREATE INDEX IF NOT EXISTS samples_key
+                ON samples (metric, instance_type, kernel, image, time)''')
+        conn.close()
+
+    def _connect(self):
+        return sqlite3.connect(self.db_file, timeout=30)
+
+    def add(self, key, value):
+        '''
+        Save a sample of key.
+        '''
+        conn = self._connect()
+        with conn:
+            conn.execute('INSERT INTO samples VALUES (?, ?, ?, ?, ?, ?)', tuple(key) + (value, time.time()))
+        conn.close()
+
+    def history(self, key, limit=200):
+        '''
+        Get the latest samples of key.
+        Return:
+            values, oldest first
+        '''
+        conn = self._connect()
+        rows = conn.execute('''SELECT value FROM samples WHERE metric=? AND instance_type=? AND kernel=?
+            AND image=? ORDER BY time DESC LIMIT ?''', tuple(key) + (limit,)).fetchall()
+        conn.close()
+        return [x[0] for x in reversed(rows)]
+
+def percentile(values, pct):
+    '''
+    Get percentile of values with linear interpolation.
+    '''
+    values = sorted(values)
+    pos = (len(values) - 1) * pct / 100.0
+    low = int(math.floor(pos))
+    high = min(low + 1, len(values) - 1)
+    return values[low] + (values[high] - values[low]) * (pos - low)
+
+def mann_whitney(sample1, sample2):
+    '''
+    Mann-Whitney U test with normal approximation, ties get average ranks.
+    Return:
+        (z, two-sided p value), z > 0 means sample1 tends to be larger
+    '''
+    ranked = sorted([(x, 0) for x in sample1] + [(x, 1) for x in sample2])
+    ranks = [0.0] * len(ranked)
+    i = 0
+    while i < len(ranked):
+        j = i
+        while j + 1 < len(ranked) and ranked[j + 1][0] == ranked[i][0]:
+            j += 1
+        for k in range(i, j + 1):
+            ranks[k] = (i + j) / 2.0 + 1
+        i = j + 1
+    n1, n2 = len(sample1), len(sample2)
+    rank_sum = sum(rank for rank, (_, group) in zip(ranks, ranked) if group == 0)
+    u1 = rank_sum - n1 * (n1 + 1) / 2.0
+    sigma = math.sqrt(n1 * n2 * (n1 + n2 + 1) / 12.0)
+    if sigma == 0:
+        return 0.0, 1.0
+    z = (u1 - n1 * n2 / 2.0) / sigma
+    return z, math.erfc(abs(z) / math.sqrt(2))
+
+def get_metric_key(test_instance, metric):
+    '''
+    Get key of metric on the system under test, image is "image_id" in config
+    or os id and version.
+    '''
+    facts = facts_lib.get_facts()
+    image = test_instance.params.get('image_id') or "{}-{}".format(facts.os_id, facts.os_version)
+    return MetricKey(metric, facts.instance_type or 'default', facts.kernel, image)
+
+def get_store(test_instance):
+    '''
+    Get MetricsStore of "metrics_db" in config, DEFAULT_DB if it is not set.
+    '''
+    return MetricsStore(test_instance.params.get('metrics_db') or DEFAULT_DB)
+
+def check_metric(test_instance, metric, value, limit=None, lower_is_better=True, p_value=0.01):
+    '''
+    Check a new sample of metric against its history and save it if it
+    passes, so regressed samples do not move the history. With at
+    least MIN_SAMPLES samples of the same key, it fails if the sample is out
+    of the band P25 - 1.5*IQR ~ P75 + 1.5*IQR on the bad side, or the latest
+    RECENT_SAMPLES samples shift to the bad side with p value below p_value.
+    Otherwise it is compared with limit as compare_nums.
+    Arguments:
+        test_instance {Test instance} -- unittest.TestCase instance
+        metric {string} -- metric name, eg. boot_time
+        value {float} -- new sample
+        limit {float} -- fixed limit used when history is short
+        lower_is_better {bool} -- direction of regression
+        p_value {float} -- significance level of shift
+    '''
+    key = get_metric_key(test_instance, metric)
+    store = get_store(test_instance)
+    history = store.history(key)
+    test_instance.log.info("{}: {} with {} samples of {}".format(metric, value, len(history), key))
+    if len(history) < MIN_SAMPLES:
+        if limit is None:
+            test_instance.log.info("Not enough samples to check {}".format(metric))
+        elif lower_is_better:
+            utils_lib.compare_nums(test_instance, num1=value, num2=limit, ratio=0,
+                                   msg="Compare {} with limit {}, history is short".format(metric, limit))
+        elif value < limit:
+            test_instance.fail("{} {} is less than limit {}".format(metric, value, limit))
+        store.add(key, value)
+        return
+    p25, p75 = percentile(history, 25), percentile(history, 75)
+    low, high = p25 - 1.5 * (p75 - p25), p75 + 1.5 * (p75 - p25)
+    test_instance.log.info("{} band {:.3f} ~ {:.3f}, median {:.3f}".format(metric, low, high, percentile(history, 50)))
+    if (lower_is_better and value > high) or (not lower_is_better and value < low):
+        test_instance.fail("{} {} is out of band {:.3f} ~ {:.3f} learned from {} samples".format(
+            metric, value, low, high, len(history)))
+    recent = history[-(RECENT_SAMPLES - 1):] + [value]
+    older = history[:-(RECENT_SAMPLES - 1)]
+    if len(older) >= MIN_SAMPLES:
+        z, p = mann_whitney(recent, older)
+        test_instance.log.info("{} latest {} samples vs older {}: z {:.3f} p {:.4f}".format(
+            metric, len(recent), len(older), z, p))
+        if p < p_value and ((lower_is_better and z > 0) or (not lower_is_better and z < 0)):
+            test_instance.fail("{} shifted: median of latest {} samples {:.3f} vs {:.3f} before, p {:.4f}".format(
+                metric, len(recent), percentile(recent, 50), percentile(older, 50), p))
+    store.add(key, value)
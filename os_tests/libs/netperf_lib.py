@@ -0,0 +1,325 @@
+"""Socket load generator and veth/netns helpers for network performance cases.
+
+The load generator has no dependency, its source is written to SCRIPT_FILE in
+the target system by a here-document, so it runs in network namespaces of
+local or remote hosts without installing os-tests there.
+
+    python3 netperf_lib.py server --proto tcp --port 5201 --duration 5
+    python3 netperf_lib.py client --proto tcp --host 10.0.0.1 --port 5201 --duration 5
+    python3 netperf_lib.py connect --host 10.0.0.1 --port 5201 --duration 10 --workers 16
+    python3 netperf_lib.py accept --port 5201 --duration 3600
+
+It also parses /proc/interrupts and cpu masks for NIC queue checks.
+"""
+import os
+import sys
+import json
+import time
+import socket
+import argparse
+import threading
+
+# namespaces, veth pair and addresses used by cases
+NS_SERVER = 'os_tests_ns_srv'
+NS_CLIENT = 'os_tests_ns_cli'
+VETH_SERVER = 'os_tests_vsrv'
+VETH_CLIENT = 'os_tests_vcli'
+ADDR_SERVER = '10.199.0.1'
+ADDR_CLIENT = '10.199.0.2'
+PORT = 5201
+SCRIPT_FILE = '/tmp/os_tests_netperf.py'
+# ip and udp headers, udp payload larger than mtu - UDP_OVERHEAD fragments
+UDP_OVERHEAD = 28
+
+def _serve_tcp(port, duration):
+    srv = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+    srv.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+    srv.bind(('0.0.0.0', port))
+    srv.listen(1)
+    srv.settimeout(duration + 10)
+    conn, _ = srv.accept()
+    conn.settimeout(duration + 10)
+    received = 0
+    time_start = None
+    while True:
+        data = conn.recv(262144)
+        if not data:
+            break
+        if time_start is None:
+            time_start = time.time()
+        received += len(data)
+    elapsed = time.time() - (time_start or time.time())
+    conn.close()
+    srv.close()
+    return {'bytes': received, 'packets': None, 'elapsed': elapsed}
+
+def _serve_udp(port, duration):
+    srv = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+    srv.setsockopt(socket.SOL_SOCKET, socket.SO_RCVBUF, 4 * 1024 * 1024)
+    srv.bind(('0.0.0.0', port))
+    srv.settimeout(duration + 10)
+    received = packets = 0
+    time_start = time_end = None
+    # client sends an empty datagram when it finishes
+    while True:
+        try:
+            data = srv.recv(65536)
+        except socket.timeout:
+            break
+        if not data:
+            break
+        if time_start is None:
+            time_start = time.time()
+            srv.settimeout(2)
+        time_end = time.time()
+        received += len(data)
+        packets += 1
+    srv.close()
+    return {'bytes': received, 'packets': packets, 'elapsed': (time_end or 0) - (time_start or 0)}
+
+def _send_tcp(host, port, duration, msg_size):
+    cli = socket.create_connection((host, port), timeout=10)
+    buf = b'x' * msg_size
+    sent = 0
+    time_end = time.time() + duration
+    while time.time() < time_end:
+        sent += cli.send(buf)
+    cli.close()
+    return {'bytes': sent, 'packets': None, 'elapsed': duration}
+
+def _send_udp(host, port, duration, msg_size):
+    cli = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+    cli.connect((host, port))
+    buf = b'x' * msg_size
+    sent = packets = 0
+    time_end = time.time() + duration
+    while time.time() < time_end:
+        # check time once per batch, it costs more than a send
+        for _ in range(64):
+            try:
+                sent += cli.send(buf)
+                packets += 1
+            except (socket.error, OSError):
+                pass
+    # repeat end mark in case it is dropped, server may be gone already
+    for _ in range(3):
+        time.sleep(0.5)
+        try:
+            cli.send(b'')
+        except (socket.error, OSError):
+            break
+    cli.close()
+    return {'bytes': sent, 'packets': packets, 'elapsed': duration}
+
+def _connect_storm(host, port, duration, workers):
+    # each connection has a new source port, so replies of one host spread
+    # over rx queues by RSS hash
+    counts = {'connects': 0, 'errors': 0}
+    lock = threading.Lock()
+
+    def worker():
+        connects = errors = 0
+        time_end = time.time() + duration
+        while time.time() < time_end:
+            try:
+                socket.create_connection((host, port), timeout=1).close()
+                connects += 1
+            except (socket.error, OSError):
+                errors += 1
+        with lock:
+            counts['connects'] += connects
+            counts['errors'] += errors
+
+    threads = [threading.Thread(target=worker) for _ in range(workers)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    counts['elapsed'] = duration
+    return counts
+
+def _accept_storm(port, duration):
+    # peer side of _connect_storm, accept and close connections
+    srv = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+    srv.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+    srv.bind(('0.0.0.0', port))
+    srv.listen(1024)
+    srv.settimeout(1)
+    accepted = 0
+    time_end = time.time() + duration
+    while time.time() < time_end:
+        try:
+            conn, _ = srv.accept()
+        except socket.timeout:
+            continue
+        conn.close()
+        accepted += 1
+    srv.close()
+    return {'accepted': accepted, 'elapsed': duration}
+
+def main():
+    parser = argparse.ArgumentParser(description="Socket load generator.")
+    parser.add_argument('role', choices=['server', 'client', 'connect', 'accept'])
+    parser.add_argument('--proto', default='tcp', choices=['tcp', 'udp'])
+    parser.add_argument('--host', default=ADDR_SERVER)
+    parser.add_argument('--port', default=PORT, type=int)
+    parser.add_argument('--duration', default=5, type=float)
+    parser.add_argument('--msg-size', dest='msg_size', default=65536, type=int)
+    parser.add_argument('--workers', default=16, type=int)
+    args = parser.parse_args()
+    if args.role == 'connect':
+        result = _connect_storm(args.host, args.port, args.duration, args.workers)
+    elif args.role == 'accept':
+        result = _accept_storm(args.port, args.duration)
+    elif args.role == 'server':
+        result = (_serve_tcp if args.proto == 'tcp' else _serve_udp)(args.port, args.duration)
+    else:
+        result = (_send_tcp if args.proto == 'tcp' else _send_udp)(args.host, args.port, args.duration, args.msg_size)
+    result.update({'role': args.role, 'proto': args.proto, 'msg_size': args.msg_size})
+    print(json.dumps(result))
+    sys.stdout.flush()
+
+def install_cmd():
+    '''
+    Get cmd writing load generator to SCRIPT_FILE in target system.
+    '''
+    with open(os.path.abspath(__file__), 'r') as fh:
+        source = fh.read()
+    return "cat > {} <<'OS_TESTS_NETPERF_EOF'\n{}\nOS_TESTS_NETPERF_EOF".format(SCRIPT_FILE, source)
+
+def load_cmd(proto='tcp', duration=5, msg_size=65536):
+    '''
+    Get cmd running server in NS_SERVER and client in NS_CLIENT by
+    SCRIPT_FILE, it prints one json line of each.
+    '''
+    server = "sudo ip netns exec {} python3 {} server --proto {} --port {} --duration {}".format(
+        NS_SERVER, SCRIPT_FILE, proto, PORT, duration)
+    client = "sudo ip netns exec {} python3 {} client --proto {} --host {} --port {} --duration {} --msg-size {}".format(
+        NS_CLIENT, SCRIPT_FILE, proto, ADDR_SERVER, PORT, duration, msg_size)
+    return "{} &\nsleep 1\n{}\nwait".format(server, client)
+
+def parse_load(output):
+    '''
+    Parse output of load_cmd.
+    Return:
+        {'throughput_mbps', 'pps', 'loss', 'server', 'client'}, None if
+        server or client result is missing
+    '''
+    results = {}
+    for line in output.split('\n'):
+        line = line.strip()
+        if line.startswith('{'):
+            try:
+                result = json.loads(line)
+            except ValueError:
+                continue
+            results[result.get('role')] = result
+    if 'server' not in results or 'client' not in results:
+        return None
+    server, client = results['server'], results['client']
+    elapsed = server['elapsed'] or client['elapsed']
+    record = {'throughput_mbps': server['bytes'] * 8 / elapsed / 1e6 if elapsed else 0.0,
+              'pps': None, 'loss': None, 'server': server, 'client': client}
+    if server['packets'] is not None:
+        record['pps'] = server['packets'] / elapsed if elapsed else 0.0
+        record['loss'] = 1 - float(server['packets']) / client['packets'] if client['packets'] else None
+    return record
+
+def connect_cmd(host, port=PORT, duration=10, workers=16):
+    '''
+    Get cmd opening and closing tcp connections to host by SCRIPT_FILE in
+    workers threads for duration seconds, it prints one json line. The port
+    is served by "netperf_lib.py accept" in host.
+    '''
+    return "python3 {} connect --host {} --port {} --duration {} --workers {}".format(
+        SCRIPT_FILE, host, port, duration, workers)
+
+def parse_interrupts(text):
+    '''
+    Parse /proc/interrupts.
+    Return:
+        (cpu number, {irq: (per cpu counts, name)}) of numbered irqs
+    '''
+    lines = text.strip('\n').split('\n')
+    cpus = len([x for x in lines[0].split() if x.startswith('CPU')])
+    irqs = {}
+    for line in lines[1:]:
+        irq, _, rest = line.partition(':')
+        irq = irq.strip()
+        if not irq.isdigit():
+            continue
+        fields = rest.split()
+        irqs[int(irq)] = ([int(x) for x in fields[:cpus]], ' '.join(fields[cpus:]))
+    return cpus, irqs
+
+def parse_cpu_mask(mask):
+    '''
+    Parse hex cpu mask, eg. "00000000,0000000f" of rps_cpus.
+    Return:
+        sorted cpu list
+    '''
+    bits = int(mask.strip().replace(',', '') or '0', 16)
+    return [x for x in range(bits.bit_length()) if bits >> x & 1]
+
+def parse_cpu_list(cpu_list):
+    '''
+    Parse cpu list, eg. "0-3,5" of smp_affinity_list.
+    Return:
+        sorted cpu list
+    '''
+    cpus = set()
+    for part in cpu_list.strip().split(','):
+        if not part:
+            continue
+        start, _, end = part.partition('-')
+        cpus.update(range(int(start), int(end or start) + 1))
+    return sorted(cpus)
+
+def imbalance_score(cpu_deltas, slots):
+    '''
+    Get share of the busiest cpu over even share of slots, slots is
+    min(queue irqs, cpus). It is 1.0 if interrupts are even and slots if all
+    land on one cpu.
+    Return:
+        score, None if there is no interrupt
+    '''
+    total = sum(cpu_deltas)
+    if total == 0:
+        return None
+    return float(max(cpu_deltas)) / total * slots
+
+def setup_cmd(queues=4):
+    '''
+    Get cmd creating the namespaces and a veth pair with queues between them.
+    '''
+    return '\n'.join([
+        "sudo ip netns add {}".format(NS_SERVER),
+        "sudo ip netns add {}".format(NS_CLIENT),
+        "sudo ip link add {} numtxqueues {q} numrxqueues {q} type veth peer name {} numtxqueues {q} "
+        "numrxqueues {q}".format(VETH_SERVER, VETH_CLIENT, q=queues),
+        "sudo ip link set {} netns {}".format(VETH_SERVER, NS_SERVER),
+        "sudo ip link set {} netns {}".format(VETH_CLIENT, NS_CLIENT),
+        "sudo ip netns exec {} ip addr add {}/24 dev {}".format(NS_SERVER, ADDR_SERVER, VETH_SERVER),
+        "sudo ip netns exec {} ip addr add {}/24 dev {}".format(NS_CLIENT, ADDR_CLIENT, VETH_CLIENT),
+        "sudo ip netns exec {} ip link set lo up".format(NS_SERVER),
+        "sudo ip netns exec {} ip link set lo up".format(NS_CLIENT),
+        "sudo ip netns exec {} ip link set {} up".format(NS_SERVER, VETH_SERVER),
+        "sudo ip netns exec {} ip link set {} up".format(NS_CLIENT, VETH_CLIENT)])
+
+def cleanup_cmd():
+    '''
+    Get cmd removing the namespaces, veth pair goes with them.
+    '''
+    return "sudo ip netns del {} 2>/dev/null; sudo ip netns del {} 2>/dev/null; true".format(
+        NS_SERVER, NS_CLIENT)
+
+def veth_cmd(args):
+    '''
+    Get cmds running "args" with device of both ends in their namespaces,
+    "{dev}" in args is replaced by device name.
+    '''
+    return ' && '.join("sudo ip netns exec {} {}".format(ns, args.format(dev=dev))
+                       for ns, dev in ((NS_SERVER, VETH_SERVER), (NS_CLIENT, VETH_CLIENT)))
+
+if __name__ == "__main__":
+    main()
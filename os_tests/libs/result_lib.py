@@ -0,0 +1,279 @@
+import os
+import json
+import time
+import socket
+import hashlib
+import inspect
+import unittest
+import functools
+import xml.etree.ElementTree as ET
+import os_tests
+from os_tests.libs import utils_lib
+
+# result files in results_dir
+JSONL_FILE = 'results.jsonl'
+JUNIT_FILE = 'junit.xml'
+# JUnit element of statuses other than pass and cached
+_JUNIT_TAGS = {'fail': 'failure', 'error': 'error', 'skip': 'skipped', 'unexpected_success': 'failure'}
+# skip reason of cases reported from result cache
+CACHED_REASON = 'cached: '
+# system part of result cache fingerprint, host name and instance type keep
+# results of hosts sharing one cache dir apart, hashing package list in
+# target system saves transferring it from remote hosts
+_FINGERPRINT_CMD = ("uname -n -m -r; cat /sys/devices/virtual/dmi/id/product_name 2>/dev/null; cat /proc/cmdline; "
+                    "(rpm -qa 2>/dev/null || dpkg-query -W 2>/dev/null) | LC_ALL=C sort | sha256sum")
+# {remote host: system fingerprint} of this process
+_FINGERPRINTS = {}
+
+def get_debug_log(results_dir, case_id):
+    '''
+    Get debug log path of case, the same as init_case saves.
+    '''
+    return results_dir + '/' + case_id + ".debug"
+
+class ResultWriter(object):
+    '''
+    Save case results as soon as each case finishes. One json line per case is
+    appended to JSONL_FILE and flushed to disk, JUNIT_FILE is rewritten by
+    replacing it with a complete temp file, so both hold all finished cases
+    even if the run is killed or the system crashes.
+    '''
+    def __init__(self, results_dir, host=None):
+        '''
+        Arguments:
+            results_dir {string} -- dir to save result files and debug logs
+            host {string} -- remote host cases run against
+        '''
+        self.results_dir = results_dir
+        self.host = host
+        self.records = []
+        self.time_start = time.time()
+        os.makedirs(results_dir, exist_ok=True)
+        self.jsonl_file = os.path.join(results_dir, JSONL_FILE)
+        self.junit_file = os.path.join(results_dir, JUNIT_FILE)
+        # results of the last run are replaced
+        open(self.jsonl_file, 'w').close()
+
+    def add(self, case_id, status, detail=None, duration=0.0):
+        '''
+        Save result of a finished case.
+        Arguments:
+            case_id {string} -- full case id
+            status {string} -- pass, fail, error, skip, expected_failure or
+                               unexpected_success, skips from result cache
+                               are saved as cached
+            detail {string} -- failure traceback or skip reason
+            duration {float} -- case run time in seconds
+        Return:
+            record dict
+        '''
+        if status == 'skip' and detail.startswith(CACHED_REASON):
+            status = 'cached'
+        record = {'case': case_id, 'status': status, 'duration': round(duration, 3),
+                  'time': time.time(), 'debug_log': get_debug_log(self.results_dir, case_id)}
+        if status == 'skip':
+            record['skip_reason'] = detail
+        elif detail is not None:
+            record['message'] = detail
+        if self.host is not None:
+            record['host'] = self.host
+        self.records.append(record)
+        with open(self.jsonl_file, 'a') as fh:
+            fh.write(json.dumps(record) + '\n')
+            fh.flush()
+            os.fsync(fh.fileno())
+        self.write_junit()
+        return record
+
+    def write_junit(self):
+        '''
+        Rewrite JUnit XML with all results saved.
+        '''
+        counts = {'failure': 0, 'error': 0, 'skipped': 0}
+        suite = ET.Element('testsuite', name='os-tests', hostname=self.host or socket.gethostname(),
+                           timestamp=time.strftime('%Y-%m-%dT%H:%M:%S', time.localtime(self.time_start)))
+        for record in self.records:
+            classname, _, name = record['case'].rpartition('.')
+            case = ET.SubElement(suite, 'testcase', classname=classname, name=name,
+                                 time="{:.3f}".format(record['duration']))
+            tag = _JUNIT_TAGS.get(record['status'])
+            if tag is not None:
+                counts[tag] += 1
+                detail = record.get('skip_reason') or record.get('message') or record['status']
+                child = ET.SubElement(case, tag, message=detail.strip().split('\n')[-1][:200])
+                if tag != 'skipped':
+                    child.text = detail
+            ET.SubElement(case, 'system-out').text = "debug log: {}".format(record['debug_log'])
+        suite.set('tests', str(len(self.records)))
+        suite.set('failures', str(counts['failure']))
+        suite.set('errors', str(counts['error']))
+        suite.set('skipped', str(counts['skipped']))
+        suite.set('time', "{:.3f}".format(sum(x['duration'] for x in self.records)))
+        tmp_file = "{}.{}.tmp".format(self.junit_file, os.getpid())
+        with open(tmp_file, 'wb') as fh:
+            ET.ElementTree(suite).write(fh, encoding='utf-8', xml_declaration=True)
+            fh.flush()
+            os.fsync(fh.fileno())
+        os.replace(tmp_file, self.junit_file)
+
+class StreamTextTestResult(unittest.TextTestResult):
+    '''
+    TextTestResult which saves each case result by a ResultWriter once it
+    stops. It accepts failure details as formatted strings, so results
+    collected from worker processes can be merged, and their run time is set
+    by addDuration.
+    '''
+    writer = None
+
+    def __init__(self, *args, **kwargs):
+        super(StreamTextTestResult, self).__init__(*args, **kwargs)
+        self._case_start = None
+        self._case_duration = None
+        self._case_status = None
+
+    def _exc_info_to_string(self, err, test):
+        if isinstance(err, str):
+            return err
+        return super(StreamTextTestResult, self)._exc_info_to_string(err, test)
+
+    def startTest(self, test):
+        super(StreamTextTestResult, self).startTest(test)
+        self._case_start = time.time()
+        self._case_duration = None
+        self._case_status = ('pass', None)
+
+    def addDuration(self, test, elapsed):
+        # called by unittest since python 3.12, and for merged results
+        self._case_duration = elapsed
+
+    def addError(self, test, err):
+        super(StreamTextTestResult, self).addError(test, err)
+        self._case_status = ('error', self.errors[-1][1])
+
+    def addFailure(self, test, err):
+        super(StreamTextTestResult, self).addFailure(test, err)
+        self._case_status = ('fail', self.failures[-1][1])
+
+    def addSkip(self, test, reason):
+        super(StreamTextTestResult, self).addSkip(test, reason)
+        self._case_status = ('skip', reason)
+
+    def addExpectedFailure(self, test, err):
+        super(StreamTextTestResult, self).addExpectedFailure(test, err)
+        self._case_status = ('expected_failure', self.expectedFailures[-1][1])
+
+    def addUnexpectedSuccess(self, test):
+        super(StreamTextTestResult, self).addUnexpectedSuccess(test)
+        self._case_status = ('unexpected_success', None)
+
+    def stopTest(self, test):
+        super(StreamTextTestResult, self).stopTest(test)
+        if self.writer is None or self._case_status is None:
+            return
+        duration = self._case_duration
+        if duration is None:
+            duration = time.time() - self._case_start
+        status, detail = self._case_status
+        self.writer.add(test.id(), status, detail, duration)
+        self._case_status = None
+
+def get_runner(results_dir, verbosity=2):
+    '''
+    Get TextTestRunner which saves results in results_dir as cases finish.
+    Arguments:
+        results_dir {string} -- dir to save result files
+        verbosity {int} -- verbosity of text report
+    Return:
+        (TextTestRunner, ResultWriter)
+    '''
+    writer = ResultWriter(results_dir)
+    result_class = type('StreamTextTestResult', (StreamTextTestResult,), {'writer': writer})
+    return unittest.TextTestRunner(verbosity=verbosity, resultclass=result_class), writer
+
+def _sha256_file(path):
+    digest = hashlib.sha256()
+    with open(path, 'rb') as fh:
+        for block in iter(lambda: fh.read(65536), b''):
+            digest.update(block)
+    return digest.hexdigest()
+
+def get_fingerprint(test_instance):
+    '''
+    Get fingerprint of the system under test: kernel version and cmdline,
+    host name, instance type, hash of installed packages and hash of
+    baseline file. It is got once in
+    a process for each host.
+    Arguments:
+        test_instance {Test instance} -- unittest.TestCase instance
+    Return:
+        sha256 hex string
+    '''
+    host = test_instance.params.get('remote_host')
+    if host not in _FINGERPRINTS:
+        status, output = utils_lib.get_executor(test_instance).run(_FINGERPRINT_CMD)
+        baseline_file = os.path.dirname(os_tests.__file__) + "/data/baseline_log.json"
+        digest = hashlib.sha256()
+        digest.update(output.encode('utf-8', errors='replace'))
+        digest.update(_sha256_file(baseline_file).encode('utf-8'))
+        _FINGERPRINTS[host] = digest.hexdigest()
+        test_instance.log.info("System fingerprint: {}".format(_FINGERPRINTS[host]))
+    return _FINGERPRINTS[host]
+
+def get_case_key(test_instance, files=()):
+    '''
+    Get result cache key of case from system fingerprint, case id, source
+    of its test file and content of files it checks.
+    Arguments:
+        test_instance {Test instance} -- unittest.TestCase instance
+        files {list} -- files in target system the case result depends on
+    Return:
+        sha256 hex string
+    '''
+    digest = hashlib.sha256()
+    digest.update(get_fingerprint(test_instance).encode('utf-8'))
+    digest.update(test_instance.id().encode('utf-8'))
+    digest.update(_sha256_file(inspect.getsourcefile(type(test_instance))).encode('utf-8'))
+    if files:
+        cmd = "sudo sha256sum {} 2>&1".format(' '.join(files))
+        _, output = utils_lib.get_executor(test_instance).run(cmd)
+        digest.update(output.encode('utf-8', errors='replace'))
+    return digest.hexdigest()
+
+def cacheable(*files):
+    """Mark a deterministic static check whose pass result can be reused.
+    When "result_cache" is enabled and a case passed before with the same
+    system fingerprint, test source and files, it is not run again and
+    reported as a skip starting with CACHED_REASON, "cached" status in
+    result files. Passes are saved in "result_cache_dir", or overwritten
+    without lookup when "result_cache_refresh" is set.
+    eg.
+    @result_lib.cacheable('/var/log/cloud-init.log')
+    def test_check_cloudinit_log_error(self):
+
+    Arguments:
+        files {string} -- files in target system the case result depends on
+    """
+    def decorator(func):
+        @functools.wraps(func)
+        def wrapper(test_instance, *args, **kwargs):
+            params = test_instance.params
+            if not params.get('result_cache'):
+                return func(test_instance, *args, **kwargs)
+            key = get_case_key(test_instance, files)
+            cache_file = os.path.join(params['result_cache_dir'], key + '.json')
+            if not params.get('result_cache_refresh') and os.path.exists(cache_file):
+                with open(cache_file, 'r') as fh:
+                    entry = json.load(fh)
+                test_instance.log.info("Found passed result in {}".format(cache_file))
+                test_instance.skipTest("{}passed at {} with the same fingerprint".format(
+                    CACHED_REASON, time.strftime('%Y-%m-%d %H:%M:%S', time.localtime(entry['time']))))
+            ret = func(test_instance, *args, **kwargs)
+            os.makedirs(params['result_cache_dir'], exist_ok=True)
+            tmp_file = "{}.{}.tmp".format(cache_file, os.getpid())
+            with open(tmp_file, 'w') as fh:
+                json.dump({'case': test_instance.id(), 'time': time.time(),
+                           'fingerprint': get_fingerprint(test_instance)}, fh)
+            os.replace(tmp_file, cache_file)
+            return ret
+        return wrapper
+    return decorator
@@ -0,0 +1,301 @@
+import os
+import re
+import json
+import time
+import unittest
+from os_tests.libs import utils_lib
+from os_tests.libs import exec_lib
+from os_tests.libs import facts_lib
+from os_tests.libs import journal_lib
+from os_tests.libs import result_lib
+from concurrent.futures import ProcessPoolExecutor, wait, as_completed, FIRST_COMPLETED
+
+# Resource name which conflicts with all other cases, eg. cpu hotplug.
+ALL_RESOURCES = '*'
+
+def use_resources(*resources):
+    """Declare the shared resources a case changes.
+    Cases holding the same resource never run at the same time in parallel
+    mode. It can decorate a test method or a test class. Class level
+    resources apply to all cases in the class.
+    eg.
+    @runner_lib.use_resources('clocksource')
+    def test_change_clocksource(self):
+
+    Arguments:
+        resources {string} -- resource names, ALL_RESOURCES means exclusive
+    """
+    def decorator(obj):
+        obj.os_tests_resources = frozenset(resources)
+        return obj
+    return decorator
+
+def get_resources(case):
+    '''
+    Get resources declared by case method and its class.
+    Arguments:
+        case {Test instance} -- unittest.TestCase instance
+    Return:
+        set of resource names
+    '''
+    resources = set(getattr(type(case), 'os_tests_resources', ()))
+    method = getattr(case, case._testMethodName, None)
+    resources.update(getattr(method, 'os_tests_resources', ()))
+    return resources
+
+def is_conflict(resources, busy, running=0):
+    '''
+    Check whether resources conflict with resources held by running cases.
+    Arguments:
+        resources {set} -- resources of case to start
+        busy {set} -- resources held by running cases
+        running {int} -- running cases, with or without resources
+    '''
+    if ALL_RESOURCES in busy:
+        return True
+    if not resources:
+        return False
+    if ALL_RESOURCES in resources:
+        return running > 0
+    return len(resources & busy) > 0
+
+class _CaseResult(unittest.TestResult):
+    '''
+    Collect one case result in worker process.
+    '''
+    def __init__(self):
+        super(_CaseResult, self).__init__()
+        self.status = 'pass'
+        self.detail = None
+
+    def addError(self, test, err):
+        super(_CaseResult, self).addError(test, err)
+        self.status, self.detail = 'error', self.errors[-1][1]
+
+    def addFailure(self, test, err):
+        super(_CaseResult, self).addFailure(test, err)
+        self.status, self.detail = 'fail', self.failures[-1][1]
+
+    def addSkip(self, test, reason):
+        super(_CaseResult, self).addSkip(test, reason)
+        self.status, self.detail = 'skip', reason
+
+    def addExpectedFailure(self, test, err):
+        super(_CaseResult, self).addExpectedFailure(test, err)
+        self.status, self.detail = 'expected_failure', self.expectedFailures[-1][1]
+
+    def addUnexpectedSuccess(self, test):
+        super(_CaseResult, self).addUnexpectedSuccess(test)
+        self.status = 'unexpected_success'
+
+def run_case(case_id):
+    '''
+    Load and run a single case by id in worker process.
+    Arguments:
+        case_id {string} -- full case id, eg. os_tests.tests.test_ltp.TestLTP.test_ltp_hugemmap
+    Return:
+        (case_id, status, detail, duration, cmd cache stats of this case)
+    '''
+    result = _CaseResult()
+    time_start = time.time()
+    cache_stats = dict(utils_lib.CMD_CACHE_STATS)
+    try:
+        case = unittest.defaultTestLoader.loadTestsFromName(case_id)
+        case.run(result)
+    except Exception as err:
+        result.status, result.detail = 'error', "Cannot run {}: {}".format(case_id, err)
+    for key in cache_stats:
+        cache_stats[key] = utils_lib.CMD_CACHE_STATS[key] - cache_stats[key]
+    return case_id, result.status, result.detail, time.time() - time_start, cache_stats
+
+def _merge_case(result, case, status, detail, duration=None):
+    result.startTest(case)
+    if duration is not None and hasattr(result, 'addDuration'):
+        result.addDuration(case, duration)
+    if status == 'pass':
+        result.addSuccess(case)
+    elif status == 'fail':
+        result.addFailure(case, detail)
+    elif status == 'error':
+        result.addError(case, detail)
+    elif status == 'skip':
+        result.addSkip(case, detail)
+    elif status == 'expected_failure':
+        result.addExpectedFailure(case, detail)
+    elif status == 'unexpected_success':
+        result.addUnexpectedSuccess(case)
+    result.stopTest(case)
+
+class ParallelSuite(unittest.TestSuite):
+    '''
+    Run cases on a process pool. Cases without declared resources run
+    concurrently, cases sharing a resource run one at a time. No case after
+    a waiting exclusive case starts, so it runs once running cases finish.
+    '''
+    def __init__(self, tests=(), jobs=2):
+        super(ParallelSuite, self).__init__(tests)
+        self.jobs = jobs
+
+    def run(self, result, debug=False):
+        pending = [case for case in self]
+        running = {}
+        busy = set()
+        with ProcessPoolExecutor(max_workers=self.jobs) as executor:
+            while pending or running:
+                for case in pending[:]:
+                    if len(running) >= self.jobs:
+                        break
+                    resources = get_resources(case)
+                    if is_conflict(resources, busy, running=len(running)):
+                        # barrier, cases after it would keep the pool busy
+                        if ALL_RESOURCES in resources:
+                            break
+                        continue
+                    pending.remove(case)
+                    busy.update(resources)
+                    future = executor.submit(run_case, case.id())
+                    running[future] = (case, resources)
+                done, _ = wait(list(running), return_when=FIRST_COMPLETED)
+                for future in done:
+                    case, resources = running.pop(future)
+                    busy.difference_update(resources)
+                    try:
+                        _, status, detail, duration, cache_stats = future.result()
+                        for key in cache_stats:
+                            utils_lib.CMD_CACHE_STATS[key] += cache_stats[key]
+                    except Exception as err:
+                        status, detail, duration = 'error', "Worker failed: {}".format(err), None
+                    _merge_case(result, case, status, detail, duration)
+                    if result.shouldStop:
+                        pending = []
+        return result
+
+def iter_cases(test_suite):
+    '''
+    Yield cases in a nested test suite.
+    '''
+    for test in test_suite:
+        if isinstance(test, unittest.TestSuite):
+            for case in iter_cases(test):
+                yield case
+        else:
+            yield test
+
+def run_parallel(test_suite, jobs, verbosity=2):
+    '''
+    Run test suite in parallel and print one merged report, results are saved
+    in results_dir as cases finish.
+    Arguments:
+        test_suite {TestSuite} -- flat suite of cases
+        jobs {int} -- max cases run at the same time
+    Return:
+        TestResult
+    '''
+    runner, _ = result_lib.get_runner(utils_lib.get_session_params()['results_dir'], verbosity=verbosity)
+    return runner.run(ParallelSuite(tests=list(iter_cases(test_suite)), jobs=jobs))
+
+def _reset_host_state():
+    # module caches describe one system, a forked worker must not carry the
+    # ones of its parent to another host
+    utils_lib._CMD_CACHE.clear()
+    utils_lib.CMD_CACHE_STATS.update({'hit': 0, 'miss': 0})
+    journal_lib._SNAPSHOT = None
+    facts_lib._FACTS = None
+
+def run_host(host, case_ids, results_dir):
+    '''
+    Run cases against a remote host in worker process, cmds run by ssh, debug
+    logs and result files are saved in a sub dir named by host.
+    Arguments:
+        host {string} -- [user@]host[:port], or exec_lib.LOCAL_HOST names
+        case_ids {list} -- full case ids
+        results_dir {string} -- results_dir of session, parent of host dir
+    Return:
+        (host, host info, [(case_id, status, detail, duration)])
+    '''
+    _reset_host_state()
+    utils_lib.update_session_params({
+        'cmd_executor': exec_lib.SSH,
+        'remote_host': host,
+        'results_dir': os.path.join(results_dir, re.sub(r'[^\w.-]', '_', host))})
+    params = utils_lib.get_session_params()
+    facts = facts_lib.get_facts(refresh=True, executor=utils_lib.get_params_executor(params))
+    info = {'instance_type': facts.instance_type, 'arch': facts.arch, 'kernel': facts.kernel,
+            'branch': facts.branch}
+    writer = result_lib.ResultWriter(utils_lib.get_session_params()['results_dir'], host=host)
+    results = []
+    for case_id in case_ids:
+        case_id, status, detail, duration, _ = run_case(case_id)
+        writer.add(case_id, status, detail, duration)
+        results.append((case_id, status, detail, duration))
+    return host, info, results
+
+def format_host_report(hosts, case_ids, reports):
+    '''
+    Format results of hosts as a table, one row per case and one column per
+    host, "*" marks cases whose status differs between hosts.
+    Arguments:
+        hosts {list} -- hosts in column order
+        case_ids {list} -- case ids in row order
+        reports {dict} -- {host: {'info': host info, 'results': [(case_id, status, detail, duration)]}}
+    Return:
+        report text
+    '''
+    width = 18
+    name_width = max([len(x.split('.')[-1]) for x in case_ids] + [4]) + 2
+    lines = [' ' * name_width + ''.join(x[:width - 1].ljust(width) for x in hosts),
+             ' ' * name_width + ''.join(str(reports[x]['info'].get('instance_type'))[:width - 1].ljust(width) for x in hosts)]
+    statuses = {}
+    for host in hosts:
+        for case_id, status, _, duration in reports[host]['results']:
+            statuses.setdefault(case_id, {})[host] = "{} {:.1f}s".format(status, duration)
+    for case_id in case_ids:
+        cells = [statuses.get(case_id, {}).get(host, '-') for host in hosts]
+        differ = len(set(x.split(' ')[0] for x in cells)) > 1
+        lines.append(("*" if differ else " ") + case_id.split('.')[-1].ljust(name_width - 1) +
+                     ''.join(x.ljust(width) for x in cells))
+    for host in hosts:
+        counts = {}
+        for _, status, _, _ in reports[host]['results']:
+            counts[status] = counts.get(status, 0) + 1
+        lines.append("{}: {}".format(host, ' '.join("{}:{}".format(k, v) for k, v in sorted(counts.items())) or
+                                    reports[host]['info'].get('error')))
+    return '\n'.join(lines)
+
+def run_hosts(test_suite, hosts):
+    '''
+    Run test suite against hosts at the same time, one fresh worker process
+    per host, print one report comparing results of all hosts and save it as
+    hosts_report.json in results_dir.
+    Arguments:
+        test_suite {TestSuite} -- cases to run
+        hosts {list} -- [user@]host[:port], or exec_lib.LOCAL_HOST names
+    Return:
+        {host: {'info': host info, 'results': [(case_id, status, detail, duration)]}}
+    '''
+    case_ids = [case.id() for case in iter_cases(test_suite)]
+    params = utils_lib.get_session_params()
+    reports = {}
+    # a pool per host, a shared pool may run 2 hosts in one worker
+    pools = [ProcessPoolExecutor(max_workers=1) for _ in hosts]
+    try:
+        futures = dict((pool.submit(run_host, host, case_ids, params['results_dir']), host)
+                       for pool, host in zip(pools, hosts))
+        for future in as_completed(futures):
+            host = futures[future]
+            try:
+                _, info, results = future.result()
+            except Exception as err:
+                info, results = {'error': "Worker failed: {}".format(err)}, []
+            reports[host] = {'info': info, 'results': results}
+            print("{} finished {} cases".format(host, len(results)))
+    finally:
+        for pool in pools:
+            pool.shutdown()
+    print(format_host_report(hosts, case_ids, reports))
+    os.makedirs(params['results_dir'], exist_ok=True)
+    report_file = os.path.join(params['results_dir'], 'hosts_report.json')
+    with open(report_file, 'w') as fh:
+        json.dump(reports, fh, indent=2)
+    print("Report saved to {}".format(report_file))
+    return reports
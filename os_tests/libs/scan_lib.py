@@ -0,0 +1,64 @@
+import re
+import collections
+
+def compile_keywords(keywords):
+    '''
+    Compile keywords to one pattern which matches the whole line containing
+    any of them.
+    Arguments:
+        keywords {list} -- keywords in regex, case insensitive
+    Return:
+        compiled pattern
+    '''
+    return re.compile('^.*(?:{}).*\n'.format('|'.join('(?:{})'.format(x) for x in keywords)),
+                      flags=re.I | re.M)
+
+def compile_skip_words(skip_words):
+    '''
+    Compile skip words to one pattern.
+    Arguments:
+        skip_words {string} -- skip words split by ",", case sensitive
+    Return:
+        compiled pattern, None if no skip words
+    '''
+    if skip_words is None:
+        return None
+    return re.compile('|'.join(re.escape(x) for x in skip_words.split(',')))
+
+def skip_lines(lines, skip_words):
+    '''
+    Drop lines containing any of skip words.
+    Arguments:
+        lines {list} -- lines
+        skip_words {string} -- skip words split by ","
+    Return:
+        lines left
+    '''
+    pattern = compile_skip_words(skip_words)
+    if pattern is None:
+        return lines
+    return [x for x in lines if pattern.search(x) is None]
+
+def scan_keywords(check_str, keywords):
+    '''
+    Find lines containing keywords by walking the log once, instead of one
+    re.findall() for each keyword.
+    Arguments:
+        check_str {string} -- log content
+        keywords {list} -- keywords in regex, case insensitive
+    Return:
+        {keyword: [lines]}, lines end with "\\n" as find_word() gets
+    '''
+    hits = collections.OrderedDict((x, []) for x in keywords)
+    if not hits:
+        return hits
+    patterns = [(x, re.compile(x, flags=re.I)) for x in hits]
+    for match in compile_keywords(list(hits)).finditer(check_str):
+        line = match.group()
+        if len(patterns) == 1:
+            hits[patterns[0][0]].append(line)
+            continue
+        for keyword, pattern in patterns:
+            if pattern.search(line) is not None:
+                hits[keyword].append(line)
+    return hits
@@ -3,44 +3,117 @@ import random
 import re
 import time
 import logging
-import decimal
+import logging.handlers
+import queue
+import copy
 import subprocess
+import signal
+import threading
+import collections
 import os_tests
-import json
 import difflib
-from yaml import load, dump
+from os_tests.libs import baseline_lib
+from os_tests.libs import event_lib
+from os_tests.libs import exec_lib
+from os_tests.libs import facts_lib
+from os_tests.libs import scan_lib
+from yaml import load
 try:
-    from yaml import CLoader as Loader, CDumper as Dumper
+    from yaml import CLoader as Loader
 except ImportError:
-    from yaml import Loader, Dumper
+    from yaml import Loader
+
+# Config file
+CFG_FILE = os.path.dirname(os_tests.__file__) + "/cfg/os-tests.yaml"
+LOG_FORMAT = "%(levelname)s:%(message)s"
+_SESSION_PARAMS = None
+# module loggers in libs, eg. artifact_lib.LOG, go to the running case log
+# and SESSION_LOG in results_dir, they log out of cases too
+LIBS_LOGGER = 'os_tests.libs'
+SESSION_LOG = 'os_tests_session.debug'
+
+# Session command cache, {cmd: (cached time, status, output)}
+_CMD_CACHE = {}
+CMD_CACHE_STATS = {'hit': 0, 'miss': 0}
+# run_cmd_stream keeps the last STREAM_TAIL_LINES lines and at most
+# STREAM_MATCH_LINES matched lines per keyword
+STREAM_TAIL_LINES = 200
+STREAM_MATCH_LINES = 20
+
+def get_session_params():
+    """get config of this session, config file is parsed in the first call
+    Return:
+        params {dict}
+    """
+    global _SESSION_PARAMS
+    if _SESSION_PARAMS is None:
+        with open(CFG_FILE,'r') as fh:
+           _SESSION_PARAMS = load(fh, Loader=Loader)
+    return _SESSION_PARAMS
+
+def update_session_params(overrides):
+    """override config of this session, eg. target host in multi-host mode
+    Arguments:
+        overrides {dict} -- config items to override
+    """
+    get_session_params().update(overrides)
+
+def init_session_log(results_dir):
+    """save module logger messages of libs to SESSION_LOG in results_dir,
+    worker and background processes forked later inherit it
+    Arguments:
+        results_dir {string} -- dir to save log
+    """
+    os.makedirs(results_dir, exist_ok=True)
+    logger = logging.getLogger(LIBS_LOGGER)
+    logger.setLevel(logging.DEBUG)
+    handler = logging.FileHandler(os.path.join(results_dir, SESSION_LOG))
+    handler.setFormatter(logging.Formatter("%(asctime)s %(process)d %(name)s " + LOG_FORMAT))
+    logger.addHandler(handler)
+
+def _stop_case_log(logger, handler, listener):
+    listener.stop()
+    logger.removeHandler(handler)
+    logging.getLogger(LIBS_LOGGER).removeHandler(handler)
+    for file_handler in listener.handlers:
+        file_handler.close()
 
 def init_case(test_instance):
     """init case
     Arguments:
         test_instance {Test instance} -- unittest.TestCase instance
     """
-    # Config file
-    cfg_file = os.path.dirname(os_tests.__file__) + "/cfg/os-tests.yaml"
-    # Result dir
-    with open(cfg_file,'r') as fh:
-       keys_data = load(fh, Loader=Loader)
-    test_instance.params = keys_data
-    results_dir = keys_data['results_dir']
+    # each case gets its own copy, so changes in one case do not leak
+    test_instance.params = copy.deepcopy(get_session_params())
+    results_dir = test_instance.params['results_dir']
     if not os.path.exists(results_dir):
-        os.mkdir(results_dir)
+        os.makedirs(results_dir, exist_ok=True)
     case_log = test_instance.id() + ".debug"
     log_file = results_dir + '/' + case_log
     if os.path.exists(log_file):
         os.unlink(log_file)
-    test_instance.log = logging.getLogger(__name__)
-    for handler in logging.root.handlers[:]:
-        handler.close()
-        logging.root.removeHandler(handler)
-    FORMAT = "%(levelname)s:%(message)s"
-    logging.basicConfig(level=logging.DEBUG, format=FORMAT, filename=log_file)
+    # per case logger, records are written to file by a listener thread so
+    # cases do not wait for disk and do not share the root handlers
+    test_instance.log = logging.getLogger("{}.{}".format(__name__, test_instance.id()))
+    test_instance.log.setLevel(logging.DEBUG)
+    test_instance.log.propagate = False
+    file_handler = logging.FileHandler(log_file)
+    file_handler.setFormatter(logging.Formatter(LOG_FORMAT))
+    log_queue = queue.Queue()
+    queue_handler = logging.handlers.QueueHandler(log_queue)
+    listener = logging.handlers.QueueListener(log_queue, file_handler)
+    test_instance.log.addHandler(queue_handler)
+    # case logger does not propagate, module loggers of libs are not logged twice
+    logging.getLogger(LIBS_LOGGER).setLevel(logging.DEBUG)
+    logging.getLogger(LIBS_LOGGER).addHandler(queue_handler)
+    listener.start()
+    test_instance.addCleanup(_stop_case_log, test_instance.log, queue_handler, listener)
+    # cleanups run in reverse order, duration is recorded before log stops
+    event_lib.set_case(test_instance)
+    test_instance.addCleanup(event_lib.record_case, test_instance, time.time())
     test_instance.log.info("Case id: {}".format(test_instance.id(), test_instance.shortDescription()))
-    if os.path.exists(cfg_file):
-        test_instance.log.info("{} config file found!".format(cfg_file))
+    if os.path.exists(CFG_FILE):
+        test_instance.log.info("{} config file found!".format(CFG_FILE))
 
 def run_cmd(test_instance,
             cmd,
@@ -94,11 +167,26 @@ def run_cmd(test_instance,
     output = None
     exception_hit = False
 
+    cache_ttl = get_cmd_cache_ttl(test_instance, cmd)
+    cached = None
+    if cache_ttl is not None:
+        cached = _CMD_CACHE.get(cmd)
+        if cached is not None and cache_ttl > 0 and time.time() - cached[0] > cache_ttl:
+            cached = None
+        if cached is not None:
+            CMD_CACHE_STATS['hit'] += 1
+            test_instance.log.info("Get cmd output from cache")
+            status, output = cached[1], cached[2]
+        else:
+            CMD_CACHE_STATS['miss'] += 1
+
+    # cmds run by executor are recorded as events there
+    executor = get_executor(test_instance)
     try:
-        ret = subprocess.run(cmd, shell=True, stdout=subprocess.PIPE, stderr=subprocess.STDOUT, timeout=timeout, encoding='utf-8')
-        status = ret.returncode
-        if ret.stdout is not None:
-            output = ret.stdout
+        if cached is None:
+            status, output = executor.run(cmd, timeout=timeout)
+            if cache_ttl is not None:
+                _CMD_CACHE[cmd] = (time.time(), status, output)
     except Exception as err:
         test_instance.log.error("Run cmd failed as %s" % err)
         status = None
@@ -108,23 +196,159 @@ def run_cmd(test_instance,
         test_instance.log.info("Try again")
         test_instance.log.info("Test via uname, if still fail, please make sure no hang or panic in sys")
         try:
-            ret = subprocess.run(cmd, shell=True, stdout=subprocess.PIPE, stderr=subprocess.STDOUT, timeout=timeout, encoding='utf-8')
-            status = ret.returncode
-            if ret.stdout is not None:
-               output = ret.stdout
+            status, output = executor.run(cmd, timeout=timeout)
             test_instance.log.info("Return: {}".format(output.decode("utf-8")))
-            ret = subprocess.run(cmd, shell=True, stdout=subprocess.PIPE, stderr=subprocess.STDOUT, timeout=timeout, encoding='utf-8')
-            status = ret.returncode
-            if ret.stdout is not None:
-               output = ret.stdout
+            status, output = executor.run(cmd, timeout=timeout)
         except Exception as err:
             test_instance.log.error("Run cmd failed again {}".format(err))
+    if cached is not None:
+        event_lib.record_cmd(test_instance, cmd, 0.0, None, output, status, cached=True)
     if cursor is not None and cursor in output:
         output = output[output.index(cursor):]
     if is_log_output:
         test_instance.log.info("CMD ret: {} out:{}".format(status, output))
     else:
         test_instance.log.info("CMD ret: {}".format(status))
+    verify_output(test_instance,
+                  output,
+                  status=status,
+                  expect_ret=expect_ret,
+                  expect_not_ret=expect_not_ret,
+                  expect_kw=expect_kw,
+                  expect_not_kw=expect_not_kw,
+                  expect_output=expect_output,
+                  msg=msg,
+                  cancel_kw=cancel_kw,
+                  cancel_not_kw=cancel_not_kw,
+                  cancel_ret=cancel_ret,
+                  cancel_not_ret=cancel_not_ret)
+    if ret_status:
+        return status
+    return output
+
+def run_cmd_stream(test_instance,
+            cmd,
+            expect_ret=None,
+            expect_kw=None,
+            expect_not_kw=None,
+            msg=None,
+            timeout=60,
+            ret_status=False,
+            tail_lines=STREAM_TAIL_LINES
+            ):
+    """run cmd which may output huge log and check keywords line by line, only
+    the last lines and matched lines are kept in memory and saved to log.
+    cmd is killed once expect_not_kw is found as the case fails anyway.
+
+    Arguments:
+        test_instance {Test instance} -- unittest.TestCase instance
+        cmd {string} -- cmd to run
+        expect_ret {int} -- expected return status
+        expect_kw {string} -- string expected in one line,seperate by ',' if
+                              check multi words
+        expect_not_kw {string} -- string not expected in any line, seperate by
+                                  ',' if check multi words
+        msg {string} -- addtional info to mark cmd run.
+        timeout {int} -- kill cmd if it does not exit in timeout seconds
+        ret_status {bool} -- return ret code instead of output
+        tail_lines {int} -- how many last lines to keep
+
+    Return:
+        the last tail_lines lines of output or ret code
+    """
+    if msg is not None:
+        test_instance.log.info(msg)
+    test_instance.log.info("CMD: %s", cmd)
+    expect_kws = [(x, re.compile(x)) for x in expect_kw.split(',')] if expect_kw is not None else []
+    expect_not_kws = [(x, re.compile(x)) for x in expect_not_kw.split(',')] if expect_not_kw is not None else []
+    matched = collections.OrderedDict((x[0], []) for x in expect_kws + expect_not_kws)
+    tail = collections.deque(maxlen=tail_lines)
+    lines = 0
+    not_kw_hit = None
+    timed_out = []
+    status = None
+    time_start = time.time()
+    cpu_start = event_lib.children_cpu()
+    proc = subprocess.Popen(get_executor(test_instance).command_args(cmd), stdout=subprocess.PIPE, stderr=subprocess.STDOUT,
+                            universal_newlines=True, encoding='utf-8', errors='replace',
+                            start_new_session=True)
+
+    def _kill():
+        # kill the whole group, children of shell may hold stdout open
+        try:
+            os.killpg(proc.pid, signal.SIGKILL)
+        except OSError:
+            pass
+    def _timeout():
+        timed_out.append(timeout)
+        _kill()
+    timer = threading.Timer(timeout, _timeout)
+    timer.start()
+    try:
+        for line in proc.stdout:
+            lines += 1
+            tail.append(line)
+            for key_word, pattern in expect_kws:
+                if len(matched[key_word]) < STREAM_MATCH_LINES and pattern.search(line) is not None:
+                    matched[key_word].append(line)
+            for key_word, pattern in expect_not_kws:
+                if pattern.search(line) is not None:
+                    matched[key_word].append(line)
+                    not_kw_hit = key_word
+                    break
+            if not_kw_hit is not None:
+                test_instance.log.info('Unexpcted "{}" found, stop reading output'.format(not_kw_hit))
+                _kill()
+                break
+        proc.stdout.close()
+        status = proc.wait()
+    finally:
+        timer.cancel()
+    output = ''.join(tail)
+    event_lib.record_cmd(test_instance, cmd, time.time() - time_start, cpu_start, output, status)
+    test_instance.log.info("CMD ret: {} lines: {} last {} lines:{}".format(status, lines, len(tail), output))
+    if timed_out:
+        test_instance.fail("Run cmd timeout after {}s".format(timeout))
+    if not_kw_hit is not None:
+        test_instance.fail('Unexpcted "{}" found in {}'.format(not_kw_hit, ''.join(matched[not_kw_hit])))
+    if expect_ret is not None:
+        test_instance.assertEqual(status,
+                         expect_ret,
+                         msg='ret is %s, expected is %s' %
+                         (status, expect_ret))
+    for key_word, _ in expect_kws:
+        if len(matched[key_word]) > 0:
+            test_instance.log.info('expcted "{}" found in "{}"'.format(key_word, ''.join(matched[key_word])))
+        else:
+            test_instance.fail('expcted "{}" not found in output(check debug log as too many lines)'.format(key_word))
+    for key_word, _ in expect_not_kws:
+        test_instance.log.info('Unexpcted "{}" not found in output'.format(key_word))
+    if ret_status:
+        return status
+    return output
+
+def verify_output(test_instance,
+                  output,
+                  status=None,
+                  expect_ret=None,
+                  expect_not_ret=None,
+                  expect_kw=None,
+                  expect_not_kw=None,
+                  expect_output=None,
+                  msg=None,
+                  cancel_kw=None,
+                  cancel_not_kw=None,
+                  cancel_ret=None,
+                  cancel_not_ret=None
+                  ):
+    """check return status/keywords of output got without run_cmd, eg. journal snapshot
+
+    Arguments:
+        test_instance {Test instance} -- unittest.TestCase instance
+        output {string} -- output to check
+        status {int} -- return status
+        other arguments are the same as run_cmd
+    """
     if expect_ret is not None:
         test_instance.assertEqual(status,
                          expect_ret,
@@ -188,10 +412,59 @@ def run_cmd(test_instance,
     if cancel_not_ret is not None:
         for ret in cancel_not_ret.split(','):
             if int(ret) == int(status):
-                test_instance.skipTest("%s ret code found, cancel case. %s" % (key_word, msg))
-    if ret_status:
-        return status
-    return output
+                test_instance.skipTest("%s ret code found, cancel case. %s" % (ret, msg))
+
+def get_executor(test_instance):
+    '''
+    Get executor which runs cmds, set by "cmd_executor" in config file.
+    Arguments:
+        test_instance {Test instance} -- unittest.TestCase instance
+    Return:
+        exec_lib executor
+    '''
+    return get_params_executor(test_instance.params)
+
+def get_params_executor(params):
+    '''
+    Get executor set by config items in params.
+    Arguments:
+        params {dict} -- config
+    Return:
+        exec_lib executor
+    '''
+    return exec_lib.get_executor(params.get('cmd_executor', exec_lib.LOCAL),
+                                 host=params.get('remote_host'),
+                                 ssh_key=params.get('ssh_key'),
+                                 ssh_options=params.get('ssh_options'))
+
+def get_cmd_cache_ttl(test_instance, cmd):
+    '''
+    Get cache ttl of cmd, cmd is cached only when "cmd_cache" is enabled and
+    it is listed in "cmd_cache_ttl" as idempotent cmd in config file.
+    Arguments:
+        test_instance {Test instance} -- unittest.TestCase instance
+        cmd {string} -- cmd to run
+    Return:
+        ttl in seconds, 0 means no expiration, None means not cached
+    '''
+    params = getattr(test_instance, 'params', None)
+    if not params or not params.get('cmd_cache'):
+        return None
+    cmd_cache_ttl = params.get('cmd_cache_ttl') or {}
+    return cmd_cache_ttl.get(cmd)
+
+def invalidate_cmd_cache(test_instance, cmd=None):
+    '''
+    Drop cached cmd output after system changed.
+    Arguments:
+        test_instance {Test instance} -- unittest.TestCase instance
+        cmd {string} -- cmd to drop, drop all if it is None
+    '''
+    if cmd is None:
+        _CMD_CACHE.clear()
+        test_instance.log.info("Command cache is cleared")
+    elif _CMD_CACHE.pop(cmd, None) is not None:
+        test_instance.log.info("Command cache of '{}' is cleared".format(cmd))
 
 def compare_nums(test_instance, num1=None, num2=None, ratio=0, msg='Compare 2 nums'):
     '''
@@ -218,36 +491,95 @@ def compare_nums(test_instance, num1=None, num2=None, ratio=0, msg='Compare 2 nu
     else:
         test_instance.log.info("{} vs {} less {}%, pass".format(num1, num2, ratio))
 
+Measurement = collections.namedtuple('Measurement', ['samples', 'mean', 'median', 'p95', 'stdev', 'ci_low', 'ci_high'])
+
+def measure(test_instance, probe, samples=10, budget=None, warmup=1, confidence=95, resamples=1000, msg=None,
+            min_samples=None):
+    '''
+    Take repeated samples of a probe and summarize them, failed samples are
+    dropped.
+    Arguments:
+        test_instance {Test instance} -- unittest.TestCase instance
+        probe {function} -- called without argument, return one sample or
+                            None if sampling fails, eg. a lost packet
+        samples {int} -- samples to try after warm-up, None to take samples
+                         until budget runs out
+        budget {int} -- stop taking samples after budget seconds
+        min_samples {int} -- fail if fewer valid samples are taken, half of
+                             tried samples and at least 2 by default
+        warmup {int} -- discard the first warmup samples
+        confidence {int} -- confidence level(%) of bootstrap interval of mean
+        resamples {int} -- bootstrap resamples
+        msg {string} -- what is measured
+    Return:
+        Measurement of samples
+    '''
+    from os_tests.libs import metrics_lib
+    if samples is None and budget is None:
+        raise ValueError("samples or budget is required")
+    values = []
+    tries = 0
+    time_start = time.time()
+    for _ in range(warmup):
+        probe()
+    while samples is None or tries < samples:
+        tries += 1
+        value = probe()
+        if value is None:
+            test_instance.log.info("Sample {} failed, drop it".format(tries))
+        else:
+            values.append(float(value))
+        if budget is not None and time.time() - time_start > budget and (len(values) > 1 or samples is None):
+            break
+    if min_samples is None:
+        min_samples = max(2, tries // 2)
+    if len(values) < min_samples:
+        test_instance.fail("{}: only {} valid samples of {} tries, need {}".format(
+            msg or 'Measure', len(values), tries, min_samples))
+    mean = sum(values) / len(values)
+    stdev = (sum((x - mean) ** 2 for x in values) / (len(values) - 1)) ** 0.5 if len(values) > 1 else 0.0
+    rand = random.Random(0)
+    means = sorted(sum(rand.choice(values) for _ in values) / len(values) for _ in range(resamples))
+    tail = (100 - confidence) / 2.0
+    result = Measurement(values, mean, metrics_lib.percentile(values, 50), metrics_lib.percentile(values, 95),
+                         stdev, metrics_lib.percentile(means, tail), metrics_lib.percentile(means, 100 - tail))
+    test_instance.log.info("{}: {} samples mean {:.3f} median {:.3f} p95 {:.3f} stdev {:.3f} {}% ci {:.3f}~{:.3f}".format(
+        msg or 'Measure', len(values), result.mean, result.median, result.p95, result.stdev, confidence,
+        result.ci_low, result.ci_high))
+    return result
+
+def compare_measurement(test_instance, measurement, num2=None, ratio=0, msg='Compare measurement'):
+    '''
+    Compare confidence interval of mean with num2 as compare_nums, only fail if
+    the whole interval is over num2 by ratio, log a warning if it is partly
+    over.
+    Arguments:
+        test_instance {Test instance} -- unittest.TestCase instance
+        measurement {Measurement} -- result of measure
+        num2 {int} -- limit
+        ratio {int} -- allow ratio
+    '''
+    limit = float(num2) * (1 + float(ratio) / 100)
+    test_instance.log.info(msg)
+    if measurement.ci_low > limit:
+        test_instance.fail("{:.3f}~{:.3f} vs {} over {}%".format(measurement.ci_low, measurement.ci_high, num2, ratio))
+    if measurement.ci_high > limit:
+        test_instance.log.warning("{:.3f}~{:.3f} vs {} partly over {}%, need more samples".format(
+            measurement.ci_low, measurement.ci_high, num2, ratio))
+    else:
+        test_instance.log.info("{:.3f}~{:.3f} vs {} less {}%, pass".format(
+            measurement.ci_low, measurement.ci_high, num2, ratio))
+
 def getboottime(test_instance):
     '''
     Get system boot time via "systemd-analyze"
     Arguments:
         test_instance {Test instance} -- unittest.TestCase instance
+    Return:
+        boot time in seconds
     '''
-    run_cmd(test_instance, "sudo which systemd-analyze", expect_ret=0)
-    time_start = int(time.time())
-    while True:
-        output = run_cmd(test_instance, "sudo systemd-analyze")
-        if 'Bootup is not yet finished' not in output:
-            break
-        time_end = int(time.time())
-        run_cmd(test_instance, 'sudo systemctl list-jobs')
-        if time_end - time_start > 60:
-            test_instance.fail("Bootup is not yet finished after 60s")
-        test_instance.log.info("Wait for bootup finish......")
-        time.sleep(1)
-    cmd = "sudo systemd-analyze blame > /tmp/blame.log"
-    run_cmd(test_instance, cmd, expect_ret=0)
-    run_cmd(test_instance, "cat /tmp/blame.log", expect_ret=0)
-    output = run_cmd(test_instance, "sudo systemd-analyze", expect_ret=0)
-    boot_time = re.findall("=.*s", output)[0]
-    boot_time = boot_time.strip("=\n")
-    boot_time_sec = re.findall('[0-9.]+s', boot_time)[0]
-    boot_time_sec = boot_time_sec.strip('= s')
-    if 'min' in boot_time:
-        boot_time_min = re.findall('[0-9]+min', boot_time)[0]
-        boot_time_min = boot_time_min.strip('min')
-        boot_time_sec = int(boot_time_min) * 60 + decimal.Decimal(boot_time_sec).to_integral()
+    from os_tests.libs import boot_lib
+    boot_time_sec = boot_lib.get_boot_profile(test_instance).phases['total']
     test_instance.log.info(
         "Boot time is {}(s)".format(boot_time_sec))
     return boot_time_sec
@@ -261,7 +593,7 @@ def get_all_systemd_service():
         list of service
     '''
     systemd_dir = "/usr/lib/systemd/system"
-    return os.listdir(systemd_dir)
+    return get_params_executor(get_session_params()).list_dir(systemd_dir) or []
 
 def is_aarch64(test_instance, action=None):
     '''
@@ -273,8 +605,7 @@ def is_aarch64(test_instance, action=None):
         arm: return True
         other: return False
     '''
-    output = run_cmd(test_instance, "lscpu", expect_ret=0)
-    if 'aarch64' in output:
+    if facts_lib.get_facts().arch == 'aarch64':
         test_instance.log.info("Arm detected.")
         return True
     else:
@@ -293,8 +624,7 @@ def is_aws(test_instance, action=None):
         aws: return True
         other: return False
     '''
-    output = run_cmd(test_instance, "dmesg", expect_ret=0)
-    if 'Amazon' in output or 'amazon' in output:
+    if facts_lib.get_facts().cloud == 'aws':
         test_instance.log.info("AWS system.")
         return True
     else:
@@ -313,11 +643,11 @@ def is_metal(test_instance, action=None):
         metal: return True
         other: return False
     '''
-    output_lscpu = run_cmd(test_instance, "lscpu", expect_ret=0)
-    if "x86_64" in output_lscpu and "Hypervisor" not in output_lscpu:
+    facts = facts_lib.get_facts()
+    if facts.is_metal:
         test_instance.log.info("It is a bare metal instance.")
         return True
-    elif "x86_64" in output_lscpu and "Hypervisor" in output_lscpu:
+    elif facts.is_metal is not None:
         test_instance.log.info("It is a virtual guest.")
         if action == "cancel":
             test_instance.skipTest("Cancel it in non metal system.")
@@ -366,18 +696,13 @@ def is_cmd_exist(test_instance, cmd=None, is_install=True, cancel_case=False):
 
 def get_memsize(test_instance, action=None):
     '''
-    Check whether system is a aws system.
+    Get total memory size.
     Arguments:
         test_instance {Test instance} -- unittest.TestCase instance
-        action {string} -- cancel case if it is not a aws system
     Return:
-        aws: return True
-        other: return False
+        memory size in GB
     '''
-    output = run_cmd(test_instance, "cat /proc/meminfo |grep MemTotal", expect_ret=0)
-
-    mem_kb = int(re.findall('\d+', output)[0])
-    mem_gb = (mem_kb/1024/1024)
+    mem_gb = facts_lib.get_facts().mem_gb
     test_instance.log.info("Total memory: {:0,.1f}G".format(mem_gb))
     return mem_gb
 
@@ -389,7 +714,11 @@ def get_cmd_cursor(test_instance, cmd='dmesg -T'):
     Return:
         cursor {string}
     '''
-    output = run_cmd(test_instance, cmd, expect_ret=0, is_log_output=False)
+    from os_tests.libs import journal_lib
+    if cmd in journal_lib.JOURNAL_CMDS:
+        output = journal_lib.get_journal_snapshot(test_instance, refresh=True).cmd_text(cmd)
+    else:
+        output = run_cmd(test_instance, cmd, expect_ret=0, is_log_output=False)
     if len(output.split('\n')) < 5:
         return output.split('\n')[-1]
     for i in range(-1, -10, -1):
@@ -399,6 +728,22 @@ def get_cmd_cursor(test_instance, cmd='dmesg -T'):
     test_instance.log.info("Get cursor: {}".format(cursor))
     return cursor
 
+def load_baseline(test_instance, log_cmd=None):
+    '''
+    Get baseline entries apply to this system and log, baseline data file is
+    loaded once and only reloaded when it changes.
+    Arguments:
+        test_instance {Test instance} -- unittest.TestCase instance
+        log_cmd {string} -- the command to get log
+    Return:
+        (baseline dict, BaselineIndex)
+    '''
+    baseline_file = os.path.dirname(os_tests.__file__) + "/data/baseline_log.json"
+    store = baseline_lib.get_baseline_store(baseline_file, cache_dir=test_instance.params.get('baseline_cache_dir'))
+    facts = facts_lib.get_facts()
+    return store.get(test_instance.log, os_id=facts.os_id, os_version=facts.os_version,
+                     source=baseline_lib.get_log_source(log_cmd))
+
 def check_log(test_instance, log_keyword, log_cmd="journalctl --since today", match_word_exact=False, cursor=None, skip_words=None):
     '''
     check journal log
@@ -407,22 +752,34 @@ def check_log(test_instance, log_keyword, log_cmd="journalctl --since today", ma
         log_keyword: which keywords to check, eg error, warn, fail, default is checking journal log happened in today.
         log_cmd: the command to get log
         match_word_exact: is macthing word exactly
-        cursor: where to start to check journal log, only for journal log
+        cursor: where to start to check log, cursor_lib.LogCursor or the line
+                text got by get_cmd_cursor()
         skip_words: skip words as you want, split by ","
     '''
-     # Baseline data file
-    baseline_file = os.path.dirname(os_tests.__file__) + "/data/baseline_log.json"
-    # Result dir
-    with open(baseline_file,'r') as fh:
-        test_instance.log.info("Loading baseline data file from {}".format(baseline_file))
-        baseline_dict = json.load(fh)
+    from os_tests.libs import journal_lib
+    from os_tests.libs import cursor_lib
+    baseline_dict, baseline_index = load_baseline(test_instance, log_cmd=log_cmd)
     run_cmd(test_instance, '\n')
     check_cmd = log_cmd
 
     if match_word_exact:
         check_cmd = check_cmd + '|grep -iw %s' % log_keyword
     ret = False
-    if cursor is not None:
+    if isinstance(cursor, cursor_lib.LogCursor) and cursor.kind == cursor_lib.TEXT:
+        cursor = cursor.position
+    if isinstance(cursor, cursor_lib.LogCursor):
+        # only read messages logged after cursor
+        out = cursor_lib.get_text_after(test_instance, cursor, log_cmd=log_cmd)
+        if match_word_exact:
+            word_pattern = re.compile(r'(?<!\w)(?:{})(?!\w)'.format(log_keyword), flags=re.I)
+            out = ''.join(x for x in out.splitlines(True) if word_pattern.search(x))
+    elif log_cmd in journal_lib.JOURNAL_CMDS and not match_word_exact:
+        # messages after cursor may be newer than the snapshot
+        snapshot = journal_lib.get_journal_snapshot(test_instance, refresh=cursor is not None)
+        out = snapshot.cmd_text(log_cmd)
+        if cursor is not None and cursor in out:
+            out = out[out.index(cursor):]
+    elif cursor is not None:
         out = run_cmd(test_instance,
                       check_cmd,
                       expect_ret=0,
@@ -433,8 +790,12 @@ def check_log(test_instance, log_keyword, log_cmd="journalctl --since today", ma
                       expect_ret=0,
                       msg='Get log......')
 
-    for keyword in log_keyword.split(','):
-        ret = find_word(test_instance, out, keyword, baseline_dict=baseline_dict, skip_words=skip_words)
+    keywords = log_keyword.split(',')
+    # walk the log once for all keywords
+    hits = scan_lib.scan_keywords(out, keywords)
+    for keyword in keywords:
+        ret = find_word(test_instance, out, keyword, baseline_dict=baseline_dict, skip_words=skip_words,
+                        baseline_index=baseline_index, matched_lines=hits[keyword])
         if not ret and baseline_dict is not None:
             test_instance.fail("New {} in {} log".format(keyword, check_cmd))
         elif not ret:
@@ -480,7 +841,39 @@ def clean_sentence(test_instance, line1, line2):
             return line1, line2
     return line1, line2
 
-def find_word(test_instance, check_str, log_keyword, baseline_dict=None, skip_words=None):
+def match_baseline(test_instance, line, baseline_dict, baseline_index=None):
+    """find the first baseline entry which is similar to line
+
+    Arguments:
+        test_instance {Test instance} -- unittest.TestCase instance
+        line {string} -- log line
+        baseline_dict {[dict]} -- [baseline dict to compare]
+        baseline_index {BaselineIndex} -- precompiled baseline_dict
+
+    Returns:
+        (basekey, same_rate) -- (None, 0) if no similar entry
+    """
+    if baseline_index is None:
+        baseline_index = baseline_lib.BaselineIndex(baseline_dict)
+    if line in baseline_index.cache:
+        return baseline_index.cache[line]
+    # compare 2 string, if similary over fail_rate, consider it as same.
+    fail_rate = baseline_lib.FAIL_RATE
+    ret = (None, 0)
+    for idx in baseline_index.candidates(line):
+        line1_tmp, line2_tmp = clean_sentence(test_instance, line, baseline_index.contents[idx])
+        seq = difflib.SequenceMatcher(
+            None, a=line1_tmp, b=line2_tmp)
+        if seq.quick_ratio() * 100 <= fail_rate:
+            continue
+        same_rate = seq.ratio() * 100
+        if same_rate > fail_rate:
+            ret = (baseline_index.keys[idx], same_rate)
+            break
+    baseline_index.cache[line] = ret
+    return ret
+
+def find_word(test_instance, check_str, log_keyword, baseline_dict=None, skip_words=None, baseline_index=None, matched_lines=None):
     """find words in content
 
     Arguments:
@@ -489,58 +882,56 @@ def find_word(test_instance, check_str, log_keyword, baseline_dict=None, skip_wo
         baseline_dict {[dict]} -- [baseline dict to compare]
         match_word_exact: is macthing word exactly
         skip_words: skip words as you want, split by ","
+        baseline_index {BaselineIndex} -- precompiled baseline_dict, reuse it
+                                          when check multi keywords
+        matched_lines {list} -- lines containing log_keyword which are already
+                                found by scan_lib.scan_keywords()
 
     Returns:
         [Bool] -- [True|False]
     """
-    tmp_list = re.findall('.*%s.*\n' % log_keyword, check_str, flags=re.I)
+    if matched_lines is None:
+        matched_lines = scan_lib.scan_keywords(check_str, [log_keyword])[log_keyword]
+    tmp_list = matched_lines
     if len(tmp_list) == 0:
         test_instance.log.info("No %s found!", log_keyword)
         return True
     else:
         test_instance.log.info("%s found!", log_keyword)
     if skip_words is not None:
-        for skip_word in skip_words.split(','):
-            tmp_list = [x for x in tmp_list if skip_word not in x]
+        tmp_list = scan_lib.skip_lines(tmp_list, skip_words)
     if len(tmp_list) == 0:
         test_instance.log.info("No {} found after skipped {}!".format(log_keyword, skip_words))
         return True
-    # compare 2 string, if similary over fail_rate, consider it as same.
-    fail_rate = 70
+    if baseline_dict is not None and baseline_index is None:
+        baseline_index = baseline_lib.BaselineIndex(baseline_dict)
     no_fail = True
     for line1 in tmp_list:
         find_it = False
         if baseline_dict is not None:
-            for basekey in baseline_dict:
-                line1_tmp = line1
-                line2_tmp = baseline_dict[basekey]["content"]
-                line1_tmp, line2_tmp = clean_sentence(test_instance, line1_tmp, line2_tmp)
-                seq = difflib.SequenceMatcher(
-                    None, a=line1_tmp, b=line2_tmp)
-                same_rate = seq.ratio() * 100
-                if same_rate > fail_rate:
-                    test_instance.log.info(
-                        "Compare result rate: %d same, maybe it is not a \
+            basekey, same_rate = match_baseline(test_instance, line1, baseline_dict, baseline_index=baseline_index)
+            if basekey is not None:
+                test_instance.log.info(
+                    "Compare result rate: %d same, maybe it is not a \
 new one", same_rate)
-                    test_instance.log.info("Guest: %s Baseline: %s", line1,
-                             baseline_dict[basekey]["content"])
-                    test_instance.log.info("ID:%s Baseline analyze:%s Branch:%s Status:%s Link:%s Path:%s" %
-                             (basekey,
-                              baseline_dict[basekey]["analyze"],
-                              baseline_dict[basekey]["branch"],
-                              baseline_dict[basekey]["status"],
-                              baseline_dict[basekey]["link"],
-                              baseline_dict[basekey]["path"]))
-                    if baseline_dict[basekey]["trigger"] in check_str and len(baseline_dict[basekey]["trigger"]) > 2:
-                        test_instance.log.info("Maybe it is expected because found '{}' too".format(baseline_dict[basekey]["trigger"]))
-                        find_it = True
-                    if baseline_dict[basekey]["status"] == 'active':
-                        find_it = True
-                    else:
-                        test_instance.log.info("Find a similar issue which should be already fixed, please check manually.")
-                        find_it = False
-                        no_fail = False
-                    break
+                test_instance.log.info("Guest: %s Baseline: %s", line1,
+                         baseline_dict[basekey]["content"])
+                test_instance.log.info("ID:%s Baseline analyze:%s Branch:%s Status:%s Link:%s Path:%s" %
+                         (basekey,
+                          baseline_dict[basekey]["analyze"],
+                          baseline_dict[basekey]["branch"],
+                          baseline_dict[basekey]["status"],
+                          baseline_dict[basekey]["link"],
+                          baseline_dict[basekey]["path"]))
+                if baseline_dict[basekey]["trigger"] in check_str and len(baseline_dict[basekey]["trigger"]) > 2:
+                    test_instance.log.info("Maybe it is expected because found '{}' too".format(baseline_dict[basekey]["trigger"]))
+                    find_it = True
+                if baseline_dict[basekey]["status"] == 'active':
+                    find_it = True
+                else:
+                    test_instance.log.info("Find a similar issue which should be already fixed, please check manually.")
+                    find_it = False
+                    no_fail = False
         if not find_it:
             test_instance.log.info("This is a new exception!")
             test_instance.log.info("{}".format(line1))
@@ -572,47 +963,57 @@ def ltp_install(test_instance):
     ltp_url : https://github.com/liangxiao1/rpmbuild_specs/releases/download/ltp-master-20200514/ltp-master-20200514.x86_64.rpm
     or
     ltp_url : https://github.com/liangxiao1/rpmbuild_specs/releases/download/ltp-master-20200514/ltp-master-20200514.aarch64.rpm
+    The rpm is installed from local artifact cache if it is usable, or from
+    ltp_url directly.
     Arguments:
         test_instance {avocado Test instance} -- avocado test instance
     """
+    from os_tests.libs import artifact_lib
+    artifact_lib.wait_provision(test_instance)
     if not ltp_check(test_instance):
         test_instance.log.info("Try install ltp automatically!")
-        if is_aarch64(test_instance):
-            ltp_url = test_instance.params.get('ltp_url_aarch64')
-        else:
-            ltp_url = test_instance.params.get('ltp_url_x86_64')
-        test_instance.log.info("Install ltp from %s", ltp_url)
-        cmd = 'sudo yum -y install %s' % ltp_url
+        arch = 'aarch64' if is_aarch64(test_instance) else 'x86_64'
+        ltp_url, sha256 = artifact_lib.get_ltp_artifact(test_instance.params, arch)
+        ltp_pkg = ltp_url
+        # cached file is in this system, remote hosts install from url
+        if get_executor(test_instance).is_local:
+            ltp_pkg = artifact_lib.fetch(test_instance.params, ltp_url, sha256=sha256) or ltp_url
+        test_instance.log.info("Install ltp from %s", ltp_pkg)
+        cmd = 'sudo yum -y install %s' % ltp_pkg
         run_cmd(test_instance, cmd)
     if not ltp_check(test_instance):
         test_instance.log.info('Install without dependences!')
-        cmd = 'sudo rpm -ivh %s --nodeps' % ltp_url
+        cmd = 'sudo rpm -ivh %s --nodeps' % ltp_pkg
         run_cmd(test_instance, cmd)
     if not ltp_check(test_instance):
         test_instance.skipTest("Cannot install ltp automatically!")
 
-def ltp_run(test_instance, case_name=None, file_name=None):
+def ltp_run(test_instance, case_name=None, file_name=None, timeout=None, concurrency=1):
     '''
-    Run specify ltp test case.
+    Run specify ltp test case, fail if any testcase fails, breaks, warns or
+    timeout.
     Arguments:
-        test_instance {avocado Test instance} -- avocado test instance
+        test_instance {Test instance} -- unittest.TestCase instance
+        case_name {string} -- testcase filter as "runltp -s"
+        file_name {string} -- runtest files as "runltp -f", split by ","
+        timeout {int} -- per testcase timeout, "ltp_timeout" in config by default
+        concurrency {int} -- how many runtest files run at the same time, only
+                             set it for files not sharing any resource
+    Return:
+        list of testcase result dicts
     '''
-    run_cmd(test_instance, 'sudo rm -rf /opt/ltp/results/*')
-    if file_name is not None and case_name is not None:
-        ltp_cmd = 'sudo /opt/ltp/runltp -f %s -s %s > ltplog 2>&1' % (
-            file_name, case_name)
-    elif file_name is None and case_name is not None:
-        ltp_cmd = 'sudo /opt/ltp/runltp -s %s > ltplog 2>&1' % case_name
-    elif file_name is not None and case_name is None:
-        ltp_cmd = 'sudo /opt/ltp/runltp -f %s > ltplog 2>&1' % file_name
+    from os_tests.libs import ltp_lib
     if not ltp_check(test_instance):
         ltp_install(test_instance)
     if not ltp_check(test_instance):
         test_instance.fail("LTP is not installed!")
-    test_instance.log.info("LTP cmd: %s" % ltp_cmd)
-    run_cmd(test_instance, '\n')
-    run_cmd(test_instance, ltp_cmd, timeout=600)
-    time.sleep(5)
-    run_cmd(test_instance,
-                'sudo cat /opt/ltp/results/*',
-                expect_kw='Total Failures: 0')
+    if timeout is None:
+        timeout = test_instance.params.get('ltp_timeout', 600)
+    cases = ltp_lib.load_cases(test_instance, case_name=case_name, file_name=file_name)
+    if not cases:
+        test_instance.fail("No LTP testcase found by case_name:{} file_name:{}".format(case_name, file_name))
+    records = ltp_lib.run_cases(test_instance, cases, timeout=timeout, concurrency=concurrency)
+    failed = ["{}({})".format(x['tag'], x['status']) for x in records if x['status'] in ('fail', 'broken', 'warn', 'timeout')]
+    if failed:
+        test_instance.fail("LTP testcases failed: {}".format(', '.join(failed)))
+    return records
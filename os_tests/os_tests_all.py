@@ -7,13 +7,21 @@ from os_tests.tests.test_general_check import TestGeneralCheck
 from os_tests.tests.test_general_test import TestGeneralTest
 from os_tests.tests.test_ltp import TestLTP
 from os_tests.tests.test_network_test import TestNetworkTest
+from os_tests.tests.test_network_perf import TestNetworkPerf
+from os_tests.libs import runner_lib
+from os_tests.libs import utils_lib
+from os_tests.libs import facts_lib
+from os_tests.libs import event_lib
+from os_tests.libs import result_lib
+from os_tests.libs import artifact_lib
 
 test_cloud_init_suite = unittest.TestLoader().loadTestsFromTestCase(TestCloudInit)
 test_general_check_suite = unittest.TestLoader().loadTestsFromTestCase(TestGeneralCheck)
 test_general_test_suite = unittest.TestLoader().loadTestsFromTestCase(TestGeneralTest)
 test_ltp_suite = unittest.TestLoader().loadTestsFromTestCase(TestLTP)
 test_network_suite = unittest.TestLoader().loadTestsFromTestCase(TestNetworkTest)
-all_tests = [test_general_check_suite, test_general_test_suite, test_ltp_suite, test_network_suite]
+test_network_perf_suite = unittest.TestLoader().loadTestsFromTestCase(TestNetworkPerf)
+all_tests = [test_general_check_suite, test_general_test_suite, test_ltp_suite, test_network_suite, test_network_perf_suite]
 TS = unittest.TestSuite(tests=all_tests)
 
 
@@ -26,6 +34,17 @@ def main():
                     help='filter case by name', required=False)
     parser.add_argument('-s', dest='skip_pattern', default=None, action='store',
                     help='skip cases', required=False)
+    parser.add_argument('-j', dest='jobs', default=1, action='store', type=int,
+                    help='run cases in N processes, cases changing the same resource still run one by one', required=False)
+    parser.add_argument('--hosts', dest='hosts', default=None, action='store',
+                    help='run cases against remote hosts by ssh at the same time, split by ",", '
+                         'eg. ec2-user@host1,host2:2222, "local" runs in local shell for testing', required=False)
+    parser.add_argument('--result-cache', dest='result_cache', action='store_true',
+                    help='report static checks passed with the same system fingerprint as cached without run', required=False)
+    parser.add_argument('--refresh-cache', dest='refresh_cache', action='store_true',
+                    help='run all cases and refresh result cache', required=False)
+    parser.add_argument('--slowest', dest='slowest', default=10, action='store', type=int,
+                    help='show N slowest cmds and cases after run', required=False)
     args = parser.parse_args()
 
     print("Run in mode: is_listcase:{} pattern: {}".format(args.is_listcase, args.pattern))
@@ -55,7 +74,32 @@ def main():
             print(case.id())
         print("Total case num: %s"%final_ts.countTestCases())
     else:
-        unittest.TextTestRunner(verbosity=2).run(final_ts)
+        if args.result_cache or args.refresh_cache:
+            utils_lib.update_session_params({'result_cache': True, 'result_cache_refresh': args.refresh_cache})
+        # cmds and cases of all processes are recorded in one event file
+        event_file = event_lib.get_event_file(utils_lib.get_session_params()['results_dir'])
+        utils_lib.init_session_log(utils_lib.get_session_params()['results_dir'])
+        if args.hosts is not None:
+            runner_lib.run_hosts(final_ts, args.hosts.split(','))
+        else:
+            # collect host identity once before cases start
+            facts_lib.get_facts()
+            # ltp is fetched and installed while other cases run
+            if any('TestLTP' in case.id() for case in runner_lib.iter_cases(final_ts)):
+                artifact_lib.start_provision(utils_lib.get_session_params())
+            if args.jobs > 1:
+                runner_lib.run_parallel(final_ts, args.jobs, verbosity=2)
+            else:
+                runner, _ = result_lib.get_runner(utils_lib.get_session_params()['results_dir'])
+                runner.run(final_ts)
+            print("Results saved to {} and {}".format(
+                *[os.path.join(utils_lib.get_session_params()['results_dir'], x)
+                  for x in (result_lib.JSONL_FILE, result_lib.JUNIT_FILE)]))
+            cache_stats = utils_lib.CMD_CACHE_STATS
+            if cache_stats['hit'] + cache_stats['miss'] > 0:
+                print("Command cache hit: {} miss: {}".format(cache_stats['hit'], cache_stats['miss']))
+        if args.slowest > 0 and os.path.exists(event_file):
+            print(event_lib.summarize(event_file, top=args.slowest))
 
 if __name__ == "__main__":
     unittest.TextTestRunner().run(TS)
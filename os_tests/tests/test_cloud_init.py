@@ -1,5 +1,7 @@
 import unittest
 from os_tests.libs import utils_lib
+from os_tests.libs import async_lib
+from os_tests.libs import result_lib
 
 class TestCloudInit(unittest.TestCase):
     def setUp(self):
@@ -8,6 +10,7 @@ class TestCloudInit(unittest.TestCase):
         cmd = "sudo systemctl is-enabled cloud-init-local"
         utils_lib.run_cmd(self, cmd, cancel_ret='0', msg = "check cloud-init-local is enabled")
 
+    @result_lib.cacheable('/run/cloud-init/cloud-init-generator.log')
     def test_check_cloudinit_ds_identify_found(self):
         '''
         polarion_id:
@@ -21,6 +24,7 @@ class TestCloudInit(unittest.TestCase):
                     expect_kw='ds-identify _RET=found',
                     msg='check /run/cloud-init/cloud-init-generator.log')
 
+    @result_lib.cacheable('/var/log/cloud-init.log')
     def test_check_cloudinit_log_imdsv2(self):
         '''
         polarion_id:
@@ -41,6 +45,7 @@ class TestCloudInit(unittest.TestCase):
                     expect_kw='Fetching Ec2 IMDSv2 API Token,X-aws-ec2-metadata-token',
                     msg='check /var/log/cloud-init.log')
 
+    @result_lib.cacheable('/var/log/cloud-init.log', '/var/log/cloud-init-output.log')
     def test_check_cloudinit_log_unexpected(self):
         '''
         polarion_id:
@@ -60,6 +65,7 @@ class TestCloudInit(unittest.TestCase):
                         expect_not_kw='unexpected',
                         msg='check /var/log/cloud-init-output.log')
 
+    @result_lib.cacheable('/var/log/cloud-init.log', '/var/log/cloud-init-output.log')
     def test_check_cloudinit_log_critical(self):
         '''
         polarion_id:
@@ -79,6 +85,7 @@ class TestCloudInit(unittest.TestCase):
                         expect_not_kw='CRITICAL',
                         msg='check /var/log/cloud-init-output.log')
 
+    @result_lib.cacheable('/var/log/cloud-init.log', '/var/log/cloud-init-output.log')
     def test_check_cloudinit_log_warn(self):
         '''
         polarion_id:
@@ -98,6 +105,7 @@ class TestCloudInit(unittest.TestCase):
                         expect_not_kw='WARNING',
                         msg='check /var/log/cloud-init-output.log')
 
+    @result_lib.cacheable('/var/log/cloud-init.log', '/var/log/cloud-init-output.log')
     def test_check_cloudinit_log_error(self):
         '''
         polarion_id:
@@ -117,6 +125,7 @@ class TestCloudInit(unittest.TestCase):
                         expect_not_kw='ERROR',
                         msg='check /var/log/cloud-init-output.log')
 
+    @result_lib.cacheable('/var/log/cloud-init.log', '/var/log/cloud-init-output.log')
     def test_check_cloudinit_log_traceback(self):
         '''
         polarion_id:
@@ -170,11 +179,13 @@ class TestCloudInit(unittest.TestCase):
                         'cloud-init',
                         'cloud-config',
                         'cloud-final']
+        cmd_list = []
         for service in service_list:
-            cmd = "sudo systemctl status %s" % service
-            utils_lib.run_cmd(self, cmd, expect_ret=0, expect_kw='Active: active', msg = "check %s status" % service)
-            cmd = "sudo systemctl is-active %s" % service
-            utils_lib.run_cmd(self, cmd, expect_ret=0, expect_kw='active', msg = "check %s status" % service)
+            cmd_list.append({'cmd': "sudo systemctl status %s" % service, 'expect_ret': 0,
+                             'expect_kw': 'Active: active', 'msg': "check %s status" % service})
+            cmd_list.append({'cmd': "sudo systemctl is-active %s" % service, 'expect_ret': 0,
+                             'expect_kw': 'active', 'msg': "check %s status" % service})
+        async_lib.run_cmds_async(self, cmd_list)
         
 
 if __name__ == '__main__':
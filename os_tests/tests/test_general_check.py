@@ -1,5 +1,9 @@
 import unittest
 from os_tests.libs import utils_lib
+from os_tests.libs import journal_lib
+from os_tests.libs import result_lib
+from os_tests.libs import boot_lib
+from os_tests.libs import metrics_lib
 
 class TestGeneralCheck(unittest.TestCase):
     def setUp(self):
@@ -42,6 +46,7 @@ class TestGeneralCheck(unittest.TestCase):
         cmd = "sudo ausearch -m AVC -ts today"
         utils_lib.run_cmd(self, cmd, expect_not_ret=0, msg='Checking avc log!')
 
+    @result_lib.cacheable()
     def test_check_available_clocksource(self):
         '''
         polarion_id:
@@ -71,11 +76,14 @@ available_clocksource'
         '''
         polarion_id: RHEL7-93100
         bz#: 1776710
-        check the boot time.
+        check the boot time against history of this instance type, kernel
+        and image(max_boot_time if history is short), and boot phases and
+        units against baseline of this instance type.
         '''
         max_boot_time = self.params.get('max_boot_time')
-        boot_time_sec = utils_lib.getboottime(self)
-        utils_lib.compare_nums(self, num1=boot_time_sec, num2=max_boot_time, ratio=0, msg="Compare with cfg specified max_boot_time")
+        profile = boot_lib.get_boot_profile(self)
+        boot_lib.check_boot_profile(self, profile)
+        metrics_lib.check_metric(self, 'boot_time', profile.phases['total'], limit=max_boot_time)
 
     def test_check_dmesg_error(self):
         '''
@@ -111,14 +119,14 @@ available_clocksource'
         polarion_id: RHEL7-103851
         bz#: 1777179
         '''
-        utils_lib.run_cmd(self, 'dmesg', expect_ret=0, expect_not_kw='Call Trace', msg="Check there is no call trace in dmesg")
+        utils_lib.run_cmd_stream(self, 'dmesg', expect_ret=0, expect_not_kw='Call Trace', msg="Check there is no call trace in dmesg")
 
     def test_check_dmesg_unknownsymbol(self):
         '''
         polarion_id:
         bz#: 1649215
         '''
-        utils_lib.run_cmd(self,
+        utils_lib.run_cmd_stream(self,
                     'dmesg',
                     expect_ret=0,
                     expect_not_kw='Unknown symbol',
@@ -129,12 +137,8 @@ available_clocksource'
         polarion_id:
         bz#: 1801999, 1736818
         '''
-        # redirect journalctl output to a file as it is not get return
-        # normally in RHEL7
-        cmd = 'journalctl > /tmp/journalctl.log'
-        utils_lib.run_cmd(self, cmd, expect_ret=0)
-        cmd = 'cat /tmp/journalctl.log'
-        utils_lib.run_cmd(self, cmd, expect_ret=0, expect_not_kw='Traceback,Backtrace',
+        snapshot = journal_lib.get_journal_snapshot(self)
+        utils_lib.verify_output(self, snapshot.text(), expect_not_kw='Traceback,Backtrace',
                         msg = "Check no Traceback,Backtrace in journal log")
 
     def test_check_journalctl_dumpedcore(self):
@@ -142,12 +146,8 @@ available_clocksource'
         polarion_id:
         bz#: 1797973
         '''
-        # redirect journalctl output to a file as it is not get return
-        # normally in RHEL7
-        cmd = 'journalctl > /tmp/journalctl.log'
-        utils_lib.run_cmd(self, cmd, expect_ret=0)
-        cmd = 'cat /tmp/journalctl.log'
-        utils_lib.run_cmd(self, cmd, expect_ret=0, expect_not_kw='dumped core',
+        snapshot = journal_lib.get_journal_snapshot(self)
+        utils_lib.verify_output(self, snapshot.text(), expect_not_kw='dumped core',
                         msg = "Check no dumped core in journal log")
     def test_check_journalctl_error(self):
         '''
@@ -179,12 +179,8 @@ available_clocksource'
         polarion_id:
         BZ#:1871139
         '''
-        all_services = utils_lib.get_all_systemd_service()
-        for service in all_services:
-            cmd = "systemctl status {}".format(service)
-            utils_lib.run_cmd(self, cmd)
-            cmd = "journalctl --unit {}".format(service)
-            utils_lib.check_log(self,'Unknown lvalue', log_cmd=cmd)
+        all_services = [x for x in utils_lib.get_all_systemd_service() if journal_lib.is_loadable_unit(x)]
+        journal_lib.check_units_log(self, all_services, 'Unknown lvalue')
 
     def test_check_memleaks(self):
         '''
@@ -211,6 +207,7 @@ available_clocksource'
         if len(output) > 0:
             self.fail('Memory leak found!')
 
+    @result_lib.cacheable()
     def test_check_nouveau(self):
         '''
         polarion_id: N/A
@@ -230,6 +227,7 @@ in blacklist and not loaded bug1645772")
                     expect_kw="rd.blacklist=nouveau",
                     msg="Checking cmdline")
 
+    @result_lib.cacheable()
     def test_check_nvme_io_timeout(self):
         '''
         polarion_id: N/A
@@ -272,6 +270,7 @@ current_device"
                     expect_kw='lapic-deadline',
                     msg='Check guest timer')
 
+    @result_lib.cacheable()
     def test_check_virtwhat(self):
         '''
         polarion_id: RHEL7-103857
@@ -1,10 +1,13 @@
 import unittest
 from os_tests.libs import utils_lib
+from os_tests.libs import async_lib
+from os_tests.libs import runner_lib
 
 class TestGeneralTest(unittest.TestCase):
     def setUp(self):
         utils_lib.init_case(self)
 
+    @runner_lib.use_resources('clocksource')
     def test_change_clocksource(self):
         '''
         :avocado: tags=test_change_clocksource,fast_check
@@ -33,8 +36,10 @@ current_clocksource'
                         cmd,
                         expect_kw=clocksource,
                         msg='Check current clock source')
+        utils_lib.invalidate_cmd_cache(self)
         utils_lib.run_cmd(self, 'dmesg|tail -30', expect_ret=0)
 
+    @runner_lib.use_resources('tracer')
     def test_change_tracer(self):
         '''
         no hang/panic happen
@@ -61,6 +66,7 @@ current_clocksource'
                         cmd,
                         expect_kw=tracer,
                         msg='Check current tracer')
+        utils_lib.invalidate_cmd_cache(self)
         utils_lib.run_cmd(self, 'dmesg|tail -30', expect_ret=0)
 
     def test_cpupower_exception(self):
@@ -70,12 +76,9 @@ current_clocksource'
         bz#: 1626505, 1659883
         '''
         utils_lib.is_cmd_exist(self, 'cpupower')
-        cmd = "sudo cpupower info"
-        utils_lib.run_cmd(self, cmd, expect_ret=0, expect_not_kw='core dumped')
-        cmd = "sudo cpupower idle-info"
-        utils_lib.run_cmd(self, cmd, expect_ret=0, expect_not_kw='core dumped')
-        cmd = "sudo cpupower frequency-info"
-        utils_lib.run_cmd(self, cmd, expect_ret=0, expect_not_kw='core dumped')
+        cmd_list = [{'cmd': "sudo cpupower {}".format(x), 'expect_ret': 0, 'expect_not_kw': 'core dumped'}
+                    for x in ('info', 'idle-info', 'frequency-info')]
+        async_lib.run_cmds_async(self, cmd_list)
 
     def test_xenfs_write_inability(self):
         '''
@@ -104,7 +107,8 @@ if __name__ == "__main__":
         '''
         utils_lib.run_cmd(self, "echo '%s' > t.py" % script_str, expect_ret=0)
         utils_lib.run_cmd(self, 'sudo python3 t.py')
-        utils_lib.run_cmd(self, "dmesg", expect_not_kw='Call Trace')
+        utils_lib.invalidate_cmd_cache(self)
+        utils_lib.run_cmd_stream(self, "dmesg", expect_not_kw='Call Trace')
 
 if __name__ == '__main__':
     unittest.main()
\ No newline at end of file
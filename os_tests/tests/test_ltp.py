@@ -1,12 +1,16 @@
 import unittest
 from os_tests.libs import utils_lib
+from os_tests.libs import runner_lib
+from os_tests.libs import cursor_lib
 
+@runner_lib.use_resources('ltp')
 class TestLTP(unittest.TestCase):
     def setUp(self):
         utils_lib.init_case(self)
         utils_lib.ltp_install(self)
-        self.cursor = utils_lib.get_cmd_cursor(self, cmd='journalctl --since today')
+        self.cursor = cursor_lib.get_log_cursor(self, log_cmd='journalctl --since today')
 
+    @runner_lib.use_resources(runner_lib.ALL_RESOURCES)
     def test_ltp_cpuhotplug(self):
         '''
         polarion_id: RHEL7-98752
@@ -32,11 +36,11 @@ at least which ltp not handle')
         polarion_id: RHEL7-88729
         BZ#: 1312331
         '''
-        utils_lib.get_memsize(self)
-        if utils_lib.is_aarch64(self) and utils_lib.get_memsize(self) < 16:
+        mem_gb = utils_lib.get_memsize(self)
+        if utils_lib.is_aarch64(self) and mem_gb < 16:
             #Hugepagesize is big in aarch64, so not run all hugetlb case in low memory arm system
             utils_lib.ltp_run(self, case_name="hugemmap01", file_name="hugetlb")
-        elif utils_lib.get_memsize(self) < 4:
+        elif mem_gb < 4:
             utils_lib.ltp_run(self, case_name="hugemmap01", file_name="hugetlb")
         else:
             utils_lib.ltp_run(self, file_name="hugetlb")
@@ -0,0 +1,124 @@
+import os
+import json
+import unittest
+from os_tests.libs import utils_lib
+from os_tests.libs import runner_lib
+from os_tests.libs import facts_lib
+from os_tests.libs import metrics_lib
+from os_tests.libs import netperf_lib
+
+# throughput is measured with nothing else running
+@runner_lib.use_resources(runner_lib.ALL_RESOURCES)
+class TestNetworkPerf(unittest.TestCase):
+    def setUp(self):
+        utils_lib.init_case(self)
+        utils_lib.run_cmd(self, 'sudo ip netns list', cancel_ret='0', msg='Check network namespace support')
+        utils_lib.run_cmd(self, 'python3 --version', cancel_ret='0', msg='Load generator needs python3')
+        utils_lib.run_cmd(self, netperf_lib.cleanup_cmd())
+        utils_lib.run_cmd(self, netperf_lib.install_cmd(), expect_ret=0, msg='Install load generator')
+        self.records = []
+
+    def _setup_veth(self, queues=1, mtu=1500):
+        utils_lib.run_cmd(self, netperf_lib.cleanup_cmd())
+        utils_lib.run_cmd(self, netperf_lib.setup_cmd(queues=queues), expect_ret=0,
+                          msg='Create veth pair with {} queues in namespaces'.format(queues))
+        utils_lib.run_cmd(self, netperf_lib.veth_cmd("ip link set dev {{dev}} mtu {}".format(mtu)), expect_ret=0,
+                          msg='Set mtu {}'.format(mtu))
+
+    def _run_load(self, mtu, queues):
+        duration = self.params.get('netperf_duration', 5)
+        facts = facts_lib.get_facts()
+        store = metrics_lib.get_store(self)
+        for proto in ('tcp', 'udp'):
+            # udp datagram fills one packet without fragments
+            msg_size = 65536 if proto == 'tcp' else mtu - netperf_lib.UDP_OVERHEAD
+            output = utils_lib.run_cmd(self, netperf_lib.load_cmd(proto=proto, duration=duration, msg_size=msg_size),
+                                       expect_ret=0, timeout=duration + 60,
+                                       msg='Run {} load with mtu {} queues {}'.format(proto, mtu, queues))
+            result = netperf_lib.parse_load(output)
+            if result is None or result['throughput_mbps'] <= 0:
+                self.fail("No {} traffic with mtu {} queues {}".format(proto, mtu, queues))
+            record = {'kernel': facts.kernel, 'mtu': mtu, 'queues': queues, 'proto': proto,
+                      'msg_size': msg_size, 'duration': duration,
+                      'throughput_mbps': round(result['throughput_mbps'], 1),
+                      'pps': round(result['pps']) if result['pps'] is not None else None,
+                      'loss': round(result['loss'], 4) if result['loss'] is not None else None}
+            self.records.append(record)
+            self.log.info("{proto} mtu {mtu} queues {queues}: {throughput_mbps} Mbps pps {pps} loss {loss}".format(**record))
+            key = metrics_lib.get_metric_key(self, "veth_{}_mbps_mtu{}_q{}".format(proto, mtu, queues))
+            store.add(key, record['throughput_mbps'])
+
+    def test_veth_mtu_sweep(self):
+        '''
+        case_name:
+            test_veth_mtu_sweep
+
+        case_priority:
+            2
+
+        component:
+            kernel
+
+        bugzilla_id:
+            n/a
+
+        polarion_id:
+            n/a
+
+        description:
+            Measure TCP/UDP throughput and UDP packet rate over a veth pair between two network namespaces with different MTU, the live NIC is not changed.
+
+        key_steps:
+            1. Create namespaces and a veth pair between them.
+            2. # ip link set dev $veth mtu $mtu (netperf_mtus in config)
+            3. Run TCP and UDP socket load for netperf_duration seconds.
+
+        expected_result:
+            Traffic goes through with all MTU, results are saved in "<case id>.netperf.json" and metrics_db.
+        '''
+        for mtu in self.params.get('netperf_mtus', [1500, 9000]):
+            self._setup_veth(queues=1, mtu=mtu)
+            self._run_load(mtu, 1)
+
+    def test_veth_queue_sweep(self):
+        '''
+        case_name:
+            test_veth_queue_sweep
+
+        case_priority:
+            2
+
+        component:
+            kernel
+
+        bugzilla_id:
+            n/a
+
+        polarion_id:
+            n/a
+
+        description:
+            Measure TCP/UDP throughput and UDP packet rate over a veth pair between two network namespaces with different tx/rx queue numbers.
+
+        key_steps:
+            1. Create namespaces and a veth pair with $num tx/rx queues (netperf_queues in config).
+            2. Run TCP and UDP socket load for netperf_duration seconds with mtu 1500.
+
+        expected_result:
+            Traffic goes through with all queue numbers, results are saved in "<case id>.netperf.json" and metrics_db.
+        '''
+        for queues in self.params.get('netperf_queues', [1, 4]):
+            self._setup_veth(queues=queues, mtu=1500)
+            self._run_load(1500, queues)
+
+    def tearDown(self):
+        utils_lib.run_cmd(self, netperf_lib.cleanup_cmd())
+        utils_lib.run_cmd(self, "rm -f {}".format(netperf_lib.SCRIPT_FILE))
+        if self.records:
+            record_file = os.path.join(self.params['results_dir'], self.id() + '.netperf.json')
+            with open(record_file, 'w') as fh:
+                json.dump(self.records, fh, indent=2)
+            self.log.info("Results saved to {}".format(record_file))
+
+if __name__ == '__main__':
+    unittest.main()
@@ -1,18 +1,27 @@
+import os
 import re
+import json
 import unittest
 from os_tests.libs import utils_lib
+from os_tests.libs import async_lib
+from os_tests.libs import runner_lib
+from os_tests.libs import facts_lib
+from os_tests.libs import cursor_lib
+from os_tests.libs import netperf_lib
 
+@runner_lib.use_resources('nic')
 class TestNetworkTest(unittest.TestCase):
     def setUp(self):
         utils_lib.init_case(self)
-        self.dmesg_cursor = utils_lib.get_cmd_cursor(self, cmd='dmesg -T')
+        self.dmesg_cursor = cursor_lib.get_log_cursor(self, log_cmd='dmesg -T')
         cmd = "sudo ip link show|grep mtu|grep -v lo|awk -F':' '{print $2}'"
         output = utils_lib.run_cmd(self, cmd, expect_ret=0)
         self.nic = "eth0"
         self.log.info("Test which nic connecting to public, if no found, use {} by default".format(self.nic))
-        for net in output.split('\n'):
-            cmd = "ping {} -c 2 -I {}".format(self.params.get('ping_server'), net)
-            ret = utils_lib.run_cmd(self, cmd, ret_status=True)
+        # awk keeps the space after ":", veth names carry "@peer"
+        nets = [x.strip().split('@')[0] for x in output.split('\n') if x.strip()]
+        cmds = ["ping {} -c 2 -I {}".format(self.params.get('ping_server'), net) for net in nets]
+        for net, (ret, _) in zip(nets, async_lib.gather_cmds(self, cmds)):
             if ret == 0:
                 self.nic = net
                 break
@@ -148,6 +157,7 @@ class TestNetworkTest(unittest.TestCase):
                 cmd = "sudo ethtool -G {} tx -1".format(self.nic)
                 utils_lib.run_cmd(self, cmd, expect_kw="aborting", msg="Check tx cannot set to -1")
 
+        utils_lib.invalidate_cmd_cache(self)
         utils_lib.check_log(self, "error,warn,fail,trace", log_cmd='dmesg -T', cursor=self.dmesg_cursor)
 
     def test_ethtool_P(self):
@@ -208,9 +218,13 @@ class TestNetworkTest(unittest.TestCase):
         vmxnet3 mtu range: 60~9000
         '''
 
-        utils_lib.is_cmd_exist(self, cmd='ethtool')
-        cmd = "sudo ethtool -i {}".format(self.nic)
-        output = utils_lib.run_cmd(self, cmd, expect_ret=0)
+        output = facts_lib.get_facts().nic_drivers.get(self.nic)
+        if output is None:
+            utils_lib.is_cmd_exist(self, cmd='ethtool')
+            cmd = "sudo ethtool -i {}".format(self.nic)
+            output = utils_lib.run_cmd(self, cmd, expect_ret=0)
+        else:
+            self.log.info("{} driver: {}".format(self.nic, output))
         if 'ena' in output:
             self.log.info('ena found!')
             mtu_range = [0, 127, 128, 4500, 9216, 9217]
@@ -248,9 +262,164 @@ class TestNetworkTest(unittest.TestCase):
             elif mtu_size < mtu_min or mtu_size > mtu_max:
                 utils_lib.run_cmd(self, mtu_cmd, expect_not_ret=0)
                 utils_lib.run_cmd(self, mtu_check, expect_ret=0, expect_not_kw="mtu {}".format(mtu_size))
+        utils_lib.invalidate_cmd_cache(self)
         cmd = "ping {} -c 2 -I {}".format(self.params.get('ping_server'), self.nic)
         utils_lib.run_cmd(self, cmd, expect_ret=0)
         utils_lib.check_log(self, "error,warn,fail,trace", log_cmd='dmesg -T', cursor=self.dmesg_cursor)
 
+    def test_ping_rtt(self):
+        '''
+        case_name:
+            test_ping_rtt
+
+        case_priority:
+            2
+
+        component:
+            kernel
+
+        bugzilla_id:
+            n/a
+
+        polarion_id:
+            n/a
+
+        description:
+            Measure ping round-trip time to ping_server by repeated samples, check its confidence interval.
+
+        key_steps:
+            1. # ping $ping_server -c 1 -W 2 -I $nic (1 warm-up, 10 samples or 30s, lost packets are dropped)
+            2. Check 95% confidence interval of mean rtt with max_ping_rtt.
+
+        expected_result:
+            At least half of pings get reply, mean rtt is not over max_ping_rtt(ms) with 95% confidence.
+        '''
+        cmd = "ping {} -c 1 -W 2 -I {}".format(self.params.get('ping_server'), self.nic)
+
+        def probe():
+            # a lost packet is dropped by measure
+            rtt = re.findall(r'time=([0-9.]+)', utils_lib.run_cmd(self, cmd))
+            return float(rtt[0]) if rtt else None
+
+        rtt = utils_lib.measure(self, probe, samples=10, budget=30, warmup=1, msg="Ping rtt(ms)")
+        utils_lib.compare_measurement(self, rtt, num2=self.params.get('max_ping_rtt'),
+                                      msg="Compare with cfg specified max_ping_rtt")
+
+    def test_nic_irq_distribution(self):
+        '''
+        case_name:
+            test_nic_irq_distribution
+
+        case_priority:
+            2
+
+        component:
+            kernel
+
+        bugzilla_id:
+            n/a
+
+        polarion_id:
+            n/a
+
+        description:
+            Check interrupts of NIC queues spread over cpus under load, throughput drops when all queue interrupts land on one cpu.
+
+        key_steps:
+            1. # ls /sys/class/net/$nic/queues
+            2. # cat /sys/class/net/$nic/queues/rx-*/rps_cpus /sys/class/net/$nic/queues/tx-*/xps_cpus
+            3. Find queue irqs of $nic in /proc/interrupts and get /proc/irq/$irq/smp_affinity_list.
+            4. Open tcp connections to $nic_irq_peer:$nic_irq_load_port, served by "netperf_lib.py accept" in peer,
+               from 16 threads for nic_irq_load_duration seconds, replies of new source ports spread over rx queues
+               by RSS hash.
+            5. Get per cpu interrupt deltas of queue irqs from /proc/interrupts before and after load.
+
+        expected_result:
+            The busiest cpu does not take more than nic_irq_max_cpu_share of queue interrupts.
+            Queue number, irq affinity, RPS/XPS masks and deltas are saved in "<case id>.irq.json".
+            Case is skipped with single cpu or single queue, or when nic_irq_peer or nic_irq_load_port is not set.
+        '''
+        # load goes to a listener of the test in its own peer, never to a
+        # public service or sshd
+        peer = self.params.get('nic_irq_peer')
+        port = self.params.get('nic_irq_load_port')
+        if not peer or not port:
+            self.skipTest("nic_irq_peer or nic_irq_load_port is not set, no listener to generate load with")
+        queues = utils_lib.run_cmd(self, "ls /sys/class/net/{}/queues".format(self.nic), expect_ret=0).split()
+        rx_queues = [x for x in queues if x.startswith('rx-')]
+        masks = {}
+        output = utils_lib.run_cmd(self, "grep -H . /sys/class/net/{}/queues/*/[rx]ps_cpus".format(self.nic))
+        for line in output.split('\n'):
+            path, _, mask = line.partition(':')
+            if mask.strip():
+                masks['/'.join(path.split('/')[-2:])] = netperf_lib.parse_cpu_mask(mask)
+        # virtio net device is a child of the pci device owning msi irqs
+        cmd = "dev=$(readlink -f /sys/class/net/{}/device); ls $dev/msi_irqs $dev/../msi_irqs 2>/dev/null".format(self.nic)
+        msi_irqs = set(int(x) for x in utils_lib.run_cmd(self, cmd).split() if x.isdigit())
+        cpus, before = netperf_lib.parse_interrupts(utils_lib.run_cmd(self, 'cat /proc/interrupts', expect_ret=0,
+                                                                      is_log_output=False))
+        # drop config and management irqs, eg. virtio0-config, ena-mgmnt
+        irqs = sorted(irq for irq, (_, name) in before.items()
+                      if name and (irq in msi_irqs or name.split()[-1].startswith(self.nic))
+                      and not re.search(r'config|mgmnt|async|ctrl', name))
+        if cpus < 2:
+            self.skipTest("Only 1 cpu, no interrupt to distribute")
+        if len(rx_queues) < 2 or len(irqs) < 2:
+            self.skipTest("{} has {} rx queues and {} queue irqs, no interrupt to distribute".format(
+                self.nic, len(rx_queues), len(irqs)))
+        affinity = {}
+        output = utils_lib.run_cmd(self, "grep -H . {}".format(' '.join(
+            "/proc/irq/{}/smp_affinity_list".format(irq) for irq in irqs)))
+        for line in output.split('\n'):
+            path, _, cpu_list = line.partition(':')
+            if cpu_list.strip():
+                affinity[int(path.split('/')[3])] = netperf_lib.parse_cpu_list(cpu_list)
+        self.log.info("{} has {} rx queues, {} tx queues, {} cpus".format(
+            self.nic, len(rx_queues), len(queues) - len(rx_queues), cpus))
+        for irq in irqs:
+            self.log.info("irq {} {} affinity {}".format(irq, before[irq][1], affinity.get(irq)))
+        for queue in sorted(masks):
+            self.log.info("{} cpus {}".format(queue, masks[queue] or 'none'))
+
+        duration = self.params.get('nic_irq_load_duration', 10)
+        utils_lib.run_cmd(self, 'python3 --version', cancel_ret='0', msg='Load generator needs python3')
+        utils_lib.run_cmd(self, netperf_lib.install_cmd(), expect_ret=0, msg='Install load generator')
+        cmd = netperf_lib.connect_cmd(peer, port=port, duration=duration)
+        output = utils_lib.run_cmd(self, cmd, expect_ret=0, timeout=duration + 60, msg='Generate multi flow load')
+        _, after = netperf_lib.parse_interrupts(utils_lib.run_cmd(self, 'cat /proc/interrupts', expect_ret=0,
+                                                                  is_log_output=False))
+        utils_lib.run_cmd(self, "rm -f {}".format(netperf_lib.SCRIPT_FILE))
+
+        irq_deltas = {irq: [x - y for x, y in zip(after[irq][0], before[irq][0])] for irq in irqs if irq in after}
+        cpu_deltas = [sum(x) for x in zip(*irq_deltas.values())]
+        total = sum(cpu_deltas)
+        for irq in sorted(irq_deltas):
+            self.log.info("irq {} deltas {}".format(irq, irq_deltas[irq]))
+        self.log.info("Per cpu deltas of queue irqs: {}".format(cpu_deltas))
+        # few interrupts do not tell a distribution
+        if total < 1000:
+            self.skipTest("Only {} queue interrupts under load, check {} is reachable: {}".format(
+                total, peer, output))
+        slots = min(len(irq_deltas), cpus)
+        score = netperf_lib.imbalance_score(cpu_deltas, slots)
+        busiest = cpu_deltas.index(max(cpu_deltas))
+        share = float(cpu_deltas[busiest]) / total
+        self.log.info("Imbalance score {:.2f} (1.00 even, {} all on one cpu), cpu{} takes {:.1%}".format(
+            score, slots, busiest, share))
+        record = {'nic': self.nic, 'cpus': cpus, 'rx_queues': len(rx_queues),
+                  'tx_queues': len(queues) - len(rx_queues), 'masks': masks,
+                  'irqs': {irq: {'name': before[irq][1], 'affinity': affinity.get(irq),
+                                 'deltas': irq_deltas.get(irq)} for irq in irqs},
+                  'cpu_deltas': cpu_deltas, 'imbalance_score': round(score, 3)}
+        record_file = os.path.join(self.params['results_dir'], self.id() + '.irq.json')
+        with open(record_file, 'w') as fh:
+            json.dump(record, fh, indent=2)
+        self.log.info("Results saved to {}".format(record_file))
+        max_share = self.params.get('nic_irq_max_cpu_share', 0.9)
+        if share > max_share:
+            self.fail("cpu{} takes {:.1%} of {} queue interrupts over {} irqs, more than {:.0%}, "
+                      "affinity: {}".format(busiest, share, total, len(irq_deltas), max_share,
+                      ', '.join("{}:{}".format(irq, affinity.get(irq)) for irq in irqs)))
+
 if __name__ == '__main__':
     unittest.main()
\ No newline at end of file